@@ -0,0 +1,113 @@
+"""
+Sharded Search Benchmark
+Measures brute-force search latency as the number of shard workers grows.
+
+Usage:
+    python benchmark.py [--rows N] [--dimension D] [--queries Q] [--max-workers W]
+                        [--min-efficiency E]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path to import from src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.kernels import HAS_NUMPY, blas_threads
+from src.vector_db import VectorDB
+from src.vector_search import VectorSearch
+
+
+def build_db(rows: int, dimension: int, seed: int = 0) -> VectorDB:
+    """
+    Fill a VectorDB with random gaussian vectors.
+
+    Args:
+        rows: Number of vectors
+        dimension: Vector dimension
+        seed: Random seed
+
+    Returns:
+        VectorDB: Populated database
+    """
+    rng = random.Random(seed)
+    db = VectorDB(dimension=dimension, name="benchmark")
+    for i in range(rows):
+        db.add_vector(f"v{i}", [rng.gauss(0, 1) for _ in range(dimension)])
+    return db
+
+
+def time_search(search: VectorSearch, queries, workers: int) -> float:
+    """Average milliseconds per top-10 query with the given number of workers."""
+    search.search(queries[0], top_k=10, workers=workers)  # warm up
+    start = time.perf_counter()
+    for query in queries:
+        search.search(query, top_k=10, workers=workers)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000, help="Vectors in the DB")
+    parser.add_argument("--dimension", type=int, default=384, help="Vector dimension")
+    parser.add_argument("--queries", type=int, default=20, help="Queries per measurement")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1,
+                        help="Largest worker count to measure")
+    parser.add_argument("--min-efficiency", type=float, default=None,
+                        help="Fail (exit 1) if a worker count up to the CPU count scales "
+                             "below this efficiency, e.g. 0.8 for near-linear")
+    args = parser.parse_args()
+
+    backend = "numpy" if HAS_NUMPY else "python"
+    print("=" * 80)
+    print("SHARDED SEARCH BENCHMARK")
+    print("=" * 80)
+    print(f"Rows: {args.rows}  Dimension: {args.dimension}  Backend: {backend}  "
+          f"CPUs: {os.cpu_count()}  BLAS threads: {blas_threads()}")
+    if backend == "python":
+        print("NumPy is not installed: the Python kernel holds the GIL, so expect no scaling")
+    print()
+
+    print("Building database...")
+    db = build_db(args.rows, args.dimension)
+    rng = random.Random(1)
+    queries = [[rng.gauss(0, 1) for _ in range(args.dimension)] for _ in range(args.queries)]
+    # No query cache: every repetition must scan
+    search = VectorSearch(db, backend=backend, cache_size=0)
+
+    expected = search.search(queries[0], top_k=10)
+    print()
+    print(f"{'workers':>8} {'ms/query':>10} {'speedup':>8} {'efficiency':>11}")
+    print("-" * 40)
+
+    # Powers of two up to the limit, plus the limit itself
+    counts = sorted({2 ** i for i in range(args.max_workers.bit_length()) if 2 ** i <= args.max_workers}
+                    | {args.max_workers})
+    baseline = None
+    below = []
+    for workers in counts:
+        assert search.search(queries[0], top_k=10, workers=workers) == expected, "Sharded results differ"
+        ms = time_search(search, queries, workers)
+        baseline = baseline or ms
+        speedup = baseline / ms
+        print(f"{workers:>8} {ms:>10.2f} {speedup:>7.2f}x {speedup / workers:>10.0%}")
+        if args.min_efficiency is not None and workers <= (os.cpu_count() or 1) \
+                and speedup / workers < args.min_efficiency:
+            below.append(workers)
+
+    print()
+    if (os.cpu_count() or 1) == 1:
+        print("Only one CPU: these numbers show the cost of sharding, not its scaling")
+    if below:
+        print(f"FAILED: efficiency below {args.min_efficiency:.0%} with {below} workers")
+        sys.exit(1)
+    print("=" * 80)
+    print("BENCHMARK COMPLETED")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
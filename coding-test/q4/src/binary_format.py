@@ -0,0 +1,216 @@
+"""
+Binary Persistence Format
+Compact on-disk format for VectorDB with a memory-mappable vector block.
+
+File layout (little-endian):
+
+    offset 0   header     magic "VDB1", version, typecode, normalize flag,
+                          dimension, count, and offsets of the sections below
+    offset 64  vectors    count x dimension raw floats (row-major; float16
+                          vectors as their 16-bit patterns)
+               norms      count float64 L2 norms
+               metadata   compact JSON: name, created_at, ids, metadata, timestamps
+
+The vector and norm blocks are raw arrays, so `read_binary(mmap_vectors=True)`
+maps them straight from the file: loading costs only the metadata parse, and
+the pages are shared between processes that map the same file.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, Dict
+
+from .vector_store import storage_typecode
+
+MAGIC = b"VDB1"
+VERSION = 1
+HEADER = struct.Struct("<4sHcBIQQQQQ")
+VECTORS_OFFSET = 64
+BINARY_EXTENSIONS = (".vdb", ".bin")
+
+
+def is_binary_file(filepath: str) -> bool:
+    """Check whether a file starts with the binary format magic."""
+    try:
+        with open(filepath, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _pad(f, alignment: int):
+    remainder = f.tell() % alignment
+    if remainder:
+        f.write(b"\0" * (alignment - remainder))
+
+
+def _le_bytes(buffer, typecode: str):
+    """Bytes of an array/memoryview buffer in little-endian order."""
+    if sys.byteorder == "little":
+        return memoryview(buffer).cast("B")
+    swapped = array(typecode)
+    swapped.frombytes(memoryview(buffer).cast("B"))
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def write_binary(db, filepath: str, store=None):
+    """
+    Write a VectorDB to a binary file.
+
+    Only live rows are written. The file is written to a temporary path and
+    atomically renamed, so processes that have the old file mapped keep a
+    valid view.
+
+    Args:
+        db: VectorDB to write
+        filepath: Destination path
+        store: Store or StoreSnapshot to write (defaults to db.store)
+    """
+    store = store if store is not None else db.store
+    dim = store.dimension
+
+    if store.tombstones == 0:
+        # Buffers can be written as they are
+        vectors, norms = store.buffer, store.norms
+    else:
+        vectors, norms = array(storage_typecode(store.typecode)), array("d")
+        for row, _ in store.iter_rows():
+            start = row * dim
+            vectors.frombytes(memoryview(store.buffer[start:start + dim]).cast("B"))
+            norms.append(store.norm(row))
+
+    ids, metadata, timestamps = [], [], []
+    for row, vector_id in store.iter_rows():
+        ids.append(vector_id)
+        metadata.append(store.get_metadata(row))
+        timestamps.append(store.get_timestamp(row))
+
+    meta_bytes = json.dumps({
+        "name": db.name,
+        "created_at": db.created_at,
+        "ids": ids,
+        "metadata": metadata,
+        "timestamps": timestamps
+    }, separators=(",", ":")).encode("utf-8")
+
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * VECTORS_OFFSET)
+        vectors_offset = f.tell()
+        f.write(_le_bytes(vectors, storage_typecode(store.typecode)))
+        _pad(f, 8)
+        norms_offset = f.tell()
+        f.write(_le_bytes(norms, "d"))
+        meta_offset = f.tell()
+        f.write(meta_bytes)
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, store.typecode.encode("ascii"), int(store.normalize),
+                            dim, len(ids), vectors_offset, norms_offset, meta_offset, len(meta_bytes)))
+
+    os.replace(tmp_path, filepath)
+
+
+def read_binary(filepath: str, mmap_vectors: bool = True) -> Dict[str, Any]:
+    """
+    Read a binary VectorDB file.
+
+    Args:
+        filepath: Path to the binary file
+        mmap_vectors: If True, map the vector and norm blocks read-only
+            instead of copying them into memory
+
+    Returns:
+        dict: name, created_at, dimension, typecode, normalize, ids, metadata,
+              timestamps, plus `vectors` and `norms` buffers (read-only
+              memoryviews when mapped, arrays otherwise)
+
+    Raises:
+        ValueError: If the file is not a supported binary VectorDB file
+    """
+    with open(filepath, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{filepath} is too short to be a binary VectorDB file")
+
+        (magic, version, typecode, normalize, dim, count,
+         vectors_offset, norms_offset, meta_offset, meta_length) = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{filepath} is not a binary VectorDB file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported binary VectorDB version {version}")
+
+        typecode = typecode.decode("ascii")
+        storage = storage_typecode(typecode)
+        f.seek(meta_offset)
+        meta = json.loads(f.read(meta_length).decode("utf-8"))
+
+        itemsize = array(storage).itemsize
+        vectors_size = count * dim * itemsize
+
+        if mmap_vectors and count > 0 and sys.byteorder == "little":
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+            vectors = view[vectors_offset:vectors_offset + vectors_size].cast(storage)
+            norms = view[norms_offset:norms_offset + count * 8].cast("d")
+        else:
+            vectors = array(storage)
+            f.seek(vectors_offset)
+            vectors.fromfile(f, count * dim)
+            norms = array("d")
+            f.seek(norms_offset)
+            norms.fromfile(f, count)
+            if sys.byteorder != "little":
+                vectors.byteswap()
+                norms.byteswap()
+
+    return {
+        "name": meta["name"],
+        "created_at": meta["created_at"],
+        "dimension": dim,
+        "typecode": typecode,
+        "normalize": bool(normalize),
+        "ids": meta["ids"],
+        "metadata": meta["metadata"],
+        "timestamps": meta["timestamps"],
+        "vectors": vectors,
+        "norms": norms
+    }
+
+
+def convert_json_to_binary(json_path: str, binary_path: str) -> int:
+    """
+    One-shot conversion of a JSON VectorDB file to the binary format.
+
+    Args:
+        json_path: Existing JSON file written by VectorDB.save()
+        binary_path: Destination binary file
+
+    Returns:
+        int: Number of vectors converted
+
+    Raises:
+        ValueError: If the JSON file cannot be loaded
+    """
+    from .vector_db import VectorDB
+
+    db = VectorDB(dimension=1)
+    if not db.load(json_path):
+        raise ValueError(f"Could not load JSON database from {json_path}")
+
+    write_binary(db, binary_path)
+    return len(db)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m src.binary_format <input.json> <output.vdb>")
+        sys.exit(1)
+
+    converted = convert_json_to_binary(sys.argv[1], sys.argv[2])
+    print(f"Converted {converted} vectors: {sys.argv[1]} -> {sys.argv[2]}")
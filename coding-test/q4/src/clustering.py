@@ -0,0 +1,140 @@
+"""
+K-Means Clustering
+Lloyd's k-means used to train IVF centroids and quantizer codebooks.
+"""
+
+import random
+from typing import List, Optional
+
+from .cosine_similarity import dot_product, magnitude
+from .kernels import np
+
+
+def _normalize(vectors: List[List[float]]) -> List[List[float]]:
+    unit = []
+    for v in vectors:
+        norm = magnitude(v)
+        if norm > 0:
+            unit.append([x / norm for x in v])
+    return unit
+
+
+def assign_python(vectors: List[List[float]], centroids: List[List[float]],
+                  spherical: bool = False) -> List[int]:
+    """
+    Assign each vector to its closest centroid (pure Python).
+
+    Args:
+        vectors: Vectors to assign
+        centroids: Cluster centroids
+        spherical: If True, closest = highest dot product (centroids are
+            unit vectors); otherwise closest = smallest Euclidean distance
+
+    Returns:
+        list: Centroid index for each vector
+    """
+    # ||v - c||^2 = ||v||^2 - 2 v.c + ||c||^2, so the closest centroid
+    # maximizes 2 v.c - ||c||^2
+    offsets = [0.0 if spherical else dot_product(c, c) for c in centroids]
+    scale = 1.0 if spherical else 2.0
+
+    assignments = []
+    for v in vectors:
+        best, best_score = 0, None
+        for i, c in enumerate(centroids):
+            score = scale * dot_product(v, c) - offsets[i]
+            if best_score is None or score > best_score:
+                best, best_score = i, score
+        assignments.append(best)
+    return assignments
+
+
+def _assign_numpy(matrix, centroids, spherical: bool):
+    scores = matrix @ centroids.T
+    if not spherical:
+        # In place: the score matrix is the largest temporary of an iteration
+        scores *= 2
+        scores -= np.einsum("ij,ij->i", centroids, centroids)
+    return scores.argmax(axis=1)
+
+
+def kmeans(vectors: List[List[float]], k: int, iterations: int = 20,
+           spherical: bool = False, seed: Optional[int] = None,
+           backend: str = "python") -> List[List[float]]:
+    """
+    Train k-means centroids.
+
+    Args:
+        vectors: Training vectors
+        k: Number of clusters (capped at the number of training vectors)
+        iterations: Maximum number of Lloyd iterations
+        spherical: If True, cluster directions (cosine) and return unit centroids
+        seed: Seed for initialisation and empty-cluster reseeding
+        backend: "python" or "numpy"
+
+    Returns:
+        list: Centroids as lists of floats
+
+    Raises:
+        ValueError: If there are no (non-zero) training vectors
+    """
+    if spherical:
+        vectors = _normalize(vectors)
+    if not vectors:
+        raise ValueError("Cannot train k-means without training vectors")
+
+    rng = random.Random(seed)
+    k = min(k, len(vectors))
+    centroids = [list(v) for v in rng.sample(vectors, k)]
+
+    if backend == "numpy":
+        matrix = np.asarray(vectors, dtype=np.float64)
+        centers = np.asarray(centroids, dtype=np.float64)
+        assignments = None
+        for _ in range(iterations):
+            new_assignments = _assign_numpy(matrix, centers, spherical)
+            if assignments is not None and np.array_equal(new_assignments, assignments):
+                break
+            assignments = new_assignments
+            counts = np.bincount(assignments, minlength=k)
+            sums = np.zeros_like(centers)
+            np.add.at(sums, assignments, matrix)
+            for i in np.flatnonzero(counts == 0):
+                # Reseed empty clusters with a random training vector
+                sums[i] = matrix[rng.randrange(len(matrix))]
+                counts[i] = 1
+            centers = sums / counts[:, None]
+            if spherical:
+                norms = np.linalg.norm(centers, axis=1)
+                centers = centers / np.where(norms > 0, norms, 1.0)[:, None]
+        return centers.tolist()
+
+    assignments = None
+    dim = len(vectors[0])
+    for _ in range(iterations):
+        new_assignments = assign_python(vectors, centroids, spherical)
+        if new_assignments == assignments:
+            break
+        assignments = new_assignments
+
+        sums = [[0.0] * dim for _ in range(k)]
+        counts = [0] * k
+        for v, c in zip(vectors, assignments):
+            counts[c] += 1
+            total = sums[c]
+            for j in range(dim):
+                total[j] += v[j]
+
+        for i in range(k):
+            if counts[i] == 0:
+                # Reseed empty clusters with a random training vector
+                centroids[i] = list(vectors[rng.randrange(len(vectors))])
+                continue
+            centroid = [x / counts[i] for x in sums[i]]
+            if spherical:
+                norm = magnitude(centroid)
+                if norm > 0:
+                    centroid = [x / norm for x in centroid]
+            centroids[i] = centroid
+
+    return centroids
@@ -0,0 +1,229 @@
+"""
+HNSW Index
+Hierarchical Navigable Small World graph for approximate nearest-neighbour search.
+
+Reference: Malkov & Yashunin, "Efficient and robust approximate nearest
+neighbor search using Hierarchical Navigable Small World graphs" (2016).
+"""
+
+import heapq
+import math
+import random
+from typing import Dict, List, Optional, Set, Tuple
+
+from .kernels import resolve_backend, score_rows
+from .vector_index import VectorIndex
+
+
+class HNSWIndex(VectorIndex):
+    """
+    Approximate nearest-neighbour index over cosine similarity.
+
+    Each vector is a node on layers 0..level, where the level is drawn from
+    an exponentially decaying distribution. Search descends greedily from
+    the top layer and runs a best-first beam of width `ef` on layer 0.
+
+    Tuning:
+        M:               links per node (2*M on layer 0); higher = better recall, more memory
+        ef_construction: beam width while inserting; higher = better graph, slower inserts
+        ef_search:       beam width while querying; the recall/latency knob
+    """
+
+    def __init__(self, M: int = 16, ef_construction: int = 200, ef_search: int = 50,
+                 seed: Optional[int] = None, backend: str = "auto"):
+        """
+        Initialize an empty HNSW index.
+
+        Args:
+            M: Maximum number of links per node on layers above 0
+            ef_construction: Beam width used when inserting
+            ef_search: Default beam width used when searching
+            seed: Seed for level assignment (for reproducible graphs)
+            backend: Similarity backend - "auto", "python" or "numpy"
+
+        Raises:
+            ValueError: If parameters are out of range
+        """
+        super().__init__()
+        if M < 2:
+            raise ValueError(f"M must be at least 2, got {M}")
+        if ef_construction < 1 or ef_search < 1:
+            raise ValueError("ef_construction and ef_search must be positive")
+
+        self.M = M
+        self.max_links_layer0 = 2 * M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.backend = resolve_backend(backend)
+        self._level_mult = 1 / math.log(M)
+        self._rng = random.Random(seed)
+        self.reset()
+
+    def reset(self):
+        """Drop the whole graph."""
+        self._layers: List[Dict[str, List[str]]] = []
+        self._node_levels: Dict[str, int] = {}
+        self._entry_point: Optional[str] = None
+
+    def _vector(self, vector_id: str) -> List[float]:
+        store = self.db.store
+        return store.read(store.row_of(vector_id))
+
+    def _score(self, query, ids: List[str]) -> List[Tuple[float, str]]:
+        """Exact similarities of the query to a batch of indexed nodes."""
+        store = self.db.store
+        rows = [row for row in map(store.row_of, ids) if row is not None]
+        rows, scores = score_rows(store, query, rows, self.backend)
+        return [(float(score), store.row_id(row)) for row, score in zip(rows, scores)]
+
+    def _search_layer(self, query, entry: List[Tuple[float, str]], ef: int,
+                      layer: int) -> List[Tuple[float, str]]:
+        """
+        Best-first beam search on one layer.
+
+        Returns:
+            list: Up to `ef` (similarity, id) pairs, best first
+        """
+        graph = self._layers[layer]
+        visited = {vid for _, vid in entry}
+        candidates = [(-score, vid) for score, vid in entry]
+        heapq.heapify(candidates)
+        results = list(entry)
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_score, current = heapq.heappop(candidates)
+            if len(results) >= ef and -neg_score < results[0][0]:
+                break
+
+            # Links to deleted nodes are skipped lazily
+            links = [n for n in graph.get(current, ()) if n not in visited and n in graph]
+            visited.update(links)
+
+            for score, neighbor in self._score(query, links):
+                if len(results) < ef or score > results[0][0]:
+                    heapq.heappush(candidates, (-score, neighbor))
+                    heapq.heappush(results, (score, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
+
+    def _shrink(self, vector_id: str, layer: int):
+        """Keep only the closest links of a node that exceeded its link budget."""
+        max_links = self.max_links_layer0 if layer == 0 else self.M
+        links = self._layers[layer][vector_id]
+        if len(links) <= max_links:
+            return
+        scored = sorted(self._score(self._vector(vector_id), links), reverse=True)
+        self._layers[layer][vector_id] = [vid for _, vid in scored[:max_links]]
+
+    def on_add(self, vector_id: str):
+        """Insert a node into the graph."""
+        store = self.db.store
+        row = store.row_of(vector_id)
+        if row is None or store.norm(row) == 0:
+            # Zero vectors can never be returned by a cosine search
+            return
+
+        query = store.read(row)
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+        self._node_levels[vector_id] = level
+        while len(self._layers) <= level:
+            self._layers.append({})
+        for layer in range(level + 1):
+            self._layers[layer][vector_id] = []
+
+        if self._entry_point is None:
+            self._entry_point = vector_id
+            return
+
+        top = self._node_levels[self._entry_point]
+        entry = self._score(query, [self._entry_point])
+
+        # Greedy descent through the layers above the new node
+        for layer in range(top, level, -1):
+            entry = self._search_layer(query, entry, 1, layer)
+
+        for layer in range(min(level, top), -1, -1):
+            candidates = self._search_layer(query, entry, self.ef_construction, layer)
+            neighbors = [vid for _, vid in candidates if vid != vector_id][:self.M]
+            self._layers[layer][vector_id] = neighbors
+            for neighbor in neighbors:
+                self._layers[layer][neighbor].append(vector_id)
+                self._shrink(neighbor, layer)
+            entry = candidates
+
+        if level > top:
+            self._entry_point = vector_id
+
+    def on_delete(self, vector_id: str):
+        """Remove a node and reconnect its neighbours through each other."""
+        level = self._node_levels.pop(vector_id, None)
+        if level is None:
+            return
+
+        for layer in range(level + 1):
+            graph = self._layers[layer]
+            neighbors = graph.pop(vector_id)
+            for neighbor in neighbors:
+                links = graph.get(neighbor)
+                if links is None or vector_id not in links:
+                    continue
+                links.remove(vector_id)
+                links.extend(n for n in neighbors if n != neighbor and n in graph and n not in links)
+                self._shrink(neighbor, layer)
+
+        while self._layers and not self._layers[-1]:
+            self._layers.pop()
+
+        if self._entry_point == vector_id:
+            if self._node_levels:
+                self._entry_point = max(self._node_levels, key=self._node_levels.get)
+            else:
+                self._entry_point = None
+
+    def search(self, query_vector: List[float], top_k: int,
+               allowed: Optional[Set[str]] = None,
+               ef_search: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Approximate top-k search.
+
+        Args:
+            query_vector: Query vector
+            top_k: Number of results to return
+            allowed: Optional set of IDs results are restricted to (applied to
+                the `ef` candidates, so fewer than top_k may be returned)
+            ef_search: Beam width for this query (defaults to self.ef_search);
+                raise it for higher recall
+
+        Returns:
+            list: (vector_id, similarity) pairs, highest similarity first
+        """
+        if self._entry_point is None or top_k <= 0:
+            return []
+
+        ef = max(ef_search or self.ef_search, top_k)
+        entry = self._score(query_vector, [self._entry_point])
+        if not entry:
+            # Zero query vector
+            return []
+
+        for layer in range(self._node_levels[self._entry_point], 0, -1):
+            entry = self._search_layer(query_vector, entry, 1, layer)
+
+        results = self._search_layer(query_vector, entry, ef, 0)
+        if allowed is not None:
+            results = [(score, vid) for score, vid in results if vid in allowed]
+
+        return [(vid, score) for score, vid in results[:top_k]]
+
+    def __len__(self):
+        """Return number of indexed vectors."""
+        return len(self._node_levels)
+
+    def __repr__(self):
+        return (f"HNSWIndex(M={self.M}, ef_construction={self.ef_construction}, "
+                f"ef_search={self.ef_search}, nodes={len(self)}, layers={len(self._layers)})")
@@ -0,0 +1,191 @@
+"""
+Hybrid Search
+Vector and lexical (BM25) retrieval fused by reciprocal rank fusion.
+
+Embeddings match vague queries ("something spicy for lunch"); exact names
+("nasi goreng") are often matched better by their words. HybridSearch
+runs both over the same DB in one call: a VectorSearch query and a
+LexicalIndex query (attached to the DB, see lexical_index.py), each
+returning its best `fetch_k` candidates. The two rankings are fused with
+reciprocal rank fusion (RRF):
+
+    score(d) = sum over rankings of weight / (k + rank of d)
+
+RRF only uses ranks, so cosine similarities and BM25 scores never need to
+be put on a common scale, and a document ranked well by either retriever
+ends up near the top.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .rwlock import reads
+from .vector_search import VectorSearch
+
+# RRF rank offset; 60 is the value from the original RRF paper
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K,
+                           weights: Optional[Sequence[float]] = None) -> List[Tuple[str, float]]:
+    """
+    Fuse rankings of IDs with reciprocal rank fusion.
+
+    Args:
+        rankings: Ranked ID lists, best first
+        k: Rank offset (larger = flatter, less weight on the very top ranks)
+        weights: Optional weight per ranking (default 1.0 each)
+
+    Returns:
+        list: (id, fused_score) pairs, highest score first (ties by ID)
+
+    Raises:
+        ValueError: If k is negative or weights don't match the rankings
+    """
+    if k < 0:
+        raise ValueError("k must be non-negative")
+    if weights is None:
+        weights = [1.0] * len(rankings)
+    elif len(weights) != len(rankings):
+        raise ValueError(f"Got {len(weights)} weights for {len(rankings)} rankings")
+
+    fused: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, item_id in enumerate(ranking, start=1):
+            fused[item_id] = fused.get(item_id, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda hit: (-hit[1], hit[0]))
+
+
+class HybridSearch:
+    """
+    Single-call hybrid retrieval over a VectorDB.
+
+    Combines `VectorSearch.search()` with the `search_text()` of a
+    LexicalIndex attached to the same DB, and fuses the two rankings with
+    reciprocal rank fusion.
+    """
+
+    def __init__(self, search: VectorSearch, lexical: str = "bm25", rrf_k: int = RRF_K):
+        """
+        Initialize hybrid search.
+
+        Args:
+            search: VectorSearch over the DB
+            lexical: Name of the LexicalIndex attached to the DB
+            rrf_k: RRF rank offset (see reciprocal_rank_fusion())
+
+        Raises:
+            ValueError: If rrf_k is negative
+        """
+        if rrf_k < 0:
+            raise ValueError("rrf_k must be non-negative")
+        self.search_engine = search
+        self.db = search.db
+        self.lexical = lexical
+        self.rrf_k = rrf_k
+
+    @property
+    def lock(self):
+        """Readers-writer lock of the searched DB."""
+        return self.db.lock
+
+    @reads
+    def search(self,
+               query_text: str,
+               query_vector: List[float],
+               top_k: int = 5,
+               filter_fn: Optional[Union[Callable, dict]] = None,
+               fetch_k: Optional[int] = None,
+               weights: Tuple[float, float] = (1.0, 1.0),
+               index: Optional[str] = None,
+               **index_params) -> List[Tuple[str, float, dict]]:
+        """
+        Search by text and vector at once and fuse the rankings.
+
+        Args:
+            query_text: Query text, matched against the lexical index
+            query_vector: Embedding of the query, matched by VectorSearch
+            top_k: Number of results to return
+            filter_fn: Optional metadata filter function or spec (see
+                VectorSearch.search()), applied to both retrievers
+            fetch_k: Candidates taken from each retriever (default
+                max(4 * top_k, 20))
+            weights: (vector, lexical) weights of the two rankings
+            index: Optional name of an attached vector index (e.g. "hnsw")
+            **index_params: Index-specific parameters (see VectorSearch.search())
+
+        Returns:
+            list: (vector_id, rrf_score, metadata) tuples, highest score first
+
+        Raises:
+            ValueError: If the lexical index is not attached, the query
+                dimension doesn't match the DB, or fetch_k is smaller than top_k
+        """
+        target = self.db.indexes.get(self.lexical)
+        if target is None or not hasattr(target, "search_text"):
+            raise ValueError(f"Lexical index '{self.lexical}' is not attached to the DB")
+        if fetch_k is None:
+            fetch_k = max(4 * top_k, 20)
+        elif fetch_k < top_k:
+            raise ValueError("fetch_k must be at least top_k")
+        if top_k <= 0:
+            return []
+
+        vector_hits = self.search_engine.search(query_vector, fetch_k, filter_fn, index, **index_params)
+
+        allowed = set(self.db.filter_by_metadata(filter_fn)) if filter_fn else None
+        with target.lock.read():
+            lexical_hits = target.search_text(query_text, fetch_k, allowed)
+
+        fused = reciprocal_rank_fusion(
+            [[hit[0] for hit in vector_hits], [vid for vid, _ in lexical_hits]],
+            k=self.rrf_k, weights=weights)
+
+        # Metadata of lexical-only hits; skip those deleted since the index answered
+        metadata = {vid: meta for vid, _, meta in vector_hits}
+        store = self.db.store
+        results = []
+        for vid, score in fused:
+            if vid not in metadata:
+                row = store.row_of(vid)
+                if row is None:
+                    continue
+                metadata[vid] = store.get_metadata(row)
+            results.append((vid, score, metadata[vid]))
+            if len(results) == top_k:
+                break
+        return results
+
+    def __repr__(self):
+        return f"HybridSearch(lexical='{self.lexical}', rrf_k={self.rrf_k})"
+
+
+if __name__ == "__main__":
+    from .lexical_index import LexicalIndex
+    from .vector_db import VectorDB
+
+    print("Testing HybridSearch")
+    print("=" * 50)
+
+    db = VectorDB(dimension=3, name="menu")
+    db.add_vector("i1", [0.9, 0.1, 0.0], {"name": "Nasi Goreng Spesial"})
+    db.add_vector("i2", [1.0, 0.0, 0.0], {"name": "Mie Goreng"})
+    db.add_vector("i3", [0.0, 1.0, 0.0], {"name": "Es Teh Manis"})
+    db.add_vector("i4", [0.0, 0.0, 1.0], {"name": "Nasi Putih"})
+    db.attach_index("bm25", LexicalIndex(["name"]))
+
+    hybrid = HybridSearch(VectorSearch(db))
+    query = [1.0, 0.0, 0.0]
+
+    print("\nVector only:")
+    for vid, sim, meta in hybrid.search_engine.search(query, top_k=3):
+        print(f"  {vid}: {sim:.4f} {meta['name']}")
+
+    print("\nLexical only ('nasi goreng'):")
+    for vid, score in db.indexes["bm25"].search_text("nasi goreng", top_k=3):
+        print(f"  {vid}: {score:.4f}")
+
+    print("\nHybrid (RRF):")
+    for vid, score, meta in hybrid.search("nasi goreng", query, top_k=3):
+        print(f"  {vid}: {score:.4f} {meta['name']}")
+
+    print("\nAll tests completed!")
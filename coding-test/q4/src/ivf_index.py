@@ -0,0 +1,219 @@
+"""
+IVF Index
+Inverted-file index: k-means partitions of the collection, scanned by nprobe.
+"""
+
+import copy
+import heapq
+import random
+from itertools import chain
+from typing import Dict, List, Optional, Set, Tuple
+
+from .clustering import kmeans
+from .cosine_similarity import dot_product
+from .kernels import np, resolve_backend, top_k_rows
+from .vector_index import VectorIndex
+
+
+class IVFIndex(VectorIndex):
+    """
+    Approximate nearest-neighbour index over cosine similarity.
+
+    Spherical k-means splits the collection into `n_lists` partitions. Every
+    vector is stored in the inverted list of its closest centroid, and a
+    query only scans the lists of its `nprobe` closest centroids.
+
+    Centroids are trained once the collection holds `n_lists` vectors (until
+    then every vector is scanned). As the collection drifts, the index is
+    retrained after `retrain_ratio` x (size at last training) mutations, or
+    on demand with `train()`.
+    """
+
+    def __init__(self, n_lists: int = 64, nprobe: int = 8, iterations: int = 20,
+                 max_train_samples: int = 20000, retrain_ratio: Optional[float] = 0.5,
+                 seed: Optional[int] = None, backend: str = "auto"):
+        """
+        Initialize an empty IVF index.
+
+        Args:
+            n_lists: Number of k-means partitions (inverted lists)
+            nprobe: Default number of closest lists scanned per query
+            iterations: Maximum k-means iterations per training
+            max_train_samples: Maximum number of vectors sampled for training
+            retrain_ratio: Retrain after this fraction of the collection has
+                been added/updated/deleted since the last training
+                (None = only retrain on explicit `train()`)
+            seed: Seed for sampling and k-means initialisation
+            backend: Similarity backend - "auto", "python" or "numpy"
+
+        Raises:
+            ValueError: If parameters are out of range
+        """
+        super().__init__()
+        if n_lists < 1 or nprobe < 1:
+            raise ValueError("n_lists and nprobe must be positive")
+
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.max_train_samples = max_train_samples
+        self.retrain_ratio = retrain_ratio
+        self.backend = resolve_backend(backend)
+        self._rng = random.Random(seed)
+        self.last_scanned = 0
+        self.reset()
+
+    def reset(self):
+        """Drop centroids and inverted lists."""
+        self._centroids: List[List[float]] = []
+        self._centroid_matrix = None
+        self._lists: List[Dict[str, None]] = []
+        self._unassigned: Dict[str, None] = {}
+        self._assignment: Dict[str, int] = {}
+        self._trained_size = 0
+        self._mutations = 0
+
+    def build(self, db):
+        """Index every vector of a database and train once over all of them."""
+        self.db = db
+        self.reset()
+        store = db.store
+        for row, vector_id in store.iter_rows():
+            if store.norm(row) > 0:
+                self._unassigned[vector_id] = None
+                self._assignment[vector_id] = -1
+        self.train()
+
+    @property
+    def is_trained(self) -> bool:
+        """True once centroids have been trained."""
+        return bool(self._centroids)
+
+    def _closest_lists(self, vector: List[float], count: int) -> List[int]:
+        """Indexes of the `count` centroids most similar to a vector."""
+        if self._centroid_matrix is not None:
+            scores = self._centroid_matrix @ np.asarray(vector, dtype=np.float64)
+            if count >= len(scores):
+                return np.argsort(-scores).tolist()
+            return np.argpartition(-scores, count - 1)[:count].tolist()
+
+        scores = [dot_product(vector, c) for c in self._centroids]
+        return heapq.nlargest(count, range(len(scores)), key=scores.__getitem__)
+
+    def train(self):
+        """
+        (Re)train centroids on the current collection and reassign every vector.
+
+        Does nothing if the collection is smaller than `n_lists`.
+        """
+        store = self.db.store
+        ids = list(self._assignment)
+        if len(ids) < self.n_lists:
+            return
+
+        if len(ids) > self.max_train_samples:
+            sample = self._rng.sample(ids, self.max_train_samples)
+        else:
+            sample = ids
+
+        # Train a copy; searches use the current lists until it is published
+        trained = copy.copy(self)
+        vectors = [store.read(store.row_of(vid)) for vid in sample]
+        trained._centroids = kmeans(vectors, self.n_lists, self.iterations, spherical=True,
+                                    seed=self._rng.random(), backend=self.backend)
+        if self.backend == "numpy":
+            trained._centroid_matrix = np.asarray(trained._centroids, dtype=np.float64)
+
+        trained._lists = [{} for _ in trained._centroids]
+        trained._unassigned = {}
+        trained._assignment = {}
+        for vid in ids:
+            trained._assign(vid)
+        trained._trained_size = len(ids)
+        trained._mutations = 0
+        self._publish(trained)
+
+    def _assign(self, vector_id: str):
+        if not self.is_trained:
+            self._unassigned[vector_id] = None
+            self._assignment[vector_id] = -1
+            return
+
+        store = self.db.store
+        best = self._closest_lists(store.read(store.row_of(vector_id)), 1)[0]
+        self._lists[best][vector_id] = None
+        self._assignment[vector_id] = best
+
+    def maintain(self):
+        """Train once n_lists vectors exist, and retrain after retrain_ratio of them changed."""
+        if not self.is_trained:
+            if len(self._assignment) >= self.n_lists:
+                self.train()
+            return
+
+        if self.retrain_ratio is not None and self._mutations > self.retrain_ratio * self._trained_size:
+            self.train()
+
+    def on_add(self, vector_id: str):
+        """Add a vector to the inverted list of its closest centroid."""
+        store = self.db.store
+        row = store.row_of(vector_id)
+        if row is None or store.norm(row) == 0:
+            # Zero vectors can never be returned by a cosine search
+            return
+
+        self._assign(vector_id)
+        self._mutations += 1
+
+    def on_delete(self, vector_id: str):
+        """Remove a vector from its inverted list."""
+        list_no = self._assignment.pop(vector_id, None)
+        if list_no is None:
+            return
+
+        if list_no < 0:
+            del self._unassigned[vector_id]
+        else:
+            del self._lists[list_no][vector_id]
+        self._mutations += 1
+
+    def search(self, query_vector: List[float], top_k: int,
+               allowed: Optional[Set[str]] = None,
+               nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Approximate top-k search over the closest inverted lists.
+
+        Args:
+            query_vector: Query vector
+            top_k: Number of results to return
+            allowed: Optional set of IDs results are restricted to
+            nprobe: Number of lists to scan (defaults to self.nprobe);
+                raise it for higher recall
+
+        Returns:
+            list: (vector_id, similarity) pairs, highest similarity first
+        """
+        lists = [self._unassigned]
+        if self.is_trained:
+            probe = min(nprobe or self.nprobe, len(self._lists))
+            lists.extend(self._lists[i] for i in self._closest_lists(query_vector, probe))
+
+        store = self.db.store
+        rows = [store.row_of(vid) for vid in chain.from_iterable(lists)
+                if allowed is None or vid in allowed]
+        self.last_scanned = len(rows)
+
+        hits = top_k_rows(store, query_vector, rows, top_k, self.backend)
+        return [(store.row_id(row), score) for row, score in hits]
+
+    def list_sizes(self) -> List[int]:
+        """Number of vectors in each inverted list."""
+        return [len(ids) for ids in self._lists]
+
+    def __len__(self):
+        """Return number of indexed vectors."""
+        return len(self._assignment)
+
+    def __repr__(self):
+        return (f"IVFIndex(n_lists={self.n_lists}, nprobe={self.nprobe}, "
+                f"trained={self.is_trained}, vectors={len(self)})")
@@ -0,0 +1,650 @@
+"""
+Similarity Kernels
+Score a query against the rows of a VectorStore.
+
+Two backends are available:
+- "python": the stdlib-only reference path built on cosine_similarity.py
+- "numpy":  one matrix-vector product per chunk of rows
+
+Both divide by the norms cached in the store instead of recomputing them,
+and skip the division entirely when the store holds unit vectors.
+
+Top-k selection never sorts the full candidate set: the Python backend keeps
+a bounded heap while scanning, the NumPy backend uses a partial partition.
+
+Batches of queries are scored together: one matrix-matrix product per tile
+of rows x queries (NumPy), or one pass over the rows per micro-batch
+(Python).
+
+Maximal marginal relevance re-ranking (`mmr_select`) scores every pair of
+candidates in one matrix product (NumPy).
+
+Large scans can be sharded: contiguous partitions of the rows are scanned by
+a thread pool and their local top-k merged. NumPy releases the GIL inside
+its products, so shards run on separate cores without copying the buffer.
+The pool is created once and reused by every query. A multithreaded BLAS
+already spreads each product over its own threads, so automatic shard
+counts leave one core per BLAS thread (set OPENBLAS_NUM_THREADS=1, or the
+MKL/OMP equivalent, to shard instead).
+
+NumPy is optional. With backend="auto" it is used when installed.
+"""
+
+import functools
+import heapq
+import os
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Iterator, List, Optional, Tuple
+
+from .cosine_similarity import dot_product, magnitude
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+try:
+    from threadpoolctl import threadpool_info
+except ImportError:  # threadpoolctl is optional
+    threadpool_info = None
+
+HAS_NUMPY = np is not None
+
+BACKENDS = ("python", "numpy")
+
+# Rows scored per matrix-vector product. Bounds the float64 copy made when
+# upcasting float32 or float16 rows: 4096 x 384 dims is 12.6 MB per scan
+# (and per shard thread), where 65536 rows took 200 MB.
+CHUNK_ROWS = 4096
+
+# Tile shape for batched queries: BATCH_CHUNK_ROWS x QUERY_BATCH float64
+# scores (16 MB) per matrix-matrix product
+BATCH_CHUNK_ROWS = 8192
+QUERY_BATCH = 256
+
+# Fewest candidate rows worth a shard of their own
+MIN_SHARD_ROWS = 16384
+
+# Environment variables that set the BLAS thread count, in precedence order
+BLAS_THREAD_VARS = ("OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "OMP_NUM_THREADS")
+
+# Shard thread pool shared by all queries, grown on demand
+_shard_pool = None
+_shard_pool_size = 0
+_shard_pool_lock = threading.Lock()
+_oversubscription_warned = False
+
+
+def resolve_backend(backend: str = "auto") -> str:
+    """
+    Resolve a backend name.
+
+    Args:
+        backend: "auto", "python" or "numpy"
+
+    Returns:
+        str: Concrete backend name ("python" or "numpy")
+
+    Raises:
+        ValueError: If the backend is unknown or NumPy is not installed
+    """
+    if backend == "auto":
+        return "numpy" if HAS_NUMPY else "python"
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Expected 'auto' or one of {BACKENDS}")
+
+    if backend == "numpy" and not HAS_NUMPY:
+        raise ValueError("NumPy backend requested but numpy is not installed")
+
+    return backend
+
+
+def iter_scores_python(store, query_vector: List[float],
+                       rows: Optional[List[int]] = None) -> Iterator[Tuple[int, float]]:
+    """
+    Reference kernel: lazily yield the cosine similarity of the query against each row.
+
+    Args:
+        store: VectorStore to scan
+        query_vector: Query vector
+        rows: Candidate rows (all live rows if None; the live rows within
+            it for a range)
+
+    Yields:
+        tuple: (row, score) for rows whose similarity is defined
+    """
+    query_norm = magnitude(query_vector)
+    if query_norm == 0:
+        return
+
+    if rows is None:
+        rows = (row for row, _ in store.iter_rows())
+    elif isinstance(rows, range):
+        rows = (row for row in rows if store.alive[row])
+
+    if store.normalize:
+        query_vector = [x / query_norm for x in query_vector]
+
+    for row in rows:
+        norm = store.norm(row)
+        if norm == 0:
+            # Skip zero vectors
+            continue
+        dot = dot_product(query_vector, store.read(row))
+        yield row, (dot if store.normalize else dot / (norm * query_norm))
+
+
+def score_rows_python(store, query_vector: List[float],
+                      rows: Optional[List[int]] = None) -> Tuple[List[int], List[float]]:
+    """
+    Reference kernel: cosine similarity of the query against each row.
+
+    Args:
+        store: VectorStore to scan
+        query_vector: Query vector
+        rows: Candidate rows (all live rows if None)
+
+    Returns:
+        tuple: (rows, scores) for rows whose similarity is defined
+    """
+    scored_rows, scores = [], []
+    for row, score in iter_scores_python(store, query_vector, rows):
+        scored_rows.append(row)
+        scores.append(score)
+
+    return scored_rows, scores
+
+
+def _as_matrix(store):
+    """Zero-copy (rows x dimension) NumPy view of the store's vector buffer."""
+    return np.frombuffer(store.buffer, dtype=np.dtype(store.typecode)).reshape(-1, store.dimension)
+
+
+def score_rows_numpy(store, query_vector: List[float], rows=None):
+    """
+    NumPy kernel: matrix-vector product against cached norms.
+
+    Rows are upcast to float64 chunk by chunk so results match the
+    reference kernel to well within 1e-6.
+
+    Args:
+        store: VectorStore to scan
+        query_vector: Query vector
+        rows: Candidate rows (all live rows if None; the live rows within
+            it for a range, scanned as one contiguous block)
+
+    Returns:
+        tuple: (rows, scores) as NumPy arrays, for rows whose similarity is defined
+    """
+    query = np.asarray(query_vector, dtype=np.float64)
+    query_norm = float(np.sqrt(query @ query))
+    num_rows = store.num_rows
+
+    if query_norm == 0 or num_rows == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+
+    matrix = _as_matrix(store)
+    norms = np.frombuffer(store.norms, dtype=np.float64)
+
+    if rows is None or isinstance(rows, range):
+        # Scan the buffer in contiguous chunks, then drop tombstones
+        first, stop = (0, num_rows) if rows is None else (rows.start, rows.stop)
+        dots = np.empty(stop - first, dtype=np.float64)
+        for start in range(first, stop, CHUNK_ROWS):
+            block = matrix[start:min(start + CHUNK_ROWS, stop)]
+            dots[start - first:start - first + len(block)] = block.astype(np.float64) @ query
+        alive = np.frombuffer(store.alive, dtype=np.uint8)[first:stop].astype(bool)
+        live = np.flatnonzero(alive & (norms[first:stop] > 0))
+        rows = live + first
+        dots = dots[live]
+    else:
+        rows = np.asarray(rows, dtype=np.intp)
+        rows = rows[norms[rows] > 0]
+        dots = np.empty(len(rows), dtype=np.float64)
+        for start in range(0, len(rows), CHUNK_ROWS):
+            chunk = rows[start:start + CHUNK_ROWS]
+            dots[start:start + len(chunk)] = matrix[chunk].astype(np.float64) @ query
+
+    if store.normalize:
+        return rows, dots / query_norm
+    return rows, dots / (norms[rows] * query_norm)
+
+
+def score_rows(store, query_vector: List[float], rows=None, backend: str = "python"):
+    """
+    Score rows of a store against a query with the given backend.
+
+    Args:
+        store: VectorStore to scan
+        query_vector: Query vector
+        rows: Candidate rows (all live rows if None)
+        backend: Concrete backend name ("python" or "numpy")
+
+    Returns:
+        tuple: (rows, scores); lists for "python", NumPy arrays for "numpy"
+    """
+    if backend == "numpy":
+        return score_rows_numpy(store, query_vector, rows)
+    return score_rows_python(store, query_vector, rows)
+
+
+def select_top_k(scores, top_k: int, backend: str = "python") -> List[int]:
+    """
+    Positions of the top_k highest scores, best first.
+
+    Ties keep their original (row) order, exactly like a stable full sort.
+
+    Args:
+        scores: Scores returned by score_rows
+        top_k: Number of positions to return
+        backend: Backend that produced the scores
+
+    Returns:
+        list: Positions into `scores`
+    """
+    if top_k <= 0:
+        return []
+
+    if backend != "numpy":
+        return heapq.nlargest(top_k, range(len(scores)), key=scores.__getitem__)
+
+    n = len(scores)
+    if top_k < n:
+        # Partition around the k-th largest score; break ties on it by position
+        kth = np.partition(scores, n - top_k)[n - top_k]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:top_k - len(above)]
+        positions = np.sort(np.concatenate([above, ties]))
+    else:
+        positions = np.arange(n)
+
+    return positions[np.argsort(-scores[positions], kind="stable")].tolist()
+
+
+def top_k_rows(store, query_vector: List[float], rows=None, top_k: int = 5,
+               backend: str = "python") -> List[Tuple[int, float]]:
+    """
+    Find the top_k most similar rows without sorting every candidate.
+
+    Args:
+        store: VectorStore to scan
+        query_vector: Query vector
+        rows: Candidate rows (all live rows if None)
+        top_k: Number of rows to return
+        backend: Concrete backend name ("python" or "numpy")
+
+    Returns:
+        list: (row, score) pairs, highest score first
+    """
+    if top_k <= 0:
+        return []
+
+    if backend != "numpy":
+        # Bounded heap over the lazy scan: O(n log k) time, O(k) memory
+        return heapq.nlargest(top_k, iter_scores_python(store, query_vector, rows), key=itemgetter(1))
+
+    scored_rows, scores = score_rows_numpy(store, query_vector, rows)
+    return [(int(scored_rows[i]), float(scores[i])) for i in select_top_k(scores, top_k, backend)]
+
+
+def rows_above(store, query_vector: List[float], rows=None, min_score: float = 0.0,
+               backend: str = "python") -> List[Tuple[int, float]]:
+    """
+    Every row scoring at least `min_score`, highest score first (range search).
+
+    Args:
+        store: VectorStore to scan
+        query_vector: Query vector
+        rows: Candidate rows in storage order (all live rows if None)
+        min_score: Lowest similarity to return
+        backend: Concrete backend name ("python" or "numpy")
+
+    Returns:
+        list: (row, score) pairs, highest score first, earlier row first on ties
+    """
+    if backend != "numpy":
+        hits = [hit for hit in iter_scores_python(store, query_vector, rows) if hit[1] >= min_score]
+        hits.sort(key=lambda hit: -hit[1])
+        return hits
+
+    scored_rows, scores = score_rows_numpy(store, query_vector, rows)
+    keep = np.flatnonzero(scores >= min_score)
+    order = keep[np.argsort(-scores[keep], kind="stable")]
+    return list(zip(scored_rows[order].tolist(), scores[order].tolist()))
+
+
+def mmr_select(store, rows: List[int], scores: List[float], top_k: int, mmr_lambda: float,
+               backend: str = "python") -> List[int]:
+    """
+    Maximal marginal relevance: pick top_k candidates trading relevance for diversity.
+
+    Each step picks the candidate maximizing
+    mmr_lambda * score - (1 - mmr_lambda) * (max similarity to the picks so far).
+    The NumPy backend computes every pairwise candidate similarity in one
+    matrix product, then each step is a vectorized update; the Python
+    backend only scores candidates against the picks.
+
+    Args:
+        store: VectorStore (or snapshot) holding the candidates
+        rows: Candidate rows
+        scores: Relevance of each candidate to the query
+        top_k: Number of candidates to pick
+        mmr_lambda: 1 = relevance only, 0 = diversity only
+        backend: Concrete backend name ("python" or "numpy")
+
+    Returns:
+        list: Positions into `rows`, in pick order (ties go to the earlier position)
+    """
+    top_k = min(top_k, len(rows))
+    if top_k <= 0:
+        return []
+
+    if backend == "numpy":
+        positions = np.asarray(rows, dtype=np.intp)
+        vectors = _as_matrix(store)[positions].astype(np.float64)
+        if not store.normalize:
+            norms = np.frombuffer(store.norms, dtype=np.float64)[positions]
+            vectors /= np.where(norms > 0, norms, 1.0)[:, None]
+        pairwise = vectors @ vectors.T
+
+        relevance = mmr_lambda * np.asarray(scores, dtype=np.float64)
+        penalty = np.zeros(len(rows), dtype=np.float64)
+        remaining = np.ones(len(rows), dtype=bool)
+        picks = []
+        for _ in range(top_k):
+            gains = np.where(remaining, relevance - (1 - mmr_lambda) * penalty, -np.inf)
+            pick = int(np.argmax(gains))
+            remaining[pick] = False
+            # Penalty: highest similarity to any pick so far
+            penalty = pairwise[pick] if not picks else np.maximum(penalty, pairwise[pick])
+            picks.append(pick)
+        return picks
+
+    unit = []
+    for row in rows:
+        vector, norm = store.read(row), store.norms[row]
+        unit.append(vector if store.normalize or not norm else [x / norm for x in vector])
+
+    relevance = [mmr_lambda * score for score in scores]
+    penalty = [0.0] * len(rows)
+    remaining = list(range(len(rows)))
+    picks = []
+    for _ in range(top_k):
+        pick = max(remaining, key=lambda position: relevance[position] - (1 - mmr_lambda) * penalty[position])
+        remaining.remove(pick)
+        for position in remaining:
+            similarity = dot_product(unit[pick], unit[position])
+            penalty[position] = similarity if not picks else max(penalty[position], similarity)
+        picks.append(pick)
+    return picks
+
+
+@functools.lru_cache(maxsize=None)
+def blas_threads() -> int:
+    """
+    Threads NumPy's BLAS uses for one matrix product.
+
+    Read once, from threadpoolctl when installed, else from
+    BLAS_THREAD_VARS; without either, BLAS libraries default to one thread
+    per CPU.
+
+    Returns:
+        int: BLAS thread count (1 without NumPy)
+    """
+    if np is None:
+        return 1
+    if threadpool_info is not None:
+        counts = [lib["num_threads"] for lib in threadpool_info() if lib.get("user_api") == "blas"]
+        if counts:
+            return max(counts)
+    for name in BLAS_THREAD_VARS:
+        value = os.environ.get(name, "").strip()
+        if value.isdigit() and int(value) > 0:
+            return int(value)
+    return os.cpu_count() or 1
+
+
+def _map_shards(fn, parts) -> List:
+    """Run fn over the parts on the shared shard pool, grown to len(parts) threads if needed."""
+    global _shard_pool, _shard_pool_size
+    with _shard_pool_lock:
+        if _shard_pool_size < len(parts):
+            # Work already queued on the old pool still runs after shutdown;
+            # submitting under the lock keeps new work off it
+            if _shard_pool is not None:
+                _shard_pool.shutdown(wait=False)
+            _shard_pool = ThreadPoolExecutor(max_workers=len(parts), thread_name_prefix="vector-shard")
+            _shard_pool_size = len(parts)
+        futures = [_shard_pool.submit(fn, part) for part in parts]
+    return [future.result() for future in futures]
+
+
+def _shard_workers(workers: Optional[int], backend: str) -> int:
+    """Resolve a worker count, keeping NumPy shards x BLAS threads within the CPUs."""
+    global _oversubscription_warned
+    cpus = os.cpu_count() or 1
+    per_shard = blas_threads() if backend == "numpy" else 1
+    if workers is None:
+        return max(1, cpus // per_shard)
+    if workers < 1:
+        raise ValueError("workers must be positive")
+    if workers > 1 and workers * per_shard > cpus and not _oversubscription_warned:
+        _oversubscription_warned = True
+        hint = "; set OPENBLAS_NUM_THREADS=1 (or MKL/OMP_NUM_THREADS) when sharding" if per_shard > 1 else ""
+        warnings.warn(f"{workers} shards x {per_shard} BLAS threads exceed {cpus} CPUs{hint}",
+                      RuntimeWarning, stacklevel=3)
+    return workers
+
+
+def top_k_rows_sharded(store, query_vector: List[float], rows=None, top_k: int = 5,
+                       backend: str = "python", workers: Optional[int] = 1) -> List[Tuple[int, float]]:
+    """
+    top_k_rows() over partitions of the candidate rows scanned in parallel.
+
+    The candidates are split into up to `workers` contiguous shards (at
+    least MIN_SHARD_ROWS rows each), a thread pool selects a local top-k
+    per shard, and the local results are merged. Results match
+    `top_k_rows()`, ties included. Only the NumPy backend scales with
+    cores; the Python backend holds the GIL, so its shards run one at a time.
+
+    Args:
+        store: VectorStore to scan
+        query_vector: Query vector
+        rows: Candidate rows in storage order (all live rows if None)
+        top_k: Number of rows to return
+        backend: Concrete backend name ("python" or "numpy")
+        workers: Number of shards/threads (None = one per CPU, divided
+            by the BLAS threads per product for the NumPy backend)
+
+    Returns:
+        list: (row, score) pairs, highest score first
+
+    Raises:
+        ValueError: If workers is not positive
+    """
+    workers = _shard_workers(workers, backend)
+
+    total = store.num_rows if rows is None else len(rows)
+    shards = min(workers, total // MIN_SHARD_ROWS)
+    if top_k <= 0 or shards <= 1:
+        return top_k_rows(store, query_vector, rows, top_k, backend)
+
+    bounds = [total * i // shards for i in range(shards + 1)]
+    if rows is None:
+        parts = [range(bounds[i], bounds[i + 1]) for i in range(shards)]
+    else:
+        parts = [rows[bounds[i]:bounds[i + 1]] for i in range(shards)]
+
+    local = _map_shards(lambda part: top_k_rows(store, query_vector, part, top_k, backend), parts)
+    hits = [hit for part in local for hit in part]
+
+    # Highest score first, earlier row first on ties
+    return heapq.nsmallest(top_k, hits, key=lambda hit: (-hit[1], hit[0]))
+
+
+def _top_k_batch_python(store, queries, rows_per_query, top_k):
+    """One pass over the candidate rows per micro-batch, a bounded heap per query."""
+    prepared = []
+    for query, rows in zip(queries, rows_per_query):
+        query_norm = magnitude(query)
+        if store.normalize and query_norm > 0:
+            query = [x / query_norm for x in query]
+        prepared.append((query, query_norm, None if rows is None else set(rows)))
+
+    if any(rows is None for rows in rows_per_query):
+        candidates = [row for row, _ in store.iter_rows()]
+    else:
+        candidates = sorted(set().union(*rows_per_query))
+
+    heaps = [[] for _ in queries]
+    for row in candidates:
+        norm = store.norm(row)
+        if norm == 0:
+            continue
+        vector = store.read(row)
+        for heap, (query, query_norm, allowed) in zip(heaps, prepared):
+            if query_norm == 0 or (allowed is not None and row not in allowed):
+                continue
+            dot = dot_product(query, vector)
+            score = dot if store.normalize else dot / (norm * query_norm)
+            # (score, -row): on ties the later row is evicted first
+            if len(heap) < top_k:
+                heapq.heappush(heap, (score, -row))
+            elif (score, -row) > heap[0]:
+                heapq.heapreplace(heap, (score, -row))
+
+    return [[(-neg_row, score) for score, neg_row in sorted(heap, reverse=True)] for heap in heaps]
+
+
+def _top_k_batch_numpy(store, queries, rows_per_query, top_k):
+    """Matrix-matrix products over row tiles, keeping each tile's top-k per query."""
+    matrix = _as_matrix(store)
+    norms = np.frombuffer(store.norms, dtype=np.float64)
+    alive = np.frombuffer(store.alive, dtype=np.uint8).astype(bool) & (norms > 0)
+
+    query_matrix = np.asarray(queries, dtype=np.float64)
+    query_norms = np.sqrt(np.einsum("ij,ij->i", query_matrix, query_matrix))
+
+    allowed = []
+    for rows in rows_per_query:
+        if rows is None:
+            allowed.append(None)
+        else:
+            rows = np.unique(np.asarray(rows, dtype=np.intp))
+            allowed.append(rows[alive[rows]])
+
+    if any(rows is None for rows in allowed):
+        candidates = np.flatnonzero(alive)
+    elif allowed:
+        candidates = np.unique(np.concatenate(allowed))
+    else:
+        candidates = np.empty(0, dtype=np.intp)
+
+    # Per filtered query: sorted positions of its rows within `candidates`
+    # (both are sorted and unique), so each tile takes its slice by bisection
+    positions_per_query = [None if rows is None else np.searchsorted(candidates, rows) for rows in allowed]
+
+    # Per query: candidate rows and scores kept from every tile
+    kept_rows = [[] for _ in queries]
+    kept_scores = [[] for _ in queries]
+
+    for start in range(0, len(candidates), BATCH_CHUNK_ROWS):
+        rows = candidates[start:start + BATCH_CHUNK_ROWS]
+        scores = matrix[rows].astype(np.float64) @ query_matrix.T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if store.normalize:
+                scores /= query_norms[None, :]
+            else:
+                scores /= norms[rows][:, None] * query_norms[None, :]
+
+        for j, positions_j in enumerate(positions_per_query):
+            if query_norms[j] == 0:
+                continue
+            column = scores[:, j]
+            positions = None
+            if positions_j is not None:
+                lo, hi = np.searchsorted(positions_j, (start, start + len(rows)))
+                positions = positions_j[lo:hi] - start
+                column = column[positions]
+            if len(column) > top_k:
+                # Everything tied with the tile's k-th score may still make the cut
+                kth = np.partition(column, len(column) - top_k)[len(column) - top_k]
+                keep = np.flatnonzero(column >= kth)
+                column = column[keep]
+                positions = keep if positions is None else positions[keep]
+            kept_rows[j].append(rows if positions is None else rows[positions])
+            kept_scores[j].append(column)
+
+    results = []
+    for rows_j, scores_j in zip(kept_rows, kept_scores):
+        if not rows_j:
+            results.append([])
+            continue
+        rows_j, scores_j = np.concatenate(rows_j), np.concatenate(scores_j)
+        results.append([(int(rows_j[i]), float(scores_j[i]))
+                        for i in select_top_k(scores_j, top_k, "numpy")])
+    return results
+
+
+def top_k_rows_batch(store, query_vectors: List[List[float]], rows_per_query=None,
+                     top_k: int = 5, backend: str = "python") -> List[List[Tuple[int, float]]]:
+    """
+    Top-k rows for many queries at once, reading every candidate row once per
+    micro-batch of QUERY_BATCH queries instead of once per query.
+
+    Results match `top_k_rows()` for each query, ties included.
+
+    Args:
+        store: VectorStore to scan
+        query_vectors: Query vectors
+        rows_per_query: Candidate rows of each query (None entries, or None
+            for all queries, scan every live row)
+        top_k: Number of rows to return per query
+        backend: Concrete backend name ("python" or "numpy")
+
+    Returns:
+        list: For each query, (row, score) pairs, highest score first
+    """
+    if rows_per_query is None:
+        rows_per_query = [None] * len(query_vectors)
+
+    if top_k <= 0 or store.num_rows == 0:
+        return [[] for _ in query_vectors]
+
+    batch_fn = _top_k_batch_numpy if backend == "numpy" else _top_k_batch_python
+    results = []
+    for start in range(0, len(query_vectors), QUERY_BATCH):
+        results.extend(batch_fn(store, query_vectors[start:start + QUERY_BATCH],
+                                rows_per_query[start:start + QUERY_BATCH], top_k))
+    return results
+
+
+def summarize_scores(scores, backend: str = "python") -> dict:
+    """
+    Count, mean, min and max of a non-empty set of scores.
+
+    Args:
+        scores: Scores returned by score_rows
+        backend: Backend that produced the scores
+
+    Returns:
+        dict: Statistics as Python floats
+    """
+    if backend == "numpy":
+        return {
+            "count": int(len(scores)),
+            "mean": float(scores.mean()),
+            "min": float(scores.min()),
+            "max": float(scores.max())
+        }
+
+    return {
+        "count": len(scores),
+        "mean": sum(scores) / len(scores),
+        "min": min(scores),
+        "max": max(scores)
+    }
@@ -0,0 +1,238 @@
+"""
+LSH Index
+Random-hyperplane locality-sensitive hashing for near-duplicate candidates.
+"""
+
+import random
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .cosine_similarity import dot_product, magnitude
+from .kernels import _as_matrix, np, resolve_backend, top_k_rows
+from .vector_index import VectorIndex
+
+# Candidate pairs verified per NumPy batch
+VERIFY_BATCH = 65536
+
+
+class LSHIndex(VectorIndex):
+    """
+    Locality-sensitive hashing index over cosine similarity.
+
+    Each of `n_tables` hash tables draws `n_bits` random hyperplanes; a
+    vector's bucket key is the pattern of sides it falls on. Two vectors at
+    angle θ land on the same side of a hyperplane with probability 1 - θ/π,
+    so near-duplicates collide in at least one table with high probability
+    while unrelated vectors rarely do. Only colliding vectors are scored
+    exactly.
+
+    With the defaults (12 bits x 8 tables) a pair at similarity 0.95 collides
+    with probability ~0.93, at 0.99 with probability > 0.999.
+    """
+
+    def __init__(self, n_bits: int = 12, n_tables: int = 8, seed: Optional[int] = None,
+                 backend: str = "auto"):
+        """
+        Initialize an empty LSH index.
+
+        Args:
+            n_bits: Hyperplanes per table (more = smaller, more selective buckets)
+            n_tables: Number of hash tables (more = higher recall)
+            seed: Seed for the random hyperplanes
+            backend: Similarity backend - "auto", "python" or "numpy"
+
+        Raises:
+            ValueError: If parameters are out of range
+        """
+        super().__init__()
+        if n_bits < 1 or n_tables < 1:
+            raise ValueError("n_bits and n_tables must be positive")
+
+        self.n_bits = n_bits
+        self.n_tables = n_tables
+        self.backend = resolve_backend(backend)
+        self._rng = random.Random(seed)
+        self._planes: List[List[float]] = []
+        self._plane_matrix = None
+        self._bit_weights = None
+        self.reset()
+
+    def reset(self):
+        """Drop all hash tables."""
+        self._tables: List[Dict[int, Dict[str, None]]] = [{} for _ in range(self.n_tables)]
+        self._keys: Dict[str, Tuple[int, ...]] = {}
+
+    def build(self, db):
+        """Draw hyperplanes for the database dimension and hash every vector."""
+        if not self._planes or len(self._planes[0]) != db.dimension:
+            self._planes = [[self._rng.gauss(0.0, 1.0) for _ in range(db.dimension)]
+                            for _ in range(self.n_tables * self.n_bits)]
+            if self.backend == "numpy":
+                self._plane_matrix = np.asarray(self._planes, dtype=np.float64)
+                self._bit_weights = 1 << np.arange(self.n_bits, dtype=np.int64)
+        super().build(db)
+
+    def _hash(self, vector: List[float]) -> Tuple[int, ...]:
+        """Bucket key of a vector in every table."""
+        if self._plane_matrix is not None:
+            sides = (self._plane_matrix @ np.asarray(vector, dtype=np.float64)) >= 0
+            return tuple((sides.reshape(self.n_tables, self.n_bits) @ self._bit_weights).tolist())
+
+        keys = []
+        for t in range(self.n_tables):
+            key = 0
+            for b, plane in enumerate(self._planes[t * self.n_bits:(t + 1) * self.n_bits]):
+                if dot_product(plane, vector) >= 0:
+                    key |= 1 << b
+            keys.append(key)
+        return tuple(keys)
+
+    def on_add(self, vector_id: str):
+        """Hash a vector into every table."""
+        store = self.db.store
+        row = store.row_of(vector_id)
+        if row is None or store.norm(row) == 0:
+            # Zero vectors can never be returned by a cosine search
+            return
+
+        keys = self._hash(store.read(row))
+        self._keys[vector_id] = keys
+        for table, key in zip(self._tables, keys):
+            table.setdefault(key, {})[vector_id] = None
+
+    def on_delete(self, vector_id: str):
+        """Remove a vector from every table."""
+        keys = self._keys.pop(vector_id, None)
+        if keys is None:
+            return
+
+        for table, key in zip(self._tables, keys):
+            bucket = table[key]
+            del bucket[vector_id]
+            if not bucket:
+                del table[key]
+
+    def candidates(self, vector: List[float]) -> Set[str]:
+        """IDs sharing a bucket with a vector in at least one table."""
+        found = set()
+        for table, key in zip(self._tables, self._hash(vector)):
+            found.update(table.get(key, ()))
+        return found
+
+    def search(self, query_vector: List[float], top_k: int,
+               allowed: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Approximate top-k search over the colliding buckets.
+
+        Args:
+            query_vector: Query vector
+            top_k: Number of results to return
+            allowed: Optional set of IDs results are restricted to
+
+        Returns:
+            list: (vector_id, similarity) pairs, highest similarity first
+        """
+        if magnitude(query_vector) == 0:
+            return []
+
+        store = self.db.store
+        found = self.candidates(query_vector)
+        if allowed is not None:
+            found &= allowed
+        rows = sorted(store.row_of(vid) for vid in found)
+
+        hits = top_k_rows(store, query_vector, rows, top_k, self.backend)
+        return [(store.row_id(row), score) for row, score in hits]
+
+    def query_similar(self, vector: List[float], threshold: float) -> List[Tuple[str, float]]:
+        """
+        Indexed vectors with cosine similarity >= threshold to a (new) vector.
+
+        Only colliding candidates are scored, so this is cheap enough to run
+        on every insert.
+
+        Args:
+            vector: Vector to check, not necessarily stored
+            threshold: Minimum cosine similarity
+
+        Returns:
+            list: (vector_id, similarity) pairs, highest similarity first
+        """
+        with self.lock.read():
+            hits = self.search(vector, len(self._keys))
+        return [(vid, score) for vid, score in hits if score >= threshold]
+
+    def candidate_pairs(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yield every pair of IDs that collides in at least one table, once.
+
+        A pair is reported by the first table it collides in, so no set of
+        seen pairs is kept. The buckets are copied up front, so the index
+        may change while the pairs are consumed.
+        """
+        with self.lock.read():
+            tables = [[list(bucket) for bucket in table.values()] for table in self._tables]
+            keys = dict(self._keys)
+
+        for t, buckets in enumerate(tables):
+            for ids in buckets:
+                for i, id1 in enumerate(ids):
+                    keys1 = keys[id1]
+                    for id2 in ids[i + 1:]:
+                        keys2 = keys[id2]
+                        if any(keys1[s] == keys2[s] for s in range(t)):
+                            continue
+                        yield id1, id2
+
+    def _verify(self, store, pairs: List[Tuple[int, int]], threshold: float) -> List[Tuple[int, int, float]]:
+        """Exact cosine similarity of row pairs, keeping those >= threshold."""
+        if self.backend == "numpy" and pairs:
+            matrix = _as_matrix(store)
+            norms = np.frombuffer(store.norms, dtype=np.float64)
+            rows_a, rows_b = np.asarray(pairs, dtype=np.intp).T
+            dots = np.einsum("ij,ij->i", matrix[rows_a].astype(np.float64), matrix[rows_b].astype(np.float64))
+            sims = dots if store.normalize else dots / (norms[rows_a] * norms[rows_b])
+            keep = np.flatnonzero(sims >= threshold)
+            return list(zip(rows_a[keep].tolist(), rows_b[keep].tolist(), sims[keep].tolist()))
+
+        verified = []
+        for row_a, row_b in pairs:
+            dot = dot_product(store.read(row_a), store.read(row_b))
+            sim = dot if store.normalize else dot / (store.norm(row_a) * store.norm(row_b))
+            if sim >= threshold:
+                verified.append((row_a, row_b, sim))
+        return verified
+
+    def iter_similar_pairs(self, threshold: float, store=None) -> Iterator[Tuple[int, int, float]]:
+        """
+        Lazily yield colliding row pairs with cosine similarity >= threshold.
+
+        Args:
+            threshold: Minimum cosine similarity
+            store: Store or StoreSnapshot the rows refer to (defaults to
+                db.store); pairs with a vector not live in it are skipped
+
+        Yields:
+            tuple: (row_a, row_b, similarity), row_a stored before row_b
+        """
+        store = store if store is not None else self.db.store
+        batch = []
+        for id1, id2 in self.candidate_pairs():
+            row_a, row_b = store.row_of(id1), store.row_of(id2)
+            if row_a is None or row_b is None:
+                continue
+            batch.append((min(row_a, row_b), max(row_a, row_b)))
+            if len(batch) >= VERIFY_BATCH:
+                yield from self._verify(store, batch, threshold)
+                batch = []
+        yield from self._verify(store, batch, threshold)
+
+    def bucket_sizes(self) -> List[int]:
+        """Number of vectors in each non-empty bucket, over all tables."""
+        return [len(bucket) for table in self._tables for bucket in table.values()]
+
+    def __len__(self):
+        """Return number of indexed vectors."""
+        return len(self._keys)
+
+    def __repr__(self):
+        return f"LSHIndex(n_bits={self.n_bits}, n_tables={self.n_tables}, vectors={len(self)})"
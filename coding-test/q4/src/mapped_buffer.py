@@ -0,0 +1,127 @@
+"""
+Mapped Buffer
+Growable vector buffer backed by a memory-mapped file, for stores larger than RAM.
+
+The file grows in fixed-size segments. After each growth the whole file is
+mapped again as one contiguous region, so kernels keep reading it as a
+single (rows x dimension) buffer while the OS page cache decides which
+parts stay resident. The file is never shrunk, so views handed out before
+a growth or a compaction stay valid.
+"""
+
+import mmap
+import os
+from array import array
+from typing import Optional
+
+# Default growth step; rounded up to the mmap allocation granularity
+SEGMENT_BYTES = 64 * 1024 * 1024
+
+
+class MappedBuffer:
+    """
+    File-backed stand-in for the `array` that holds a VectorStore's vectors.
+
+    Supports the operations the store uses on its buffer: len, extend,
+    slice reads and slice assignment. `buffer` exposes the used part as a
+    writable memoryview for NumPy and the binary writer.
+
+    The file is working storage, not a snapshot: its contents are
+    overwritten when a store is opened on it. Persist the database with
+    `VectorDB.save()` (and the WAL) as usual.
+    """
+
+    def __init__(self, path: str, typecode: str, segment_bytes: int = SEGMENT_BYTES):
+        """
+        Open (or create) the backing file.
+
+        Args:
+            path: Path of the backing file
+            typecode: array module typecode of the stored values
+            segment_bytes: Bytes the file grows by when it is full
+
+        Raises:
+            ValueError: If segment_bytes is not positive
+        """
+        if segment_bytes < 1:
+            raise ValueError("segment_bytes must be positive")
+
+        granularity = mmap.ALLOCATIONGRANULARITY
+        self.path = path
+        self.typecode = typecode
+        self.itemsize = array(typecode).itemsize
+        self.segment_bytes = -(-segment_bytes // granularity) * granularity
+        self._file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        self._length = 0
+        self._map: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+
+        size = os.fstat(self._file.fileno()).st_size
+        if size:
+            self._remap(-(-size // self.segment_bytes) * self.segment_bytes)
+
+    def _remap(self, size: int):
+        """Grow the file to `size` bytes and map all of it."""
+        if size > os.fstat(self._file.fileno()).st_size:
+            self._file.truncate(size)
+        # The previous mapping is released once no view refers to it
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._view = memoryview(self._map).cast(self.typecode)
+
+    def _reserve(self, items: int):
+        """Make room for at least `items` values, growing by whole segments."""
+        if items <= self.capacity:
+            return
+        segments = -(-items * self.itemsize // self.segment_bytes)
+        self._remap(segments * self.segment_bytes)
+
+    @property
+    def capacity(self) -> int:
+        """Number of values the mapped file can hold without growing."""
+        return len(self._view) if self._view is not None else 0
+
+    @property
+    def segments(self) -> int:
+        """Number of segments the file has grown to."""
+        return self.capacity * self.itemsize // self.segment_bytes
+
+    @property
+    def buffer(self):
+        """Writable view of the used values (an empty array before the first write)."""
+        if self._view is None:
+            return array(self.typecode)
+        return self._view[:self._length]
+
+    def extend(self, values):
+        """Append values (an array or memoryview of this typecode)."""
+        count = len(values)
+        self._reserve(self._length + count)
+        self._view[self._length:self._length + count] = values
+        self._length += count
+
+    def truncate(self, length: int):
+        """Forget values past `length`; the file keeps its size."""
+        self._length = min(length, self._length)
+
+    def flush(self):
+        """Write dirty pages back to the file."""
+        if self._map is not None:
+            self._map.flush()
+
+    def close(self):
+        """Close the file handle. Existing views stay readable; the buffer can't grow."""
+        self._file.close()
+
+    def __getitem__(self, key):
+        return self.buffer[key]
+
+    def __setitem__(self, key, values):
+        self.buffer[key] = values
+
+    def __len__(self):
+        """Return number of used values."""
+        return self._length
+
+    def __repr__(self):
+        return (f"MappedBuffer(path='{self.path}', typecode='{self.typecode}', "
+                f"length={self._length}, segments={self.segments})")
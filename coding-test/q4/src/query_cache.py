@@ -0,0 +1,139 @@
+"""
+Query Result Cache
+LRU cache of search results, invalidated by the DB's version counter.
+
+VectorDB bumps `version` on every add, update, delete, load and index
+attach/detach. Each cached result remembers the version it was computed
+at, so the first lookup after a mutation misses and recomputes instead of
+returning stale hits. Entries can also expire after a TTL.
+
+Keys are built from the exact query vector bytes, top_k, the filter spec
+and any search options. Callable filters cannot be compared, so searches
+using them bypass the cache.
+"""
+
+import json
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+
+def query_key(query_vector: List[float], top_k: int, filter_spec: Optional[dict] = None,
+              **options) -> Optional[Hashable]:
+    """
+    Cache key of a search, or None if it cannot be cached.
+
+    Args:
+        query_vector: Query vector
+        top_k: Number of results
+        filter_spec: Filter spec (dict) or None; callables are not cacheable
+        **options: Other parameters that change the result (index name,
+            index parameters, ...)
+
+    Returns:
+        Hashable key, or None for callable filters and unhashable options
+    """
+    if filter_spec is not None and not isinstance(filter_spec, dict):
+        return None
+    try:
+        spec = json.dumps(filter_spec, sort_keys=True) if filter_spec else None
+        return (array("d", query_vector).tobytes(), top_k, spec, json.dumps(options, sort_keys=True))
+    except TypeError:
+        return None
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of search results with optional TTL.
+
+    Args:
+        max_entries: Entries kept before the least recently used is evicted
+        ttl: Seconds an entry stays valid (None = until the DB changes)
+
+    Raises:
+        ValueError: If max_entries is negative or ttl is not positive
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        if max_entries < 0:
+            raise ValueError("max_entries must be non-negative")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive")
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int) -> Optional[List[Any]]:
+        """
+        Cached results for a key, if computed at this DB version and not expired.
+
+        Args:
+            key: Key from query_key()
+            version: Current DB version
+
+        Returns:
+            list: Copy of the cached results, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, expires, results = entry
+                if entry_version == version and (expires is None or time.monotonic() < expires):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return list(results)
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, version: int, results: List[Any]):
+        """
+        Store results computed at a DB version.
+
+        Args:
+            key: Key from query_key()
+            version: DB version read before the results were computed
+            results: Search results
+        """
+        if self.max_entries == 0:
+            return
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (version, expires, list(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Cache statistics.
+
+        Returns:
+            dict: hits, misses, hit_rate, size and max_entries
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"QueryCache(size={len(self._entries)}, hits={self.hits}, misses={self.misses})"
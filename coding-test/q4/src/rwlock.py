@@ -0,0 +1,132 @@
+"""
+Readers-Writer Lock
+Lets any number of threads share a section that a writer then gets exclusively.
+
+Readers only wait while a write is running or queued; a write waits for the
+readers already inside to finish. Queued writers block new readers, so a
+steady stream of readers cannot starve a writer. VectorDB keeps its
+exclusive sections short (publishing one mutation) or rare (compaction,
+loading); searches score a snapshot outside of them.
+
+Both sides are reentrant per thread: a reader may read again, and a writer
+may read or write again. Upgrading a read to a write would deadlock against
+another reader doing the same, so it raises instead.
+"""
+
+import functools
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """Writer-preferring, reentrant readers-writer lock."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()
+
+    def _read_depth(self) -> int:
+        return getattr(self._local, "depth", 0)
+
+    def acquire_read(self):
+        """Enter a shared (read) section, waiting for running or queued writers."""
+        depth = self._read_depth()
+        if depth == 0 and self._writer != threading.get_ident():
+            with self._cond:
+                while self._writer is not None or self._writers_waiting:
+                    self._cond.wait()
+                self._readers += 1
+            self._local.registered = True
+        elif depth == 0:
+            # The writing thread reads without registering as a reader
+            self._local.registered = False
+        self._local.depth = depth + 1
+
+    def release_read(self):
+        """Leave a shared (read) section."""
+        self._local.depth -= 1
+        if self._local.depth == 0 and self._local.registered:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    def acquire_write(self):
+        """
+        Enter the exclusive (write) section, waiting for current readers to leave.
+
+        Raises:
+            RuntimeError: If the calling thread holds only a read lock
+        """
+        me = threading.get_ident()
+        if self._writer == me:
+            self._write_depth += 1
+            return
+        if self._read_depth():
+            raise RuntimeError("Cannot acquire the write lock while holding a read lock")
+
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        """Leave the exclusive (write) section."""
+        self._write_depth -= 1
+        if self._write_depth == 0:
+            with self._cond:
+                self._writer = None
+                if self._read_depth() and not self._local.registered:
+                    # Still reading: become a regular reader
+                    self._readers += 1
+                    self._local.registered = True
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        """Context manager for a shared (read) section."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """Context manager for the exclusive (write) section."""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def __repr__(self):
+        return (f"ReadWriteLock(readers={self._readers}, writing={self._writer is not None}, "
+                f"writers_waiting={self._writers_waiting})")
+
+
+def reads(method):
+    """Run a method under `self.lock.read()`."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def writes(method):
+    """Run a method under `self.lock.write()`."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    return wrapper
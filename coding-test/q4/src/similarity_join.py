@@ -0,0 +1,158 @@
+"""
+Similarity Join
+All pairs of stored vectors whose cosine similarity reaches a threshold.
+
+The live rows are split into blocks of `block_rows` unit vectors and every
+pair of blocks (a tile) is scored at once - one matrix-matrix product per
+tile with the NumPy backend. Only pairs above the threshold leave a tile, so
+memory is bounded by the tile size rather than by n².
+
+Tiles are independent, so they can be spread over a process pool. Workers
+receive the vector buffer once, when they start, and then only tile
+coordinates.
+"""
+
+import os
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from .cosine_similarity import dot_product
+from .kernels import _as_matrix, np
+from .vector_store import storage_typecode, unpack_values
+
+# Rows per block; a NumPy tile holds block_rows² float64 scores (8 MB at 1024)
+BLOCK_ROWS = 1024
+
+# Per-process state for pool workers, set by _init_worker
+_worker_state = None
+
+
+def _unit_rows_python(data, typecode: str, norms, dim: int, rows, normalize: bool) -> List[List[float]]:
+    unit = []
+    for row in rows:
+        vector = unpack_values(data[row * dim:(row + 1) * dim], typecode)
+        if not normalize:
+            norm = norms[row]
+            vector = [x / norm for x in vector]
+        unit.append(vector)
+    return unit
+
+
+def _tile_python(state, rows_i, rows_j, diagonal: bool):
+    data, typecode, norms, dim, normalize, threshold = state
+    block_i = _unit_rows_python(data, typecode, norms, dim, rows_i, normalize)
+    block_j = block_i if diagonal else _unit_rows_python(data, typecode, norms, dim, rows_j, normalize)
+
+    pairs = []
+    for a, (row_a, u) in enumerate(zip(rows_i, block_i)):
+        start = a + 1 if diagonal else 0
+        for row_b, v in zip(rows_j[start:], block_j[start:]):
+            sim = dot_product(u, v)
+            if sim >= threshold:
+                pairs.append((row_a, row_b, sim))
+    return pairs
+
+
+def _unit_rows_numpy(matrix, norms, rows, normalize: bool):
+    block = matrix[rows].astype(np.float64)
+    if not normalize:
+        block /= norms[rows][:, None]
+    return block
+
+
+def _tile_numpy(state, rows_i, rows_j, diagonal: bool):
+    matrix, _, norms, _, normalize, threshold = state
+    block_i = _unit_rows_numpy(matrix, norms, rows_i, normalize)
+    block_j = block_i if diagonal else _unit_rows_numpy(matrix, norms, rows_j, normalize)
+
+    sims = block_i @ block_j.T
+    hits_i, hits_j = np.nonzero(sims >= threshold)
+    if diagonal:
+        upper = hits_j > hits_i
+        hits_i, hits_j = hits_i[upper], hits_j[upper]
+    return list(zip(rows_i[hits_i].tolist(), rows_j[hits_j].tolist(), sims[hits_i, hits_j].tolist()))
+
+
+def _score_tile(state, backend: str, rows_i, rows_j, diagonal: bool):
+    if backend == "numpy":
+        return _tile_numpy(state, rows_i, rows_j, diagonal)
+    return _tile_python(state, rows_i, rows_j, diagonal)
+
+
+def _init_worker(state, backend: str):
+    global _worker_state
+    _worker_state = (state, backend)
+
+
+def _score_tile_in_worker(rows_i, rows_j, diagonal: bool):
+    state, backend = _worker_state
+    return _score_tile(state, backend, rows_i, rows_j, diagonal)
+
+
+def iter_similar_pairs(store, threshold: float, block_rows: int = BLOCK_ROWS,
+                       workers: Optional[int] = 1,
+                       backend: str = "python") -> Iterator[Tuple[int, int, float]]:
+    """
+    Lazily yield every pair of live rows with cosine similarity >= threshold.
+
+    Pairs come tile by tile: within a tile in (row_a, row_b) order, with
+    row_a stored before row_b. Zero vectors never match.
+
+    Args:
+        store: VectorStore to join with itself
+        threshold: Minimum cosine similarity
+        block_rows: Rows per block (tiles are block_rows x block_rows)
+        workers: Number of worker processes (1 = in-process, None = one
+            per CPU)
+        backend: Concrete backend name ("python" or "numpy")
+
+    Yields:
+        tuple: (row_a, row_b, similarity)
+
+    Raises:
+        ValueError: If block_rows or workers is not positive
+    """
+    if block_rows < 1:
+        raise ValueError("block_rows must be positive")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be positive")
+
+    live = [row for row, _ in store.iter_rows() if store.norm(row) > 0]
+    blocks = [live[start:start + block_rows] for start in range(0, len(live), block_rows)]
+
+    if backend == "numpy":
+        blocks = [np.asarray(block, dtype=np.intp) for block in blocks]
+        matrix = _as_matrix(store)
+        norms = np.frombuffer(store.norms, dtype=np.float64)
+        if workers > 1:
+            # Mapped buffers can't be sent to workers; copy them once
+            matrix, norms = np.array(matrix), np.array(norms)
+        state = (matrix, store.typecode, norms, store.dimension, store.normalize, threshold)
+    else:
+        data, norms = store.buffer, store.norms
+        if workers > 1 and isinstance(data, memoryview):
+            data, norms = array(storage_typecode(store.typecode), data), array("d", norms)
+        state = (data, store.typecode, norms, store.dimension, store.normalize, threshold)
+
+    tiles = ((blocks[i], blocks[j], i == j)
+             for i in range(len(blocks)) for j in range(i, len(blocks)))
+
+    if workers == 1 or len(blocks) <= 1:
+        for rows_i, rows_j, diagonal in tiles:
+            yield from _score_tile(state, backend, rows_i, rows_j, diagonal)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(state, backend)) as pool:
+        # Keep a bounded number of tiles in flight so results never pile up
+        pending = deque()
+        for tile in tiles:
+            pending.append(pool.submit(_score_tile_in_worker, *tile))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
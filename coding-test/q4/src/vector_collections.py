@@ -0,0 +1,424 @@
+"""
+Vector Collections
+Named collections of vectors, each with its own block and indexes, in one DB.
+
+Each collection is a VectorDB: its own contiguous vector block, metadata
+indexes and attached indexes (e.g. HNSW on one collection, nothing or IVF
+on another). Searching a collection only scans that collection's vectors;
+`search()` can also fan out over several collections and merge the results
+by score.
+
+On disk the DB is a directory holding a manifest and one file per collection:
+
+    <directory>/manifest.json      name, created_at and the settings of each collection
+    <directory>/<collection>.vdb   one collection (binary format, memory-mapped on load)
+
+so every collection can also log to its own write-ahead log (`enable_wal()`).
+"""
+
+import heapq
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .rwlock import ReadWriteLock, reads, writes
+from .vector_db import VectorDB
+from .vector_search import VectorSearch
+from .vector_store import DTYPES
+
+MANIFEST = "manifest.json"
+
+# Collection names double as file names
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class VectorCollections:
+    """
+    Named VectorDB collections persisted together.
+
+    `lock` guards the set of collections: creating, dropping and loading
+    take it exclusively, lookups and searches share it. Each collection
+    keeps its own locks for its vectors.
+    """
+
+    def __init__(self, dimension: int, name: str = "vector_collections", normalize: bool = False,
+                 dtype: str = "float32", backend: str = "auto"):
+        """
+        Initialize an empty set of collections.
+
+        Args:
+            dimension: Default vector dimension of new collections
+            name: Name of the database
+            normalize: Default normalize-on-insert mode of new collections
+            dtype: Default storage dtype of new collections
+            backend: Similarity backend of the per-collection searchers
+
+        Raises:
+            ValueError: If the dtype is not supported
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}'. Expected one of {tuple(DTYPES)}")
+
+        self.dimension = dimension
+        self.name = name
+        self.normalize = normalize
+        self.dtype = dtype
+        self.backend = backend
+        self.collections: Dict[str, VectorDB] = {}
+        self._searchers: Dict[str, VectorSearch] = {}
+        self.lock = ReadWriteLock()
+        self.created_at = datetime.now().isoformat()
+        # Set by enable_wal(): collections created later log there too
+        self._wal_directory = None
+        self._wal_options: Dict[str, Any] = {}
+
+    @writes
+    def create_collection(self, name: str, dimension: Optional[int] = None,
+                          normalize: Optional[bool] = None, dtype: Optional[str] = None) -> VectorDB:
+        """
+        Create an empty collection.
+
+        Args:
+            name: Collection name (letters, digits, "_" and "-")
+            dimension: Vector dimension (defaults to the DB's)
+            normalize: Normalize-on-insert mode (defaults to the DB's)
+            dtype: Storage dtype (defaults to the DB's)
+
+        Returns:
+            VectorDB: The new collection
+
+        Raises:
+            ValueError: If the name is invalid or already used
+        """
+        if not isinstance(name, str) or not _NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid collection name {name!r}: use letters, digits, '_' and '-'")
+        if name in self.collections:
+            raise ValueError(f"Collection '{name}' already exists")
+
+        db = VectorDB(dimension=dimension or self.dimension, name=name,
+                      normalize=self.normalize if normalize is None else normalize,
+                      dtype=dtype or self.dtype)
+        self.collections[name] = db
+        self._searchers[name] = VectorSearch(db, backend=self.backend)
+
+        if self._wal_directory is not None:
+            db.enable_wal(self._collection_path(self._wal_directory, name), **self._wal_options)
+            self._write_manifest(self._wal_directory)
+        return db
+
+    @writes
+    def drop_collection(self, name: str) -> bool:
+        """
+        Drop a collection and, with a WAL enabled, its files.
+
+        Args:
+            name: Collection name
+
+        Returns:
+            bool: True if dropped, False if not found
+        """
+        db = self.collections.pop(name, None)
+        if db is None:
+            return False
+        self._searchers.pop(name, None)
+
+        self._close_collection(db)
+        if self._wal_directory is not None:
+            self._write_manifest(self._wal_directory)
+            path = self._collection_path(self._wal_directory, name)
+            for stale in (path, path + ".wal"):
+                if os.path.exists(stale):
+                    os.remove(stale)
+        return True
+
+    @staticmethod
+    def _close_collection(db: VectorDB):
+        """Close the log and vector file of a collection that is no longer used."""
+        if db.wal is not None:
+            db.wal.close()
+            db.wal = None
+        db.store.close()
+
+    @reads
+    def collection(self, name: str) -> VectorDB:
+        """
+        Get a collection by name.
+
+        Raises:
+            ValueError: If the collection does not exist
+        """
+        if name not in self.collections:
+            raise ValueError(f"Collection '{name}' not found")
+        return self.collections[name]
+
+    @reads
+    def searcher(self, name: str) -> VectorSearch:
+        """
+        VectorSearch over one collection (kept per collection, with its query cache).
+
+        Raises:
+            ValueError: If the collection does not exist
+        """
+        if name not in self._searchers:
+            raise ValueError(f"Collection '{name}' not found")
+        return self._searchers[name]
+
+    def list_collections(self) -> List[str]:
+        """Collection names in creation order."""
+        return list(self.collections)
+
+    @reads
+    def search(self,
+               query_vector: List[float],
+               top_k: int = 5,
+               collections: Optional[List[str]] = None,
+               filter_fn: Optional[Union[Callable, dict]] = None,
+               indexes: Optional[Dict[str, str]] = None,
+               **index_params) -> List[Tuple[str, str, float, dict]]:
+        """
+        Search one or more collections and merge the results by score.
+
+        Each collection is searched on its own (only its vectors are
+        scanned, with its own index if one is named), then the per-collection
+        top-k lists are merged.
+
+        Args:
+            query_vector: Query vector
+            top_k: Number of results to return
+            collections: Collections to search (all if None)
+            filter_fn: Optional metadata filter function or spec, applied
+                in every searched collection
+            indexes: Attached index to use per collection, e.g.
+                {"items": "hnsw"}; collections not listed are scanned exactly
+            **index_params: Index-specific parameters (see VectorSearch.search())
+
+        Returns:
+            list: (collection, vector_id, similarity_score, metadata) tuples,
+                  highest similarity first (ties in collection order)
+
+        Raises:
+            ValueError: If a collection does not exist or a search fails
+                (e.g. dimension mismatch)
+        """
+        names = self.list_collections() if collections is None else list(collections)
+        indexes = indexes or {}
+
+        hits = []
+        for position, name in enumerate(names):
+            index = indexes.get(name)
+            results = self.searcher(name).search(query_vector, top_k, filter_fn, index,
+                                                 **(index_params if index else {}))
+            hits.extend((position, rank, name, vid, score, metadata)
+                        for rank, (vid, score, metadata) in enumerate(results))
+
+        best = heapq.nsmallest(top_k, hits, key=lambda hit: (-hit[4], hit[0], hit[1]))
+        return [(name, vid, score, metadata) for _, _, name, vid, score, metadata in best]
+
+    @reads
+    def get_vector(self, vector_id: str, collection: Optional[str] = None) -> Optional[Dict]:
+        """
+        Retrieve a vector by ID from one collection, or from the first collection holding it.
+
+        Args:
+            vector_id: Vector identifier
+            collection: Collection to look in (all if None)
+
+        Returns:
+            dict: Vector data with metadata and its collection, or None if not found
+        """
+        names = self.list_collections() if collection is None else [collection]
+        for name in names:
+            entry = self.collection(name).get_vector(vector_id)
+            if entry is not None:
+                entry["collection"] = name
+                return entry
+        return None
+
+    @staticmethod
+    def _collection_path(directory: str, name: str, binary: bool = True) -> str:
+        return os.path.join(directory, name + (".vdb" if binary else ".json"))
+
+    def _write_manifest(self, directory: str, binary: bool = True):
+        """Write the manifest atomically (a crash leaves the old one)."""
+        manifest = {
+            "name": self.name,
+            "created_at": self.created_at,
+            "collections": {
+                name: {
+                    "file": os.path.basename(self._collection_path(directory, name, binary)),
+                    "dimension": db.dimension,
+                    "normalize": db.normalize,
+                    "dtype": db.dtype
+                }
+                for name, db in self.collections.items()
+            }
+        }
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, MANIFEST + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(directory, MANIFEST))
+
+    @reads
+    def save(self, directory: str, binary: bool = True) -> bool:
+        """
+        Save every collection and the manifest into a directory.
+
+        Args:
+            directory: Target directory (created if missing)
+            binary: Write collections in the binary format (else JSON)
+
+        Returns:
+            bool: True if saved successfully
+        """
+        try:
+            os.makedirs(directory, exist_ok=True)
+            for name, db in self.collections.items():
+                if not db.save(self._collection_path(directory, name, binary), binary=binary):
+                    return False
+            self._write_manifest(directory, binary)
+            return True
+        except Exception as e:
+            print(f"Error saving collections: {e}")
+            return False
+
+    @writes
+    def load(self, directory: str, mmap_vectors: bool = True) -> bool:
+        """
+        Load the collections listed in a directory's manifest.
+
+        Collections that already exist are reloaded in place, so their
+        attached indexes are rebuilt over the loaded vectors; a collection
+        whose dimension changed is replaced by a new VectorDB (with a new
+        searcher), and collections missing from the manifest are dropped. A collection whose file was
+        never written (e.g. only logged so far) loads empty.
+
+        Args:
+            directory: Directory written by save()
+            mmap_vectors: Memory-map binary vector blocks (see VectorDB.load())
+
+        Returns:
+            bool: True if loaded successfully
+        """
+        try:
+            with open(os.path.join(directory, MANIFEST), 'r') as f:
+                manifest = json.load(f)
+
+            collections = {}
+            for name, entry in manifest["collections"].items():
+                db = self.collections.get(name)
+                if db is None or db.dimension != entry["dimension"]:
+                    db = VectorDB(dimension=entry["dimension"], name=name,
+                                  normalize=entry["normalize"], dtype=entry["dtype"])
+                path = os.path.join(directory, entry["file"])
+                if os.path.exists(path) and not db.load(path, mmap_vectors=mmap_vectors):
+                    return False
+                collections[name] = db
+
+            self.name = manifest["name"]
+            self.created_at = manifest["created_at"]
+            # Collections dropped or replaced (e.g. new dimension) lose their
+            # files and searchers; a searcher is only kept for the same VectorDB
+            for name, old in self.collections.items():
+                if collections.get(name) is not old:
+                    self._close_collection(old)
+            searchers = {}
+            for name, db in collections.items():
+                searcher = self._searchers.get(name)
+                searchers[name] = searcher if searcher is not None and searcher.db is db \
+                    else VectorSearch(db, backend=self.backend)
+
+            self.collections = collections
+            self._searchers = searchers
+            return True
+        except Exception as e:
+            print(f"Error loading collections: {e}")
+            return False
+
+    @writes
+    def enable_wal(self, directory: str, **wal_options) -> int:
+        """
+        Log mutations of every collection to its own write-ahead log in a directory.
+
+        Each collection checkpoints into `<directory>/<collection>.vdb`;
+        collections created later log there as well. Call right after
+        `load(directory)` so logged records replay on top of the snapshots.
+
+        Args:
+            directory: DB directory
+            **wal_options: Options of VectorDB.enable_wal() (checkpoint_bytes, ...)
+
+        Returns:
+            int: Number of log records replayed over all collections
+        """
+        self._write_manifest(directory)
+        replayed = 0
+        for name, db in self.collections.items():
+            replayed += db.enable_wal(self._collection_path(directory, name), **wal_options)
+        self._wal_directory = directory
+        self._wal_options = wal_options
+        return replayed
+
+    @reads
+    def flush(self):
+        """Make every logged mutation durable (fsync each collection's WAL)."""
+        for db in self.collections.values():
+            db.flush()
+
+    @reads
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics of every collection.
+
+        Returns:
+            dict: name, collection count, total_vectors, dimension and
+                  per-collection stats
+        """
+        stats = {name: db.get_stats() for name, db in self.collections.items()}
+        return {
+            "name": self.name,
+            "collection_count": len(stats),
+            "total_vectors": sum(s["total_vectors"] for s in stats.values()),
+            "dimension": self.dimension,
+            "collections": stats
+        }
+
+    def __len__(self):
+        """Return the number of vectors over all collections."""
+        return sum(len(db) for db in self.collections.values())
+
+    def __contains__(self, name):
+        """Check if a collection exists."""
+        return name in self.collections
+
+    def __getitem__(self, name):
+        return self.collection(name)
+
+    def __repr__(self):
+        return f"VectorCollections(name='{self.name}', collections={self.list_collections()}, vectors={len(self)})"
+
+
+if __name__ == "__main__":
+    print("Testing VectorCollections")
+    print("=" * 50)
+
+    db = VectorCollections(dimension=3, name="shop")
+    receipts = db.create_collection("receipts")
+    items = db.create_collection("items")
+    receipts.add_vector("r1", [1.0, 0.0, 0.0], {"store": "A"})
+    receipts.add_vector("r2", [0.0, 1.0, 0.0], {"store": "B"})
+    items.add_vector("i1", [0.9, 0.1, 0.0], {"name": "rice"})
+    items.add_vector("i2", [0.0, 0.0, 1.0], {"name": "tea"})
+    print(db)
+
+    print("\nItems only:")
+    for vid, sim, meta in db.searcher("items").search([1.0, 0.0, 0.0], top_k=2):
+        print(f"  {vid}: {sim:.4f} {meta}")
+
+    print("\nFan-out over every collection:")
+    for collection, vid, sim, meta in db.search([1.0, 0.0, 0.0], top_k=3):
+        print(f"  {collection}/{vid}: {sim:.4f} {meta}")
+
+    print("\nAll tests completed!")
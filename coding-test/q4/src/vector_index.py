@@ -0,0 +1,85 @@
+"""
+Vector Index Interface
+Base class for secondary indexes attached to a VectorDB.
+"""
+
+from typing import List, Optional, Set, Tuple
+
+from .rwlock import ReadWriteLock
+
+
+class VectorIndex:
+    """
+    Base class for indexes attached to a VectorDB with `attach_index()`.
+
+    The database calls the `on_*` hooks on every mutation, so an attached
+    index follows `add_vector`/`update_vector`/`delete_vector` incrementally.
+    Indexes refer to vectors by ID and read vector data from `db.store`, so
+    compaction does not invalidate them.
+
+    The database runs each hook under `lock` held exclusively and each
+    search under it shared. Expensive work such as (re)training belongs in
+    `maintain()`, which runs after the hook without the lock and publishes
+    its result in one step with `_publish()`, so searches keep using the
+    old state meanwhile.
+    """
+
+    def __init__(self):
+        self.db = None
+        self.lock = ReadWriteLock()
+
+    def build(self, db):
+        """
+        (Re)build the index over every vector currently in a database.
+
+        Args:
+            db: VectorDB the index is attached to
+        """
+        self.db = db
+        self.reset()
+        for vector_id in db.get_all_ids():
+            self.on_add(vector_id)
+
+    def reset(self):
+        """Drop all indexed data."""
+        raise NotImplementedError
+
+    def on_add(self, vector_id: str):
+        """Index a vector that was just added to the database."""
+        raise NotImplementedError
+
+    def on_update(self, vector_id: str):
+        """Re-index a vector whose data was just updated."""
+        self.on_delete(vector_id)
+        self.on_add(vector_id)
+
+    def on_delete(self, vector_id: str):
+        """Remove a vector that is about to be deleted (its data is still readable)."""
+        raise NotImplementedError
+
+    def on_metadata_update(self, vector_id: str):
+        """React to a metadata-only update (vector indexes have nothing to do)."""
+
+    def maintain(self):
+        """Deferred work after a hook, e.g. retraining once enough vectors changed."""
+
+    def _publish(self, rebuilt: "VectorIndex"):
+        """Adopt the state of a rebuilt copy of this index in one step."""
+        with self.lock.write():
+            self.__dict__.update(rebuilt.__dict__)
+
+    def search(self, query_vector: List[float], top_k: int,
+               allowed: Optional[Set[str]] = None, **params) -> List[Tuple[str, float]]:
+        """
+        Find vectors similar to a query.
+
+        Args:
+            query_vector: Query vector
+            top_k: Number of results to return
+            allowed: Optional set of IDs results are restricted to
+            **params: Index-specific search parameters
+
+        Returns:
+            list: (vector_id, similarity) pairs, highest similarity first
+        """
+        raise NotImplementedError
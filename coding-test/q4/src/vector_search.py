@@ -3,81 +3,376 @@ Vector Search Implementation
 Search for similar vectors using cosine similarity.
 """
 
-from typing import List, Tuple, Optional, Callable
+import functools
+import math
+import time
+from typing import Iterator, List, Tuple, Optional, Callable, Union
 from .vector_db import VectorDB
-from .cosine_similarity import cosine_similarity
+from .kernels import (mmr_select, resolve_backend, rows_above, score_rows, select_top_k,
+                      top_k_rows_batch, top_k_rows_sharded, summarize_scores)
+from .metadata_index import matches
+from .query_cache import QueryCache, query_key
+from .rwlock import reads
+from .similarity_join import BLOCK_ROWS, iter_similar_pairs
+
+# Filters estimated to match at most this fraction of the DB are searched
+# exactly over their subset, even when an index is requested
+SELECTIVE_FRACTION = 0.05
 
 
 class VectorSearch:
     """
     Search engine for finding similar vectors in a VectorDB.
+
+    Similarity is computed by a pluggable kernel: the NumPy backend when
+    numpy is installed, otherwise the pure-Python reference backend.
+
+    Every query scores a snapshot of the DB (see `VectorDB.snapshot()`), so
+    searches from many threads run concurrently, see a consistent DB, and
+    neither wait for nor hold up adds, updates and deletes.
+
+    Results of `search()` are cached (see query_cache.py) until the DB
+    changes, so a repeated query is answered without scoring anything.
     """
 
-    def __init__(self, db: VectorDB):
+    def __init__(self, db: VectorDB, backend: str = "auto",
+                 cache_size: int = 1024, cache_ttl: Optional[float] = None):
         """
         Initialize search engine.
 
         Args:
             db: VectorDB instance to search
+            backend: Similarity backend - "auto", "python" or "numpy"
+            cache_size: Search results kept in the LRU query cache (0 disables it)
+            cache_ttl: Seconds a cached result stays valid (None = until the DB changes)
+
+        Raises:
+            ValueError: If the backend is unknown or unavailable, or the
+                cache settings are invalid
         """
         self.db = db
+        self.backend = resolve_backend(backend)
+        self.cache = QueryCache(cache_size, cache_ttl) if cache_size else None
 
+    @property
+    def lock(self):
+        """Readers-writer lock of the searched DB."""
+        return self.db.lock
+
+    @reads
     def search(self,
                query_vector: List[float],
                top_k: int = 5,
-               filter_fn: Optional[Callable] = None) -> List[Tuple[str, float, dict]]:
+               filter_fn: Optional[Union[Callable, dict]] = None,
+               index: Optional[str] = None,
+               workers: Optional[int] = 1,
+               mmr_lambda: Optional[float] = None,
+               fetch_k: Optional[int] = None,
+               **index_params) -> List[Tuple[str, float, dict]]:
         """
         Search for most similar vectors to query.
 
         Args:
             query_vector: Query vector to search for
             top_k: Number of results to return
-            filter_fn: Optional function to filter vectors by metadata
+            filter_fn: Optional function to filter vectors by metadata, or a
+                declarative filter spec (e.g. {"type": "item"}) resolved
+                through the DB's metadata indexes
+            index: Name of an attached index to search instead of a
+                brute-force scan (e.g. "hnsw")
+            workers: Shards of the brute-force scan, run on a shared thread
+                pool (None = one per CPU not already used by BLAS). Speeds up the NumPy backend on large
+                DBs; results are identical
+            mmr_lambda: Re-rank the `fetch_k` most similar vectors by maximal
+                marginal relevance instead of returning the top_k most
+                similar: 1 = relevance only, lower values skip vectors
+                similar to ones already picked (e.g. 0.5)
+            fetch_k: Candidates re-ranked by MMR (default max(4 * top_k, 20))
+            **index_params: Index-specific parameters, e.g. ef_search for
+                HNSW (higher = better recall, slower)
 
         Returns:
             list: List of (vector_id, similarity_score, metadata) tuples,
-                  sorted by similarity (highest first)
+                  sorted by similarity (highest first); with mmr_lambda, in
+                  MMR pick order
 
         Raises:
-            ValueError: If query vector dimension doesn't match DB
+            ValueError: If query vector dimension doesn't match DB, the
+                index is not attached, workers is not positive, mmr_lambda
+                is outside [0, 1] or fetch_k is smaller than top_k
         """
         if len(query_vector) != self.db.dimension:
             raise ValueError(f"Query dimension {len(query_vector)} doesn't match DB dimension {self.db.dimension}")
+        if mmr_lambda is not None:
+            if not 0 <= mmr_lambda <= 1:
+                raise ValueError("mmr_lambda must be in [0, 1]")
+            if fetch_k is None:
+                fetch_k = max(4 * top_k, 20)
+            elif fetch_k < top_k:
+                raise ValueError("fetch_k must be at least top_k")
+
+        key = None
+        if self.cache is not None:
+            key = query_key(query_vector, top_k, filter_fn, index=index,
+                            mmr_lambda=mmr_lambda, fetch_k=fetch_k, **index_params)
+        if key is not None:
+            # Read before searching: a mutation meanwhile makes the entry stale, never wrong
+            version = self.db.version
+            cached = self.cache.get(key, version)
+            if cached is not None:
+                return cached
+
+        if mmr_lambda is None:
+            results = self._search(query_vector, top_k, filter_fn, index, workers, index_params)
+        else:
+            candidates = self._search(query_vector, fetch_k, filter_fn, index, workers, index_params)
+            results = self._rerank_mmr(candidates, top_k, mmr_lambda)
+
+        if key is not None:
+            self.cache.put(key, version, results)
+        return results
+
+    def _search(self, query_vector, top_k, filter_fn, index, workers, index_params):
+        """Uncached search() body: run the strategy chosen by plan()."""
+        if index is not None and index not in self.db.indexes:
+            raise ValueError(f"Index '{index}' is not attached to the DB")
 
-        # Get candidate vectors (optionally filtered)
-        if filter_fn:
-            candidate_ids = self.db.filter_by_metadata(filter_fn)
+        plan = self.plan(filter_fn, index)
+        if plan["strategy"] == "index":
+            return self._search_index(query_vector, top_k, index, index_params)
+        if plan["strategy"] == "index_post_filter":
+            return self._search_post_filtered(query_vector, top_k, filter_fn, index, plan, workers, index_params)
+
+        # Get candidate rows (optionally filtered)
+        snapshot, (rows,) = self.db.snapshot([filter_fn])
+        if (len(snapshot) if rows is None else len(rows)) == 0:
+            return []
+
+        # Select the top-k rows (zero vectors are skipped by the kernel);
+        # result tuples are only built for the winners
+        return [
+            (snapshot.row_id(row), score, snapshot.get_metadata(row))
+            for row, score in top_k_rows_sharded(snapshot, query_vector, rows, top_k, self.backend, workers)
+        ]
+
+    def _rerank_mmr(self, candidates, top_k, mmr_lambda):
+        """Pick top_k of the candidates by maximal marginal relevance (see kernels.mmr_select)."""
+        snapshot, _ = self.db.snapshot()
+        # Skip candidates deleted since they were found
+        hits = [(hit, snapshot.row_of(hit[0])) for hit in candidates]
+        hits = [(hit, row) for hit, row in hits if row is not None]
+        picks = mmr_select(snapshot, [row for _, row in hits], [hit[1] for hit, _ in hits],
+                           top_k, mmr_lambda, self.backend)
+        return [hits[position][0] for position in picks]
+
+    def plan(self, filter_fn: Optional[Union[Callable, dict]] = None, index: Optional[str] = None) -> dict:
+        """
+        Choose how a search with this filter and index runs.
+
+        Strategies:
+        - "scan": brute force over every vector (no filter, no index)
+        - "subset_scan": brute force over the rows matching the filter;
+          used without an index, and with one when the metadata indexes
+          estimate that at most SELECTIVE_FRACTION of the DB matches
+        - "index": the attached index, unfiltered
+        - "index_post_filter": the attached index, keeping the hits that
+          match the filter and widening top_k until enough do (falls back
+          to "subset_scan" if the index runs out of hits); used for broad
+          filters and for filters whose selectivity is unknown (callables,
+          specs on unindexed fields)
+
+        Args:
+            filter_fn: Metadata filter function or spec (see search())
+            index: Name of an attached index, or None
+
+        Returns:
+            dict: strategy, estimated_matches (upper bound from the metadata
+                  indexes, or None if unknown) and total vectors
+        """
+        total = len(self.db)
+        estimate = None
+        if isinstance(filter_fn, dict) and filter_fn:
+            estimate = self.db.estimate_matches(filter_fn)
+
+        if index is None:
+            strategy = "subset_scan" if filter_fn else "scan"
+        elif not filter_fn:
+            strategy = "index"
+        elif estimate is not None and estimate <= SELECTIVE_FRACTION * total:
+            strategy = "subset_scan"
         else:
-            candidate_ids = self.db.get_all_ids()
+            strategy = "index_post_filter"
+
+        return {"strategy": strategy, "estimated_matches": estimate, "total": total}
+
+    def _search_index(self, query_vector, top_k, index, index_params):
+        """Route a search through an attached approximate index."""
+        target = self.db.indexes[index]
+        with target.lock.read():
+            hits = target.search(query_vector, top_k, **index_params)
+
+        # Skip hits deleted since the index answered
+        store = self.db.store
+        rows = [(vid, score, store.row_of(vid)) for vid, score in hits]
+        return [(vid, score, store.get_metadata(row)) for vid, score, row in rows if row is not None]
+
+    def _search_post_filtered(self, query_vector, top_k, filter_fn, index, plan, workers, index_params):
+        """Index search keeping hits that match the filter, widened until top_k match."""
+        total, estimate = plan["total"], plan["estimated_matches"]
+        predicate = functools.partial(matches, filter_fn) if isinstance(filter_fn, dict) else filter_fn
+
+        # Oversample by the inverse of the estimated selectivity
+        fetch = top_k * 2 if not estimate else math.ceil(top_k * total / estimate)
+        fetch = max(top_k, min(fetch, total))
+        while True:
+            hits = [hit for hit in self._search_index(query_vector, fetch, index, index_params) if predicate(hit[2])]
+            if len(hits) >= top_k:
+                return hits[:top_k]
+            if fetch >= total:
+                break
+            fetch = min(fetch * 2, total)
+
+        # The index ran out of hits: answer exactly over the subset
+        return self._search(query_vector, top_k, filter_fn, None, workers, {})
+
+    @reads
+    def search_range(self,
+                     query_vector: List[float],
+                     min_similarity: float,
+                     filter_fn: Optional[Union[Callable, dict]] = None) -> List[Tuple[str, float, dict]]:
+        """
+        Find every vector at least `min_similarity` similar to the query.
+
+        Unlike search(), the number of results is set by the threshold, so
+        callers don't over-fetch a guessed top_k and discard the tail.
+
+        Args:
+            query_vector: Query vector
+            min_similarity: Lowest cosine similarity to return
+            filter_fn: Optional metadata filter function or spec (see search())
+
+        Returns:
+            list: (vector_id, similarity_score, metadata) tuples, highest
+                  similarity first (ties in storage order, as in search())
+
+        Raises:
+            ValueError: If query vector dimension doesn't match DB
+        """
+        if len(query_vector) != self.db.dimension:
+            raise ValueError(f"Query dimension {len(query_vector)} doesn't match DB dimension {self.db.dimension}")
 
-        if not candidate_ids:
+        snapshot, (rows,) = self.db.snapshot([filter_fn])
+        if (len(snapshot) if rows is None else len(rows)) == 0:
             return []
 
-        # Calculate similarities
-        results = []
-        for vid in candidate_ids:
-            entry = self.db.get_vector(vid)
-            vector = entry["vector"]
-            metadata = entry["metadata"]
+        return [
+            (snapshot.row_id(row), score, snapshot.get_metadata(row))
+            for row, score in rows_above(snapshot, query_vector, rows, min_similarity, self.backend)
+        ]
+
+    def iter_search(self,
+                    query_vector: List[float],
+                    batch_size: int = 32,
+                    filter_fn: Optional[Union[Callable, dict]] = None,
+                    index: Optional[str] = None,
+                    **index_params) -> Iterator[Tuple[str, float, dict]]:
+        """
+        Lazily yield search results, most similar first.
+
+        Results are selected in batches: the first `batch_size`, then twice
+        as many, and so on, so a caller that stops early (e.g. once it has
+        enough distinct receipts) pays for little more than it consumed.
+        Brute-force results come from one snapshot scored once, taken on
+        the first `next()`; no lock is held between yields, so adds,
+        updates and deletes don't disturb the iteration. A `compact()` (or
+        `clear()`/`load()`) renumbers rows under the snapshot, though: the
+        next `next()` after one raises RuntimeError. The first n results
+        equal search(query_vector, n).
+
+        With an index the search is repeated with a doubled top_k per batch
+        and only unseen hits are yielded; scores then descend within a
+        batch, but an approximate index may surface a better hit late.
+
+        Args:
+            query_vector: Query vector
+            batch_size: Results selected per first batch
+            filter_fn: Optional metadata filter function or spec (see search())
+            index: Optional name of an attached index to search
+            **index_params: Index-specific parameters (see search())
+
+        Yields:
+            tuple: (vector_id, similarity_score, metadata)
 
-            try:
-                similarity = cosine_similarity(query_vector, vector)
-                results.append((vid, similarity, metadata))
-            except ValueError:
-                # Skip if similarity calculation fails
-                continue
+        Raises:
+            ValueError: If query vector dimension doesn't match DB, the
+                index is not attached, or batch_size is not positive
+            RuntimeError: If the DB was compacted since the snapshot was taken
+        """
+        if len(query_vector) != self.db.dimension:
+            raise ValueError(f"Query dimension {len(query_vector)} doesn't match DB dimension {self.db.dimension}")
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+
+        if index is not None:
+            seen = set()
+            top_k = batch_size
+            while True:
+                hits = self.search(query_vector, top_k, filter_fn, index, **index_params)
+                for hit in hits:
+                    if hit[0] not in seen:
+                        seen.add(hit[0])
+                        yield hit
+                if len(hits) < top_k:
+                    return
+                top_k *= 2
+
+        snapshot, (rows,) = self.db.snapshot([filter_fn])
+        if (len(snapshot) if rows is None else len(rows)) == 0:
+            return
+
+        scored_rows, scores = score_rows(snapshot, query_vector, rows, self.backend)
+        done, top_k = 0, batch_size
+        while done < len(scores):
+            positions = select_top_k(scores, top_k, self.backend)
+            for position in positions[done:]:
+                row = int(scored_rows[position])
+                yield snapshot.row_id(row), float(scores[position]), snapshot.get_metadata(row)
+                self._check_current(snapshot)
+            done, top_k = len(positions), top_k * 2
+
+    def _check_current(self, snapshot):
+        """
+        Check that a snapshot kept across yields still matches the store's rows.
 
-        # Sort by similarity (descending)
-        results.sort(key=lambda x: x[1], reverse=True)
+        Raises:
+            RuntimeError: If rows were renumbered (e.g. by compact()) since
+                the snapshot was taken
+        """
+        if snapshot.generation != self.db.store.generation:
+            raise RuntimeError("DB was compacted during iteration; restart the search")
 
-        # Return top-k results
-        return results[:top_k]
+    def cache_stats(self) -> dict:
+        """
+        Hit/miss counters of the query cache.
 
+        Returns:
+            dict: hits, misses, hit_rate, size and max_entries ({} if disabled)
+        """
+        return self.cache.stats() if self.cache is not None else {}
+
+    def clear_cache(self):
+        """Drop every cached search result."""
+        if self.cache is not None:
+            self.cache.clear()
+
+    @reads
     def search_by_id(self,
                      vector_id: str,
                      top_k: int = 5,
                      exclude_self: bool = True,
-                     filter_fn: Optional[Callable] = None) -> List[Tuple[str, float, dict]]:
+                     filter_fn: Optional[Union[Callable, dict]] = None,
+                     index: Optional[str] = None,
+                     **index_params) -> List[Tuple[str, float, dict]]:
         """
         Search for vectors similar to a vector already in the DB.
 
@@ -85,7 +380,9 @@ class VectorSearch:
             vector_id: ID of vector to use as query
             top_k: Number of results to return
             exclude_self: If True, exclude the query vector from results
-            filter_fn: Optional function to filter vectors by metadata
+            filter_fn: Optional metadata filter function or spec (see search())
+            index: Optional name of an attached index to search
+            **index_params: Index-specific parameters (see search())
 
         Returns:
             list: List of (vector_id, similarity_score, metadata) tuples
@@ -97,7 +394,8 @@ class VectorSearch:
         if query_vector is None:
             raise ValueError(f"Vector ID '{vector_id}' not found")
 
-        results = self.search(query_vector, top_k + (1 if exclude_self else 0), filter_fn)
+        results = self.search(query_vector, top_k + (1 if exclude_self else 0), filter_fn,
+                              index, **index_params)
 
         # Remove the query vector itself if requested
         if exclude_self:
@@ -105,53 +403,176 @@ class VectorSearch:
 
         return results[:top_k]
 
+    @reads
     def batch_search(self,
-                     query_vectors: List[Tuple[str, List[float]]],
-                     top_k: int = 5) -> dict:
+                     query_vectors: List[tuple],
+                     top_k: int = 5,
+                     filter_fn: Optional[Union[Callable, dict]] = None,
+                     index: Optional[str] = None,
+                     **index_params) -> dict:
         """
         Search for multiple query vectors.
 
+        Without an index, all queries are scored together: each tile of rows
+        is multiplied with a micro-batch of queries in one matrix-matrix
+        product and top-k is selected per query. Results match search().
+
         Args:
-            query_vectors: List of (query_id, vector) tuples
+            query_vectors: List of (query_id, vector) or
+                (query_id, vector, filter) tuples; a per-query filter
+                overrides filter_fn
             top_k: Number of results per query
+            filter_fn: Optional metadata filter function or spec applied to
+                every query without its own filter
+            index: Optional name of an attached index to search (queries are
+                then run one by one)
+            **index_params: Index-specific parameters (see search())
 
         Returns:
             dict: Mapping query_id to list of results
+
+        Raises:
+            ValueError: If a query vector dimension doesn't match DB
         """
-        results = {}
-        for query_id, query_vector in query_vectors:
-            results[query_id] = self.search(query_vector, top_k)
+        queries = []
+        for entry in query_vectors:
+            query_id, query_vector = entry[0], entry[1]
+            query_filter = entry[2] if len(entry) > 2 and entry[2] is not None else filter_fn
+            if len(query_vector) != self.db.dimension:
+                raise ValueError(f"Query dimension {len(query_vector)} doesn't match DB dimension {self.db.dimension}")
+            queries.append((query_id, query_vector, query_filter))
+
+        if index is not None:
+            return {query_id: self.search(query_vector, top_k, query_filter, index, **index_params)
+                    for query_id, query_vector, query_filter in queries}
+
+        # Evaluate each distinct filter once per batch, all against one snapshot
+        distinct = {id(q[2]): q[2] for q in queries}
+        snapshot, resolved = self.db.snapshot(list(distinct.values()))
+        filtered_rows = dict(zip(distinct, resolved))
+        rows_per_query = [filtered_rows[id(query_filter)] for _, _, query_filter in queries]
+
+        hits = top_k_rows_batch(snapshot, [q[1] for q in queries], rows_per_query, top_k, self.backend)
 
-        return results
+        return {
+            query_id: [(snapshot.row_id(row), score, snapshot.get_metadata(row)) for row, score in query_hits]
+            for (query_id, _, _), query_hits in zip(queries, hits)
+        }
 
-    def find_duplicates(self, threshold: float = 0.99) -> List[Tuple[str, str, float]]:
+    @reads
+    def measure_recall(self,
+                       query_vectors: List[List[float]],
+                       top_k: int = 10,
+                       index: Optional[str] = None,
+                       **index_params) -> dict:
         """
-        Find near-duplicate vectors in the database.
+        Measure the recall of an approximate index against exact search.
 
         Args:
-            threshold: Similarity threshold for considering vectors as duplicates
+            query_vectors: Sample query vectors
+            top_k: Number of results compared per query
+            index: Name of the attached index to evaluate
+            **index_params: Index-specific parameters (see search())
 
         Returns:
-            list: List of (id1, id2, similarity) tuples for near-duplicates
+            dict: recall (fraction of the exact top-k the index also
+                  returned), queries, and mean exact_ms / index_ms per query
+
+        Raises:
+            ValueError: If the index is not attached
+        """
+        if index not in self.db.indexes:
+            raise ValueError(f"Index '{index}' is not attached to the DB")
+
+        # Bypass the query cache, which would time lookups instead of searches
+        start = time.perf_counter()
+        exact = [self._search(query_vector, top_k, None, None, 1, {}) for query_vector in query_vectors]
+        exact_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        approx = [self._search(query_vector, top_k, None, index, 1, index_params) for query_vector in query_vectors]
+        index_seconds = time.perf_counter() - start
+
+        found = expected = 0
+        for exact_hits, approx_hits in zip(exact, approx):
+            found += len({vid for vid, _, _ in exact_hits} & {vid for vid, _, _ in approx_hits})
+            expected += len(exact_hits)
+
+        count = max(len(query_vectors), 1)
+        return {
+            "recall": found / expected if expected else 1.0,
+            "queries": len(query_vectors),
+            "exact_ms": 1000 * exact_seconds / count,
+            "index_ms": 1000 * index_seconds / count
+        }
+
+    def _similar_pairs(self, snapshot, threshold, block_rows, workers, index):
+        """Row pairs of a snapshot above the threshold, from the tiled join or an LSH-style index."""
+        if index is None:
+            return iter_similar_pairs(snapshot, threshold, block_rows, workers, self.backend)
+
+        if index not in self.db.indexes:
+            raise ValueError(f"Index '{index}' is not attached to the DB")
+        if not hasattr(self.db.indexes[index], "iter_similar_pairs"):
+            raise ValueError(f"Index '{index}' does not support duplicate detection")
+        return self.db.indexes[index].iter_similar_pairs(threshold, snapshot)
+
+    def iter_duplicates(self, threshold: float = 0.99, block_rows: int = BLOCK_ROWS,
+                        workers: Optional[int] = 1,
+                        index: Optional[str] = None) -> Iterator[Tuple[str, str, float]]:
         """
-        duplicates = []
-        all_ids = self.db.get_all_ids()
+        Lazily yield near-duplicate pairs, tile by tile (see similarity_join.py).
+
+        Memory stays bounded by one tile per worker, however many pairs match.
+        Pairs come from a snapshot taken on the first `next()`, and no lock
+        is held between yields, so the DB can be written meanwhile. A
+        `compact()` (or `clear()`/`load()`) renumbers rows under the
+        snapshot, though: the next `next()` after one raises RuntimeError.
+
+        Args:
+            threshold: Similarity threshold for considering vectors as duplicates
+            block_rows: Rows per block of the tiled similarity join
+            workers: Number of worker processes (None = one per CPU)
+            index: Name of an attached LSHIndex; only pairs colliding in it
+                are verified (approximate, far fewer comparisons)
+
+        Yields:
+            tuple: (id1, id2, similarity), id1 stored before id2
 
-        for i, id1 in enumerate(all_ids):
-            v1 = self.db.get_vector_data(id1)
+        Raises:
+            ValueError: If the index is not attached or cannot find duplicates
+            RuntimeError: If the DB was compacted since the snapshot was taken
+        """
+        snapshot, _ = self.db.snapshot()
+        for row_a, row_b, sim in self._similar_pairs(snapshot, threshold, block_rows, workers, index):
+            yield snapshot.row_id(row_a), snapshot.row_id(row_b), sim
+            self._check_current(snapshot)
+
+    @reads
+    def find_duplicates(self, threshold: float = 0.99, block_rows: int = BLOCK_ROWS,
+                        workers: Optional[int] = 1,
+                        index: Optional[str] = None) -> List[Tuple[str, str, float]]:
+        """
+        Find near-duplicate vectors in the database.
 
-            for id2 in all_ids[i+1:]:
-                v2 = self.db.get_vector_data(id2)
+        Args:
+            threshold: Similarity threshold for considering vectors as duplicates
+            block_rows: Rows per block of the tiled similarity join
+            workers: Number of worker processes (None = one per CPU)
+            index: Optional name of an attached LSHIndex (see iter_duplicates())
 
-                try:
-                    sim = cosine_similarity(v1, v2)
-                    if sim >= threshold:
-                        duplicates.append((id1, id2, sim))
-                except ValueError:
-                    continue
+        Returns:
+            list: List of (id1, id2, similarity) tuples for near-duplicates,
+                  in storage order
 
-        return duplicates
+        Raises:
+            ValueError: If the index is not attached or cannot find duplicates
+        """
+        snapshot, _ = self.db.snapshot()
+        pairs = sorted(self._similar_pairs(snapshot, threshold, block_rows, workers, index))
+        return [(snapshot.row_id(row_a), snapshot.row_id(row_b), sim) for row_a, row_b, sim in pairs]
 
+    @reads
     def get_statistics(self, query_vector: List[float]) -> dict:
         """
         Get similarity statistics for a query vector.
@@ -165,24 +586,16 @@ class VectorSearch:
         if len(query_vector) != self.db.dimension:
             raise ValueError(f"Query dimension {len(query_vector)} doesn't match DB dimension {self.db.dimension}")
 
-        similarities = []
-        for vid in self.db.get_all_ids():
-            vector = self.db.get_vector_data(vid)
-            try:
-                sim = cosine_similarity(query_vector, vector)
-                similarities.append(sim)
-            except ValueError:
-                continue
+        snapshot, _ = self.db.snapshot()
+        if len(snapshot) == 0:
+            return {}
+
+        _, similarities = score_rows(snapshot, query_vector, None, self.backend)
 
-        if not similarities:
+        if len(similarities) == 0:
             return {}
 
-        return {
-            "count": len(similarities),
-            "mean": sum(similarities) / len(similarities),
-            "min": min(similarities),
-            "max": max(similarities)
-        }
+        return summarize_scores(similarities, self.backend)
 
 
 if __name__ == "__main__":
@@ -225,6 +638,10 @@ if __name__ == "__main__":
     for vid, sim, meta in results:
         print(f"  {vid}: {sim:.4f} - {meta['title']} ({meta['category']})")
 
+    db.create_metadata_index("category")
+    results = search.search(query, top_k=3, filter_fn={"category": "tech"})
+    print(f"  Same filter as an indexed spec: {[vid for vid, _, _ in results]}")
+
     # Test 4: Find duplicates
     print("\nTest 4: Find near-duplicates (threshold=0.95)")
     duplicates = search.find_duplicates(threshold=0.95)
@@ -239,4 +656,16 @@ if __name__ == "__main__":
     print(f"  Min: {stats['min']:.4f}")
     print(f"  Max: {stats['max']:.4f}")
 
+    # Test 6: Query cache
+    print("\nTest 6: Repeated query is served from the cache")
+    search.search(query, top_k=3)
+    search.search(query, top_k=3)
+    print(f"  Cache: {search.cache_stats()}")
+
+    # Test 7: MMR re-ranking
+    print("\nTest 7: Diverse results with MMR (lambda=0.5)")
+    results = search.search(query, top_k=3, mmr_lambda=0.5)
+    for vid, sim, meta in results:
+        print(f"  {vid}: {sim:.4f} - {meta['title']}")
+
     print("\nAll tests completed!")
@@ -12,7 +12,17 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.cosine_similarity import dot_product, magnitude, cosine_similarity, cosine_distance
 from src.vector_db import VectorDB
+from src.vector_store import VectorStore
+from src.binary_format import convert_json_to_binary
 from src.vector_search import VectorSearch
+from src.vector_collections import VectorCollections
+from src.hybrid_search import HybridSearch, reciprocal_rank_fusion
+from src.kernels import HAS_NUMPY, score_rows
+from src.hnsw_index import HNSWIndex
+from src.ivf_index import IVFIndex
+from src.lexical_index import LexicalIndex
+from src.lsh_index import LSHIndex
+from src.quantization import BinaryQuantizer, ProductQuantizer, ScalarQuantizer
 
 
 def test_dot_product():
@@ -194,6 +204,16 @@ def test_vector_db_crud():
     vec = db.get_vector("v1")
     assert vec["metadata"]["name"] == "updated", "Metadata should be updated"
 
+    # Test 6b: Updates without new metadata keep the stored metadata
+    db.update_vector("v1", vector=[1.0, 1.0, 1.0])
+    db.update_vector("v1")
+    vec = db.get_vector("v1")
+    assert vec["metadata"] == {"name": "updated"}, "Vector-only update should keep metadata"
+    assert vec["vector"] == [1.0, 1.0, 1.0]
+    db.create_metadata_index("name")
+    assert db.filter_by_metadata({"name": "updated"}) == ["v1"], "Metadata index should still build"
+    db.drop_metadata_index("name")
+
     # Test 7: Delete vector
     result = db.delete_vector("v1")
     assert result == True, "Should return True for successful delete"
@@ -217,6 +237,79 @@ def test_vector_db_crud():
     print("  ✓ All VectorDB CRUD tests passed")
 
 
+def test_vector_db_compaction():
+    """Test tombstone deletes and compaction in the vector store."""
+    print("Testing VectorDB compaction...")
+
+    db = VectorDB(dimension=2, name="compact_test")
+    for i in range(5):
+        db.add_vector(f"v{i}", [float(i), 1.0], {"i": i})
+
+    # Test 1: Delete only tombstones the row
+    db.delete_vector("v1")
+    db.delete_vector("v3")
+    assert len(db) == 3, "DB should have 3 live vectors"
+    assert db.store.num_rows == 5, "Deleted rows should stay allocated"
+    assert db.get_vector("v1") is None, "Deleted vector should not be returned"
+
+    # Test 2: Compaction reclaims tombstones and keeps data
+    reclaimed = db.compact()
+    assert reclaimed == 2, "Should reclaim 2 rows"
+    assert db.store.num_rows == 3, "Buffer should only hold live rows"
+    assert db.get_all_ids() == ["v0", "v2", "v4"], "Order of live IDs should be preserved"
+    assert db.get_vector("v4")["vector"] == [4.0, 1.0], "Vector data should survive compaction"
+    assert db.get_vector("v2")["metadata"] == {"i": 2}, "Metadata should survive compaction"
+
+    # Test 3: Store keeps float32 storage (4 bytes per value)
+    assert db.store.nbytes == 3 * 2 * 4, "Store should use 4 bytes per float"
+
+    # Test 4: IDs can be reused after delete
+    db.add_vector("v1", [0.0, 2.0])
+    assert db.get_vector_data("v1") == [0.0, 2.0], "Re-added vector should be stored"
+
+    print("  ✓ All compaction tests passed")
+
+
+def test_vector_db_normalize():
+    """Test cached norms and normalize-on-insert mode."""
+    print("Testing VectorDB normalization...")
+
+    # Test 1: Norms are cached at insert and refreshed on update
+    db = VectorDB(dimension=2, name="norm_test")
+    db.add_vector("v1", [3.0, 4.0])
+    assert abs(db.get_norm("v1") - 5.0) < 0.0001, "Norm should be cached on add"
+    db.update_vector("v1", vector=[6.0, 8.0])
+    assert abs(db.get_norm("v1") - 10.0) < 0.0001, "Norm should be refreshed on update"
+    assert db.get_norm("missing") is None, "Unknown ID should have no norm"
+
+    # Test 2: Normalized DB stores unit vectors
+    unit_db = VectorDB(dimension=2, name="unit_test", normalize=True)
+    unit_db.add_vector("v1", [3.0, 4.0])
+    unit_db.add_vector("v2", [0.0, 0.0])
+    vec = unit_db.get_vector_data("v1")
+    assert abs(vec[0] - 0.6) < 0.0001 and abs(vec[1] - 0.8) < 0.0001, "Vector should be unit length"
+    assert unit_db.get_norm("v2") == 0.0, "Zero vector should stay zero"
+
+    # Test 3: Search scores match the non-normalized DB
+    db.add_vector("v2", [1.0, 0.0])
+    unit_db.add_vector("v3", [1.0, 0.0])
+    plain = VectorSearch(db, backend="python").search([2.0, 1.0], top_k=2)
+    unit = VectorSearch(unit_db, backend="python").search([2.0, 1.0], top_k=2)
+    assert [r[1] for r in plain] == sorted([r[1] for r in plain], reverse=True)
+    for (_, s1, _), (_, s2, _) in zip(plain, unit):
+        assert abs(s1 - s2) < 1e-6, "Normalized scores should match cosine similarity"
+
+    # Test 4: Normalize flag survives save/load
+    test_file = "test_normalize.json"
+    unit_db.save(test_file)
+    loaded = VectorDB(dimension=2)
+    loaded.load(test_file)
+    os.remove(test_file)
+    assert loaded.normalize, "Normalize flag should be persisted"
+
+    print("  ✓ All normalization tests passed")
+
+
 def test_vector_db_persistence():
     """Test VectorDB save/load functionality."""
     print("Testing VectorDB persistence...")
@@ -256,6 +349,508 @@ def test_vector_db_persistence():
     print("  ✓ All persistence tests passed")
 
 
+def test_vector_db_binary_persistence():
+    """Test binary save/load with a memory-mapped vector block."""
+    print("Testing VectorDB binary persistence...")
+
+    json_file = "test_binary.json"
+    binary_file = "test_binary.vdb"
+
+    db1 = VectorDB(dimension=3, name="binary_test")
+    db1.add_vector("v1", [1.0, 2.0, 3.0], {"type": "test"})
+    db1.add_vector("v2", [4.0, 5.0, 6.0], {"type": "demo"})
+    db1.add_vector("v3", [7.0, 8.0, 9.0], {"type": "demo"})
+    db1.delete_vector("v2")
+
+    try:
+        # Test 1: .vdb paths use the binary format; load maps the vector block
+        assert db1.save(binary_file), "Binary save should succeed"
+        db2 = VectorDB(dimension=1)
+        assert db2.load(binary_file), "Binary load should succeed"
+        assert db2.store.is_mapped, "Vector block should be memory-mapped"
+        assert db2.name == "binary_test" and db2.dimension == 3
+        assert db2.get_all_ids() == ["v1", "v3"], "Only live vectors should be saved"
+        assert db2.get_vector("v3")["vector"] == [7.0, 8.0, 9.0], "Vector data should match"
+        assert db2.get_vector("v3")["metadata"] == {"type": "demo"}, "Metadata should match"
+        assert abs(db2.get_norm("v1") - 14 ** 0.5) < 0.0001, "Norms should be loaded, not recomputed"
+
+        # Test 2: Search runs directly on the mapped buffer
+        results = VectorSearch(db2).search([1.0, 2.0, 3.0], top_k=1)
+        assert results[0][0] == "v1", "Search should work on a mapped DB"
+
+        # Test 3: First write copies the mapped block into memory
+        db2.add_vector("v4", [1.0, 0.0, 0.0])
+        assert not db2.store.is_mapped, "Writes should copy the mapped buffer"
+        assert db2.get_vector_data("v1") == [1.0, 2.0, 3.0], "Existing data should survive the copy"
+
+        # Test 4: JSON files convert to the binary format
+        db1.save(json_file)
+        assert convert_json_to_binary(json_file, binary_file) == 2, "Should convert 2 vectors"
+        db3 = VectorDB(dimension=1)
+        assert db3.load(binary_file, mmap_vectors=False), "Load without mmap should succeed"
+        assert not db3.store.is_mapped
+        assert db3.get_vector_data("v3") == [7.0, 8.0, 9.0], "Converted data should match"
+    finally:
+        for path in (json_file, binary_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    print("  ✓ All binary persistence tests passed")
+
+
+def test_vector_db_wal():
+    """Test write-ahead logging, replay and checkpoints."""
+    print("Testing VectorDB write-ahead log...")
+
+    snapshot = "test_wal.vdb"
+    wal_path = snapshot + ".wal"
+
+    try:
+        # Test 1: Mutations are logged, not saved
+        db = VectorDB(dimension=2, name="wal_test")
+        db.save(snapshot)
+        db.enable_wal(snapshot, checkpoint_bytes=None)
+        db.add_vector("v1", [1.0, 0.0], {"n": 1})
+        db.add_vector("v2", [0.0, 1.0], {"n": 2})
+        db.add_vector("v3", [1.0, 1.0], {"n": 3})
+        db.update_vector("v1", metadata={"n": 10})
+        db.update_vector("v2", vector=[0.5, 0.5])
+        db.delete_vector("v3")
+        db.flush()
+        assert os.path.getsize(wal_path) > 0, "Mutations should be appended to the log"
+
+        # Test 2: Replay on top of the (stale) snapshot restores state
+        restored = VectorDB(dimension=2)
+        restored.load(snapshot)
+        assert len(restored) == 0, "Snapshot should not contain logged mutations"
+        assert restored.enable_wal(snapshot) == 6, "All 6 records should be replayed"
+        assert restored.get_all_ids() == ["v1", "v2"], "Deleted vector should stay deleted"
+        assert restored.get_vector("v1")["metadata"] == {"n": 10}, "Metadata update should replay"
+        assert restored.get_vector_data("v2") == [0.5, 0.5], "Vector update should replay"
+        assert restored.get_vector("v1")["timestamp"] == db.get_vector("v1")["timestamp"]
+        restored.wal.close()
+
+        # Test 3: Checkpoint folds the log into the snapshot
+        assert db.checkpoint(), "Checkpoint should succeed"
+        assert os.path.getsize(wal_path) == 0, "Checkpoint should truncate the log"
+        checkpointed = VectorDB(dimension=2)
+        checkpointed.load(snapshot)
+        assert checkpointed.get_all_ids() == ["v1", "v2"], "Snapshot should hold checkpointed state"
+
+        # Test 4: Size-triggered checkpoints and a torn final record
+        db.enable_wal(snapshot, checkpoint_bytes=200)
+        db.add_vector("v4", [2.0, 1.0])
+        db.add_vector("v5", [1.0, 2.0])
+        assert db.wal.size < 200, "Log should be checkpointed once it reaches the threshold"
+        db.wal.close()
+        with open(wal_path, "a") as f:
+            f.write('{"op": "delete", "id": "v1"')
+        replayed = VectorDB(dimension=2)
+        replayed.load(snapshot)
+        replayed.enable_wal(snapshot)
+        assert "v1" in replayed and "v5" in replayed, "Torn record should be ignored"
+        replayed.delete_vector("v4")
+        replayed.wal.close()
+        again = VectorDB(dimension=2)
+        again.load(snapshot)
+        again.enable_wal(snapshot)
+        assert "v4" not in again, "Records after a torn one should replay"
+        again.wal.close()
+    finally:
+        for path in (snapshot, wal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    print("  ✓ All write-ahead log tests passed")
+
+
+def test_vector_db_dtype():
+    """Test float64/float32/float16 storage across persistence and search."""
+    print("Testing VectorDB storage dtypes...")
+
+    vectors = {f"v{i}": [((i * 7 + j * 3) % 11 - 5) / 3.0 for j in range(8)] for i in range(20)}
+    query = [0.3, -1.2, 0.8, 0.1, -0.4, 1.5, -0.9, 0.2]
+    json_file = "test_dtype.json"
+    binary_file = "test_dtype.vdb"
+    wal_path = binary_file + ".wal"
+
+    # Test 1: Unknown dtypes are rejected
+    try:
+        VectorDB(dimension=8, dtype="int8")
+        assert False, "Should raise ValueError for an unknown dtype"
+    except ValueError:
+        pass
+
+    reference = VectorDB(dimension=8, dtype="float64")
+    for vid, vec in vectors.items():
+        reference.add_vector(vid, vec)
+    expected = VectorSearch(reference, backend="python").search(query, top_k=5)
+
+    try:
+        for dtype, itemsize, tolerance in (("float64", 8, 1e-12), ("float32", 4, 1e-6), ("float16", 2, 2e-3)):
+            db = VectorDB(dimension=8, name=dtype, dtype=dtype)
+            for vid, vec in vectors.items():
+                db.add_vector(vid, vec)
+
+            # Test 2: Buffers and stats reflect the element size
+            assert db.store.nbytes == 20 * 8 * itemsize, f"{dtype} should use {itemsize} bytes per value"
+            stats = db.get_stats()
+            assert stats["dtype"] == dtype
+            assert stats["memory_estimate_mb"] == round(db.store.footprint / (1024 * 1024), 2)
+            stored = db.get_vector_data("v3")
+            assert all(abs(a - b) <= tolerance * 4 for a, b in zip(stored, vectors["v3"]))
+
+            # Test 3: Both kernels upcast and match the float64 reference
+            backends = ["python", "numpy"] if HAS_NUMPY else ["python"]
+            for backend in backends:
+                results = VectorSearch(db, backend=backend).search(query, top_k=5)
+                assert [r[0] for r in results] == [r[0] for r in expected], f"{dtype}/{backend} ranking differs"
+                for (_, s1, _), (_, s2, _) in zip(results, expected):
+                    assert abs(s1 - s2) < tolerance, f"{dtype}/{backend} score off by {abs(s1 - s2)}"
+
+            # Test 4: JSON and binary files keep the dtype and the stored values
+            for path in (json_file, binary_file):
+                assert db.save(path)
+                loaded = VectorDB(dimension=1)
+                assert loaded.load(path)
+                assert loaded.dtype == dtype, f"{path} should keep dtype {dtype}"
+                assert loaded.get_vector_data("v3") == stored, f"{path} should round-trip {dtype} values"
+
+            # Test 5: WAL records replay in the store's dtype
+            loaded.enable_wal(binary_file, checkpoint_bytes=None)
+            loaded.add_vector("extra", [0.1] * 8)
+            loaded.update_vector("v3", vector=[0.7] * 8)
+            extra, updated = loaded.get_vector_data("extra"), loaded.get_vector_data("v3")
+            loaded.wal.close()
+            replayed = VectorDB(dimension=1)
+            replayed.load(binary_file)
+            assert replayed.enable_wal(binary_file) == 2
+            assert replayed.get_vector_data("extra") == extra and replayed.get_vector_data("v3") == updated
+            replayed.wal.close()
+            os.remove(wal_path)
+
+        # Test 6: Values beyond the float16 range are rejected as invalid input
+        db = VectorDB(dimension=8, dtype="float16")
+        huge = [70000.0] + [0.0] * 7
+        assert db.add_vectors({"ok": ([1.0] * 8, None), "huge": (huge, None)}) == 1, \
+            "Out-of-range vector should be skipped"
+        try:
+            db.update_vector("ok", vector=huge)
+            assert False, "Should raise ValueError for an out-of-range float16 value"
+        except ValueError:
+            pass
+        assert db.get_vector_data("ok") == [1.0] * 8, "Rejected update should leave the vector intact"
+    finally:
+        for path in (json_file, binary_file, wal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    print("  ✓ All dtype tests passed")
+
+
+def test_vector_db_out_of_core():
+    """Test the memory-mapped vector file mode."""
+    print("Testing out-of-core vector storage...")
+
+    vector_file = "test_vectors.dat"
+    loaded_file = "test_vectors_loaded.dat"
+    snapshot = "test_out_of_core.vdb"
+
+    vectors = {f"v{i}": [((i * 5 + j * 7) % 13 - 6) / 4.0 for j in range(16)] for i in range(300)}
+    query = [0.5, -0.25, 1.0, 0.0, -1.5, 0.75, 0.2, -0.6, 1.1, -0.3, 0.9, 0.4, -0.8, 0.1, 0.6, -1.0]
+
+    try:
+        # Test 1: The file grows in whole segments as rows are appended
+        store = VectorStore(16, "f", vector_file=vector_file, segment_bytes=4096)
+        for vid, vec in list(vectors.items())[:100]:
+            store.append(vid, vec, {}, "t")
+        assert store.is_file_backed and not store.is_mapped
+        assert store._data.segments == 2, "100 x 16 float32 values need two 4 KB segments"
+        assert os.path.getsize(vector_file) == 2 * 4096, "File should grow by whole segments"
+        assert store.read(99) == vectors["v99"], "Rows should read back from the file"
+        store.close()
+
+        # Test 2: Search over the mapped file matches the in-memory DB
+        reference = VectorDB(dimension=16)
+        db = VectorDB(dimension=16, vector_file=vector_file)
+        for vid, vec in vectors.items():
+            reference.add_vector(vid, vec)
+            db.add_vector(vid, vec)
+        for i in range(0, 300, 4):
+            reference.delete_vector(f"v{i}")
+            db.delete_vector(f"v{i}")
+        expected = VectorSearch(reference, backend="python").search(query, top_k=5)
+        backends = ["python", "numpy"] if HAS_NUMPY else ["python"]
+        for backend in backends:
+            results = VectorSearch(db, backend=backend).search(query, top_k=5)
+            assert [r[0] for r in results] == [r[0] for r in expected], f"{backend} results should match"
+
+        # Test 3: Only norms and live flags count towards the heap footprint
+        assert db.get_stats()["vector_file"] == vector_file
+        assert db.store.footprint == db.store.num_rows * 9, "Vector block should not be counted"
+
+        # Test 4: Compaction rewrites the file in place
+        assert db.compact() == 75
+        assert len(db.store._data) == 225 * 16, "Compacted buffer should only hold live rows"
+        assert db.get_vector_data("v299") == vectors["v299"]
+        results = VectorSearch(db).search(query, top_k=5)
+        assert [r[0] for r in results] == [r[0] for r in expected], "Compaction should not change results"
+
+        # Test 5: A loaded snapshot is copied into the vector file on the first write
+        db.save(snapshot)
+        loaded = VectorDB(dimension=1, vector_file=loaded_file)
+        assert loaded.load(snapshot)
+        assert loaded.store.is_mapped, "Snapshot should be mapped until the first write"
+        loaded.add_vector("extra", query)
+        assert loaded.store.is_file_backed and not loaded.store.is_mapped
+        assert len(loaded) == 226 and loaded.get_vector_data("v1") == vectors["v1"]
+        assert VectorSearch(loaded).search(query, top_k=1)[0][0] == "extra"
+
+        # Test 6: Lazy iterators survive deletes but fail loudly after a compaction
+        search = VectorSearch(db, cache_size=0)
+        results = search.iter_search(query, batch_size=4)
+        pairs = search.iter_duplicates(threshold=-1.0)
+        first = next(results)
+        next(pairs)
+        db.delete_vector(first[0])
+        assert next(results)[0] == expected[1][0], "Deletes should not disturb the iteration"
+        next(pairs)
+        db.compact()
+        for iterator in (results, pairs):
+            try:
+                next(iterator)
+                assert False, "Should raise RuntimeError after compact()"
+            except RuntimeError:
+                pass
+        db.store.close()
+        loaded.store.close()
+    finally:
+        for path in (vector_file, loaded_file, snapshot):
+            if os.path.exists(path):
+                os.remove(path)
+
+    print("  ✓ All out-of-core storage tests passed")
+
+
+def test_concurrent_access():
+    """Test the readers-writer lock and searches racing concurrent writes."""
+    print("Testing concurrent access...")
+
+    import random
+    import threading
+    import time
+    from src.rwlock import ReadWriteLock
+
+    # Test 1: Readers share the lock, a writer waits for them
+    lock = ReadWriteLock()
+    inside, release = threading.Event(), threading.Event()
+
+    def hold_read():
+        with lock.read():
+            inside.set()
+            release.wait(5)
+
+    def read_once():
+        with lock.read():
+            pass
+
+    reader = threading.Thread(target=hold_read)
+    reader.start()
+    inside.wait(5)
+    second_reader = threading.Thread(target=read_once)
+    second_reader.start()
+    second_reader.join(1)
+    assert not second_reader.is_alive(), "A second reader should not wait for the first"
+
+    wrote = threading.Event()
+
+    def write_once():
+        with lock.write():
+            wrote.set()
+
+    writer = threading.Thread(target=write_once)
+    writer.start()
+    assert not wrote.wait(0.2), "Writer should wait while a reader holds the lock"
+    release.set()
+    assert wrote.wait(5), "Writer should run once the reader leaves"
+    reader.join(5)
+    writer.join(5)
+
+    # Test 2: Reentrancy, and read -> write upgrades raise instead of deadlocking
+    with lock.write():
+        with lock.write():
+            with lock.read():
+                pass
+    with lock.read():
+        with lock.read():
+            try:
+                lock.acquire_write()
+                assert False, "Upgrading a read lock should raise RuntimeError"
+            except RuntimeError:
+                pass
+
+    # Test 3: Searches stay consistent while another thread ingests
+    random.seed(19)
+    db = VectorDB(dimension=8, name="concurrency_test")
+    db.create_metadata_index("group")
+    for i in range(200):
+        db.add_vector(f"seed{i}", [random.gauss(0, 1) for _ in range(8)], {"group": i % 2})
+
+    errors = []
+    done = threading.Event()
+
+    def ingest():
+        rng = random.Random(1)
+        try:
+            for i in range(600):
+                db.add_vector(f"new{i}", [rng.gauss(0, 1) for _ in range(8)], {"group": i % 2})
+                if i % 5 == 0:
+                    db.delete_vector(f"new{i - 5}" if i else "seed0")
+                if i % 150 == 0:
+                    db.compact()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    def query(seed):
+        rng = random.Random(seed)
+        search = VectorSearch(db)
+        try:
+            while not done.is_set():
+                vector = [rng.gauss(0, 1) for _ in range(8)]
+                for results in (search.search(vector, top_k=10),
+                                search.search(vector, top_k=10, filter_fn={"group": 1}),
+                                search.batch_search([("q", vector)], top_k=10)["q"]):
+                    scores = [r[1] for r in results]
+                    assert len(results) == 10 and scores == sorted(scores, reverse=True)
+                    assert all(vid is not None for vid, _, _ in results), "Results should never be tombstones"
+                db.get_all_vectors()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=ingest)] + [threading.Thread(target=query, args=(s,)) for s in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    assert not errors, f"Concurrent access failed: {errors[0]!r}"
+    assert len(db) == 200 + 600 - 120, "Every write should be applied exactly once"
+
+    # Test 4: Reader throughput holds up while a writer is busy in slow index work
+    from src.vector_index import VectorIndex
+
+    class SlowIndex(VectorIndex):
+        """Index whose deferred work (think retraining) takes 20 ms per add."""
+
+        def reset(self):
+            pass
+
+        def on_add(self, vector_id):
+            pass
+
+        def on_delete(self, vector_id):
+            pass
+
+        def maintain(self):
+            time.sleep(0.02)
+
+    db.attach_index("slow", SlowIndex())
+    search = VectorSearch(db, backend="python")
+    vector = [random.gauss(0, 1) for _ in range(8)]
+
+    def searches_per_second(with_writer):
+        stop = threading.Event()
+        added = []
+
+        def write():
+            while not stop.is_set():
+                db.add_vector(f"busy{with_writer}_{len(added)}", vector)
+                added.append(1)
+
+        writer = threading.Thread(target=write)
+        if with_writer:
+            writer.start()
+        count, start = 0, time.perf_counter()
+        while time.perf_counter() - start < 0.5:
+            search.search(vector, top_k=10)
+            count += 1
+        elapsed = time.perf_counter() - start
+        stop.set()
+        if with_writer:
+            writer.join(5)
+            assert added, "Writer should make progress meanwhile"
+        return count / elapsed
+
+    alone = searches_per_second(False)
+    contended = searches_per_second(True)
+    assert contended >= 0.5 * alone, f"Readers stalled behind the writer: {contended:.0f}/s vs {alone:.0f}/s"
+
+    print("  ✓ All concurrent access tests passed")
+
+
+def test_metadata_filters():
+    """Test declarative metadata filters and metadata indexes."""
+    print("Testing metadata filters...")
+
+    db = VectorDB(dimension=2, name="filter_test")
+    dates = ["2023-01-05", "2023-06-10", "2024-02-01", "2022-12-31", None]
+    for i, date in enumerate(dates):
+        kind = "receipt" if i % 2 == 0 else "item"
+        db.add_vector(f"v{i}", [1.0, float(i)], {"type": kind, "receipt_id": i // 2, "date": date})
+    db.add_vector("bare", [0.5, 0.5], {})
+    missing = {"type": None}
+    missing_date = {"date": {"in": [None]}}
+    unindexed = (db.filter_by_metadata(missing), db.filter_by_metadata(missing_date))
+    assert unindexed == (["bare"], ["v4", "bare"]), "Missing fields should match None"
+    db.delete_vector("bare")
+
+    spec = {"type": "receipt", "date": {"gte": "2023-01-01", "lt": "2025-01-01"}}
+    expected = db.filter_by_metadata(
+        lambda m: m["type"] == "receipt" and m["date"] is not None and "2023-01-01" <= m["date"] < "2025-01-01")
+
+    # Test 1: Spec without indexes matches the equivalent callable (full scan)
+    assert db.filter_by_metadata(spec) == expected == ["v0", "v2"], "Spec should match callable filter"
+
+    # Test 2: Indexed fields give the same answer
+    db.create_metadata_index("type")
+    db.create_metadata_index("receipt_id")
+    db.create_metadata_index("date", kind="range")
+    db.add_vector("bare", [0.5, 0.5], {})
+    assert (db.filter_by_metadata(missing), db.filter_by_metadata(missing_date)) == unindexed, \
+        "Indexed fields should treat a missing field like the scan does"
+    db.delete_vector("bare")
+    assert db.filter_by_metadata(spec) == expected, "Indexed spec should match scan"
+    assert db.filter_by_metadata({"receipt_id": {"in": [0, 2]}}) == ["v0", "v1", "v4"], "in operator failed"
+    assert db.filter_by_metadata({"date": {"lte": "2022-12-31"}}) == ["v3"], "Range bound should be inclusive"
+    assert db.filter_by_metadata({"date": {"gt": "2022-12-31"}, "type": {"ne": "item"}}) == ["v0", "v2"], \
+        "Indexed and unindexed conditions should combine"
+    assert db.metadata_index.estimate({"type": "item"}) == 2, "Estimate should come from the index"
+
+    # Test 3: Indexes follow updates and deletes
+    db.update_vector("v1", metadata={"type": "receipt", "receipt_id": 9, "date": "2023-03-03"})
+    assert db.filter_by_metadata(spec) == ["v0", "v1", "v2"], "Updated metadata should be indexed"
+    db.delete_vector("v0")
+    db.compact()
+    assert db.filter_by_metadata(spec) == ["v1", "v2"], "Deleted vector should leave the index"
+    assert db.filter_by_metadata({"receipt_id": 0}) == [], "Old metadata should leave the index"
+
+    # Test 4: Search accepts specs
+    search = VectorSearch(db)
+    results = search.search([1.0, 0.0], top_k=5, filter_fn={"type": "receipt"})
+    assert {vid for vid, _, _ in results} == {"v1", "v2", "v4"}, "Search should apply the filter spec"
+
+    # Test 5: Malformed specs are rejected
+    try:
+        db.filter_by_metadata({"date": {"after": "2023"}})
+        assert False, "Should raise ValueError for unknown operator"
+    except ValueError:
+        pass
+
+    print("  ✓ All metadata filter tests passed")
+
+
 def test_vector_search():
     """Test VectorSearch functionality."""
     print("Testing VectorSearch...")
@@ -307,6 +902,1000 @@ def test_vector_search():
     print("  ✓ All VectorSearch tests passed")
 
 
+def test_search_backends():
+    """Test that the NumPy backend matches the pure-Python reference."""
+    print("Testing search backends...")
+
+    import random
+    random.seed(7)
+
+    db = VectorDB(dimension=16, name="backend_test")
+    for i in range(200):
+        db.add_vector(f"v{i}", [random.gauss(0, 1) for _ in range(16)], {"even": i % 2 == 0})
+    db.add_vector("zero", [0.0] * 16, {"even": True})
+    db.delete_vector("v5")
+
+    query = [random.gauss(0, 1) for _ in range(16)]
+    reference = VectorSearch(db, backend="python")
+
+    # Test 1: Unknown backend is rejected
+    try:
+        VectorSearch(db, backend="gpu")
+        assert False, "Should raise ValueError for unknown backend"
+    except ValueError:
+        pass
+
+    if not HAS_NUMPY:
+        print("  - numpy not installed, only the reference backend was tested")
+        return
+
+    fast = VectorSearch(db, backend="numpy")
+
+    # Test 2: Same ranking and scores within 1e-6, with and without filters
+    for filter_fn in (None, lambda m: m.get("even")):
+        expected = reference.search(query, top_k=20, filter_fn=filter_fn)
+        actual = fast.search(query, top_k=20, filter_fn=filter_fn)
+        assert [r[0] for r in actual] == [r[0] for r in expected], "Rankings should match"
+        for (_, s1, _), (_, s2, _) in zip(actual, expected):
+            assert abs(s1 - s2) < 1e-6, "Scores should match within 1e-6"
+
+    # Test 3: Statistics match and skip deleted/zero vectors
+    expected = reference.get_statistics(query)
+    actual = fast.get_statistics(query)
+    assert actual["count"] == expected["count"] == 199, "Should skip deleted and zero vectors"
+    for key in ("mean", "min", "max"):
+        assert abs(actual[key] - expected[key]) < 1e-6, f"{key} should match within 1e-6"
+
+    print("  ✓ All backend tests passed")
+
+
+def test_top_k_selection():
+    """Test that partial top-k selection matches a full stable sort."""
+    print("Testing top-k selection...")
+
+    import random
+    random.seed(11)
+
+    db = VectorDB(dimension=4, name="topk_test")
+    for i in range(60):
+        # Only 6 distinct directions, so many scores are tied
+        base = [float(random.randint(0, 1)) for _ in range(3)] + [1.0]
+        db.add_vector(f"v{i}", [x * (1 + i % 3) for x in base])
+
+    query = [1.0, 0.5, 0.0, 1.0]
+    backends = ["python", "numpy"] if HAS_NUMPY else ["python"]
+
+    for backend in backends:
+        search = VectorSearch(db, backend=backend)
+        rows, scores = score_rows(db.store, query, None, backend)
+        ranked = sorted(zip(rows, scores), key=lambda p: p[1], reverse=True)
+
+        for top_k in (0, 1, 5, 17, 100):
+            results = search.search(query, top_k=top_k)
+            expected = [db.store.row_id(row) for row, _ in ranked[:top_k]]
+            assert [r[0] for r in results] == expected, f"{backend} top-{top_k} should match a full sort"
+
+        # search_by_id and batch_search use the same path
+        results = search.search_by_id("v0", top_k=3)
+        assert len(results) == 3 and "v0" not in [r[0] for r in results]
+        batch = search.batch_search([("q1", query)], top_k=5)
+        assert batch["q1"] == search.search(query, top_k=5), "Batch results should match search"
+
+    print("  ✓ All top-k selection tests passed")
+
+
+def test_batch_search():
+    """Test batched matrix-matrix search against per-query search."""
+    print("Testing batch search...")
+
+    import random
+    from src import kernels
+    random.seed(13)
+
+    db = VectorDB(dimension=12, name="batch_test")
+    for i in range(400):
+        db.add_vector(f"v{i}", [random.gauss(0, 1) for _ in range(12)], {"group": i % 4})
+    db.add_vector("zero", [0.0] * 12, {"group": 0})
+    db.delete_vector("v7")
+    db.create_metadata_index("group")
+
+    queries = [(f"q{i}", [random.gauss(0, 1) for _ in range(12)]) for i in range(30)]
+    queries.append(("q_zero", [0.0] * 12))
+    queries.append(("q_spec", queries[0][1], {"group": {"in": [1, 2]}}))
+    queries.append(("q_fn", queries[1][1], lambda m: m["group"] == 3))
+    queries.append(("q_none", queries[2][1], {"group": 9}))
+
+    backends = ["python", "numpy"] if HAS_NUMPY else ["python"]
+    default_batch = kernels.QUERY_BATCH
+    default_rows = kernels.BATCH_CHUNK_ROWS
+    try:
+        # Small micro-batches and row tiles so the batch and tile
+        # boundaries (and filtered rows split across tiles) are exercised too
+        kernels.QUERY_BATCH = 8
+        kernels.BATCH_CHUNK_ROWS = 64
+        for backend in backends:
+            search = VectorSearch(db, backend=backend)
+            for filter_fn in (None, {"group": 0}):
+                batch = search.batch_search(queries, top_k=7, filter_fn=filter_fn)
+                assert list(batch) == [q[0] for q in queries], "Results should be keyed by query ID"
+
+                for entry in queries:
+                    query_filter = entry[2] if len(entry) > 2 else filter_fn
+                    expected = search.search(entry[1], top_k=7, filter_fn=query_filter)
+                    actual = batch[entry[0]]
+                    assert [r[0] for r in actual] == [r[0] for r in expected], \
+                        f"{backend} batch ranking should match search for {entry[0]}"
+                    for (_, s1, m1), (_, s2, m2) in zip(actual, expected):
+                        assert abs(s1 - s2) < 1e-9 and m1 == m2, "Scores and metadata should match"
+
+            assert batch["q_zero"] == [] and batch["q_none"] == [], "Empty queries/filters give no results"
+    finally:
+        kernels.QUERY_BATCH = default_batch
+        kernels.BATCH_CHUNK_ROWS = default_rows
+
+    print("  ✓ All batch search tests passed")
+
+
+def test_sharded_search():
+    """Test sharded multi-threaded search against the single-shard scan."""
+    print("Testing sharded search...")
+
+    import random
+    from src import kernels
+    random.seed(17)
+
+    db = VectorDB(dimension=8, name="shard_test")
+    for i in range(500):
+        # Few distinct directions, so ties straddle shard boundaries
+        db.add_vector(f"v{i}", [float(random.randint(-1, 1)) for _ in range(8)], {"group": i % 3})
+    for i in range(0, 500, 7):
+        db.delete_vector(f"v{i}")
+    db.create_metadata_index("group")
+    query = [1.0, 0.0, -1.0, 0.5, 0.0, 1.0, 0.0, -0.5]
+
+    backends = ["python", "numpy"] if HAS_NUMPY else ["python"]
+    default_shard_rows = kernels.MIN_SHARD_ROWS
+    try:
+        # Small shards so a tiny DB is actually partitioned
+        kernels.MIN_SHARD_ROWS = 50
+        for backend in backends:
+            search = VectorSearch(db, backend=backend)
+
+            # Test 1: Merged shard results match a single scan, ties included
+            for filter_fn in (None, {"group": 1}):
+                expected = search.search(query, top_k=25, filter_fn=filter_fn)
+                for workers in (2, 3, 8, None):
+                    results = search.search(query, top_k=25, filter_fn=filter_fn, workers=workers)
+                    assert results == expected, f"{backend} with {workers} workers should match one shard"
+
+            # Test 2: Invalid worker counts are rejected
+            try:
+                search.search(query, workers=0)
+                assert False, "Should raise ValueError for workers=0"
+            except ValueError:
+                pass
+
+        # Test 3: Queries share one thread pool instead of creating their own
+        search = VectorSearch(db, backend=backends[-1])
+        search.search(query, workers=2)
+        pool = kernels._shard_pool
+        search.search(query, workers=2)
+        assert pool is not None and kernels._shard_pool is pool, "Shard pool should be reused"
+
+        # Test 4: A larger pool replaces (and shuts down) the old one
+        size = kernels._shard_pool_size
+        assert kernels._map_shards(abs, range(-size - 1, 0)) == list(range(size + 1, 0, -1))
+        assert kernels._shard_pool is not pool and pool._shutdown, "Replaced pool should be shut down"
+
+        # Test 5: Oversubscribing the CPUs warns once through the warnings module
+        import warnings
+        kernels._oversubscription_warned = False
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            kernels._shard_workers((os.cpu_count() or 1) + 1, "python")
+            kernels._shard_workers((os.cpu_count() or 1) + 1, "python")
+        assert len([w for w in caught if issubclass(w.category, RuntimeWarning)]) == 1
+    finally:
+        kernels.MIN_SHARD_ROWS = default_shard_rows
+
+    print("  ✓ All sharded search tests passed")
+
+
+def test_hnsw_index():
+    """Test the HNSW index against brute-force search."""
+    print("Testing HNSW index...")
+
+    import random
+    random.seed(3)
+
+    db = VectorDB(dimension=8, name="hnsw_test")
+    for i in range(300):
+        db.add_vector(f"v{i}", [random.gauss(0, 1) for _ in range(8)], {"group": i % 3})
+
+    # Test 1: Attaching builds the graph over existing vectors
+    db.attach_index("hnsw", HNSWIndex(M=8, ef_construction=64, seed=1))
+    assert len(db.indexes["hnsw"]) == 300, "Index should contain all vectors"
+
+    # Test 2: Incremental inserts and deletes follow the DB
+    for i in range(300, 320):
+        db.add_vector(f"v{i}", [random.gauss(0, 1) for _ in range(8)], {"group": i % 3})
+    for i in range(0, 40, 2):
+        db.delete_vector(f"v{i}")
+    assert len(db.indexes["hnsw"]) == len(db) == 300, "Index should follow adds and deletes"
+
+    # Test 3: High recall against exact search, exact scores for hits
+    search = VectorSearch(db)
+    queries = [[random.gauss(0, 1) for _ in range(8)] for _ in range(20)]
+    found = 0
+    for query in queries:
+        exact = {vid for vid, _, _ in search.search(query, top_k=10)}
+        approx = search.search(query, top_k=10, index="hnsw", ef_search=100)
+        assert all(vid in db for vid, _, _ in approx), "Deleted vectors should not be returned"
+        found += len(exact & {vid for vid, _, _ in approx})
+    recall = found / (10 * len(queries))
+    assert recall >= 0.9, f"Recall should be >= 0.9, got {recall:.2f}"
+
+    # Test 4: Filters restrict index results
+    results = search.search(queries[0], top_k=5, filter_fn=lambda m: m["group"] == 0,
+                            index="hnsw", ef_search=100)
+    assert results and all(meta["group"] == 0 for _, _, meta in results)
+
+    # Test 5: Unknown index is rejected
+    try:
+        search.search(queries[0], index="missing")
+        assert False, "Should raise ValueError for unknown index"
+    except ValueError:
+        pass
+
+    # Test 6: build_index() lets mutations run during the build, then catches up
+    import threading
+
+    class MutatingHNSW(HNSWIndex):
+        """Runs DB mutations from another thread halfway through the build."""
+        calls = 0
+
+        def on_add(self, vector_id):
+            MutatingHNSW.calls += 1
+            if MutatingHNSW.calls == 150:
+                def mutate():
+                    db.add_vector("late", [1.0] * 8)
+                    db.update_vector("v41", vector=[-1.0] * 8)
+                    db.update_vector("v299", vector=[0.5, -0.5] * 4)
+                    db.delete_vector("v43")
+                writer = threading.Thread(target=mutate)
+                writer.start()
+                writer.join(timeout=10)
+                assert not writer.is_alive(), "Mutations should not wait for the build"
+            super().on_add(vector_id)
+
+    assert db.build_index("hnsw2", MutatingHNSW(M=8, ef_construction=64, seed=2))
+    built = db.indexes["hnsw2"]
+    assert len(built) == len(db) and "late" in built._node_levels and "v43" not in built._node_levels
+    for vid in ("late", "v41", "v299"):
+        hits = search.search(db.get_vector_data(vid), top_k=1, index="hnsw2", ef_search=200)
+        assert hits[0][0] == vid and abs(hits[0][1] - 1.0) < 1e-6, f"{vid} should be indexed in its new state"
+    try:
+        db.build_index("hnsw2", HNSWIndex())
+        assert False, "Should raise ValueError for an attached name"
+    except ValueError:
+        pass
+
+    print("  ✓ All HNSW index tests passed")
+
+
+def test_ivf_index():
+    """Test the IVF index against brute-force search."""
+    print("Testing IVF index...")
+
+    import random
+    random.seed(5)
+
+    # Clustered data: 10 random centres with small noise
+    centres = [[random.gauss(0, 1) for _ in range(8)] for _ in range(10)]
+
+    def sample():
+        centre = random.choice(centres)
+        return [x + random.gauss(0, 0.1) for x in centre]
+
+    db = VectorDB(dimension=8, name="ivf_test")
+    ivf = IVFIndex(n_lists=10, nprobe=2, retrain_ratio=None, seed=1)
+
+    # Test 1: Untrained until the collection holds n_lists vectors
+    db.attach_index("ivf", ivf)
+    for i in range(5):
+        db.add_vector(f"v{i}", sample())
+    assert not ivf.is_trained, "Index should not train on fewer than n_lists vectors"
+
+    for i in range(5, 400):
+        db.add_vector(f"v{i}", sample(), {"odd": i % 2 == 1})
+    assert ivf.is_trained, "Index should train once enough vectors exist"
+    assert sum(ivf.list_sizes()) == 400, "Every vector should be in a list"
+
+    # Test 2: Explicit retraining keeps every vector assigned
+    for i in range(0, 100, 4):
+        db.delete_vector(f"v{i}")
+    ivf.train()
+    assert sum(ivf.list_sizes()) == len(db) == 375, "Retraining should reassign live vectors"
+
+    # Test 3: nprobe cuts scanned candidates while keeping recall high
+    search = VectorSearch(db)
+    found = 0
+    for _ in range(10):
+        query = sample()
+        exact = {vid for vid, _, _ in search.search(query, top_k=5)}
+        approx = search.search(query, top_k=5, index="ivf", nprobe=2)
+        assert ivf.last_scanned < len(db) / 2, "Should scan only a few lists"
+        found += len(exact & {vid for vid, _, _ in approx})
+    assert found / 50 >= 0.9, f"Recall should be >= 0.9, got {found / 50:.2f}"
+
+    # Test 4: Probing every list is exact
+    query = sample()
+    exact = search.search(query, top_k=5)
+    approx = search.search(query, top_k=5, index="ivf", nprobe=10)
+    assert [r[0] for r in approx] == [r[0] for r in exact], "Full probe should match brute force"
+
+    # Test 5: Periodic retraining triggers after enough mutations
+    auto = IVFIndex(n_lists=10, retrain_ratio=0.1, seed=2)
+    db.attach_index("ivf_auto", auto)
+    trained_size = auto._trained_size
+    for i in range(400, 440):
+        db.add_vector(f"v{i}", sample())
+    assert auto._trained_size > trained_size, "Index should retrain as the collection drifts"
+
+    print("  ✓ All IVF index tests passed")
+
+
+def test_scalar_quantization():
+    """Test int8 scalar quantization with exact rescoring."""
+    print("Testing scalar quantization...")
+
+    import random
+    random.seed(17)
+
+    centres = [[random.gauss(0, 1) for _ in range(16)] for _ in range(8)]
+
+    def sample():
+        centre = random.choice(centres)
+        return [x + random.gauss(0, 0.3) for x in centre]
+
+    backends = ["python", "numpy"] if HAS_NUMPY else ["python"]
+    for backend in backends:
+        db = VectorDB(dimension=16, name="sq_test")
+        sq = ScalarQuantizer(rescore=20, train_size=100, seed=1, backend=backend)
+        db.attach_index("sq8", sq)
+
+        # Test 1: Vectors are kept aside until enough exist to train
+        for i in range(50):
+            db.add_vector(f"v{i}", sample(), {"odd": i % 2 == 1})
+        assert not sq.trained and len(sq) == 50, "Should not train on fewer than train_size vectors"
+        for i in range(50, 500):
+            db.add_vector(f"v{i}", sample(), {"odd": i % 2 == 1})
+        assert sq.trained and len(sq) == 500, "Should train once train_size vectors exist"
+
+        # Test 2: Codes are 4x smaller than float32 vectors
+        assert sq.nbytes * 4 == db.store.nbytes, "int8 codes should use 1 byte per value"
+
+        # Test 3: Recall against exact search is reported and high
+        search = VectorSearch(db, backend=backend)
+        queries = [sample() for _ in range(20)]
+        report = search.measure_recall(queries, top_k=5, index="sq8")
+        assert report["queries"] == 20 and report["recall"] >= 0.9, f"Recall too low: {report}"
+
+        # Test 4: Scores are exact, and rescoring everything is exact search
+        query = queries[0]
+        exact = search.search(query, top_k=5)
+        full = search.search(query, top_k=5, index="sq8", rescore=len(db))
+        assert [r[0] for r in full] == [r[0] for r in exact], "Full rescoring should match brute force"
+        assert all(abs(a[1] - b[1]) < 1e-9 for a, b in zip(full, exact)), "Rescored scores should be exact"
+
+        # Test 5: Filters, deletes and slot reuse
+        results = search.search(query, top_k=5, filter_fn=lambda m: m["odd"], index="sq8")
+        assert results and all(meta["odd"] for _, _, meta in results), "Filter should apply"
+        top_id = exact[0][0]
+        db.delete_vector(top_id)
+        assert top_id not in [r[0] for r in search.search(query, top_k=5, index="sq8")], \
+            "Deleted vector should not be returned"
+        db.add_vector("new", sample())
+        assert sq.nbytes * 4 == (db.store.num_rows - 1) * 16 * 4, "Freed slot should be reused"
+
+        # Test 6: Coarse scores are the same when codes are upcast in small blocks
+        import src.quantization as quantization
+        slots = sorted(sq._slots.values())
+        if backend == "numpy":
+            import numpy
+            slots = numpy.asarray(slots, dtype=numpy.intp)
+        whole = list(sq._coarse_scores(query, slots))
+        chunk_size, quantization.ADC_CHUNK = quantization.ADC_CHUNK, 7
+        try:
+            chunked = list(sq._coarse_scores(query, slots))
+            assert len(chunked) == len(whole) and all(abs(a - b) < 1e-4 for a, b in zip(chunked, whole)), \
+                "Chunked coarse scores should match (float32 rounding aside)"
+        finally:
+            quantization.ADC_CHUNK = chunk_size
+
+    print("  ✓ All scalar quantization tests passed")
+
+
+def test_product_quantization():
+    """Test product quantization with ADC scoring and optional reranking."""
+    print("Testing product quantization...")
+
+    import random
+    random.seed(19)
+
+    centres = [[random.gauss(0, 1) for _ in range(16)] for _ in range(8)]
+
+    def sample():
+        centre = random.choice(centres)
+        return [x + random.gauss(0, 0.3) for x in centre]
+
+    backends = ["python", "numpy"] if HAS_NUMPY else ["python"]
+    for backend in backends:
+        db = VectorDB(dimension=16, name="pq_test")
+        for i in range(400):
+            db.add_vector(f"v{i}", sample())
+
+        # Test 1: m must divide the dimension
+        try:
+            db.attach_index("bad", ProductQuantizer(m=5))
+            assert False, "Should raise ValueError when m does not divide the dimension"
+        except ValueError:
+            pass
+
+        pq = ProductQuantizer(m=4, n_centroids=32, train_size=200, seed=3, backend=backend)
+        db.attach_index("pq", pq)
+
+        # Test 2: One byte per subspace
+        assert pq.trained and pq.nbytes == 400 * 4, "Codes should use m bytes per vector"
+
+        # Test 3: ADC scores approximate exact similarities
+        search = VectorSearch(db, backend=backend)
+        query = sample()
+        exact = dict((vid, score) for vid, score, _ in search.search(query, top_k=400))
+        approx = search.search(query, top_k=20, index="pq", rescore=0)
+        assert len(approx) == 20, "ADC-only search should return top_k results"
+        error = sum(abs(score - exact[vid]) for vid, score, _ in approx) / len(approx)
+        assert error < 0.1, f"ADC scores should approximate cosine similarity, mean error {error:.3f}"
+
+        # Test 4: Exact reranking restores recall and exact scores
+        report = search.measure_recall([sample() for _ in range(20)], top_k=5, index="pq", rescore=50)
+        assert report["recall"] >= 0.9, f"Recall too low: {report}"
+        reranked = search.search(query, top_k=5, index="pq", rescore=50)
+        assert all(abs(score - exact[vid]) < 1e-9 for vid, score, _ in reranked), "Reranked scores should be exact"
+
+        # Test 5: New vectors are encoded with the trained codebooks
+        db.add_vector("new", query)
+        assert search.search(query, top_k=1, index="pq")[0][0] == "new", "New vector should be found"
+
+    print("  ✓ All product quantization tests passed")
+
+
+def test_binary_quantization():
+    """Test sign quantization with a Hamming prefilter."""
+    print("Testing binary quantization...")
+
+    import random
+    random.seed(23)
+
+    centres = [[random.gauss(0, 1) for _ in range(70)] for _ in range(8)]
+
+    def sample():
+        centre = random.choice(centres)
+        return [x + random.gauss(0, 0.3) for x in centre]
+
+    vectors = [sample() for _ in range(300)]
+    queries = [sample() for _ in range(20)]
+    codes = {}
+
+    backends = ["python", "numpy"] if HAS_NUMPY else ["python"]
+    for backend in backends:
+        db = VectorDB(dimension=70, name="binary_test")
+        for i, vector in enumerate(vectors):
+            db.add_vector(f"v{i}", vector)
+
+        bq = BinaryQuantizer(center=False, rescore=60, backend=backend)
+        db.attach_index("binary", bq)
+
+        # Test 1: 70 dimensions pack into two 64-bit words
+        assert bq.trained and bq.nbytes == 300 * 16, "Codes should use two uint64 words per vector"
+        codes[backend] = bytes(bq._codes)
+
+        # Test 2: Coarse scores are minus the Hamming distance of the sign bits
+        query = queries[0]
+        slot = bq._slots["v7"]
+        hamming = sum((q > 0) != (x > 0) for q, x in zip(query, vectors[7]))
+        scores = dict(bq._coarse_top(query, len(bq), None))
+        assert scores[slot] == -hamming, "Coarse score should be minus the Hamming distance"
+
+        # Test 3: Rescoring the Hamming candidates gives high recall
+        search = VectorSearch(db, backend=backend)
+        report = search.measure_recall(queries, top_k=5, index="binary")
+        assert report["recall"] >= 0.9, f"Recall too low: {report}"
+
+        # Test 4: Without rescoring, scores are angle estimates in [-1, 1]
+        results = search.search(query, top_k=5, index="binary", rescore=0)
+        assert len(results) == 5 and all(-1 <= score <= 1 for _, score, _ in results), \
+            "Hamming estimates should be valid similarities"
+
+    # Test 5: Both backends pack bits identically
+    if HAS_NUMPY:
+        assert codes["python"] == codes["numpy"], "Backends should produce identical codes"
+
+    print("  ✓ All binary quantization tests passed")
+
+
+def test_similarity_join():
+    """Test the tiled near-duplicate join against a pairwise scan."""
+    print("Testing similarity join...")
+
+    import random
+    random.seed(5)
+
+    db = VectorDB(dimension=8, name="join_test")
+    for i in range(60):
+        base = [random.gauss(0, 1) for _ in range(8)]
+        db.add_vector(f"v{i}", base)
+        if i % 4 == 0:
+            db.add_vector(f"d{i}", [x * 2 + random.gauss(0, 0.01) for x in base])
+    db.add_vector("zero", [0.0] * 8)
+    db.delete_vector("v1")
+
+    ids = db.get_all_ids()
+    expected = []
+    for i, id1 in enumerate(ids):
+        for id2 in ids[i + 1:]:
+            v1, v2 = db.get_vector_data(id1), db.get_vector_data(id2)
+            if magnitude(v1) and magnitude(v2) and cosine_similarity(v1, v2) >= 0.95:
+                expected.append((id1, id2))
+
+    backends = ["python", "numpy"] if HAS_NUMPY else ["python"]
+    for backend in backends:
+        search = VectorSearch(db, backend=backend)
+
+        # Test 1: Same pairs as the pairwise scan, for any block size
+        for block_rows in (1, 7, 1024):
+            duplicates = search.find_duplicates(threshold=0.95, block_rows=block_rows)
+            assert [(a, b) for a, b, _ in duplicates] == expected, \
+                f"{backend} join with block_rows={block_rows} should match pairwise scan"
+
+        # Test 2: Generator yields the same pairs, also from a process pool
+        pairs = sorted((a, b) for a, b, _ in search.iter_duplicates(threshold=0.95, block_rows=16, workers=2))
+        assert pairs == sorted(expected), f"{backend} pooled join should match pairwise scan"
+
+    print("  ✓ All similarity join tests passed")
+
+
+def test_lsh_index():
+    """Test LSH near-duplicate candidates against the exact join."""
+    print("Testing LSH index...")
+
+    import random
+    random.seed(9)
+
+    db = VectorDB(dimension=16, name="lsh_test")
+    lsh = LSHIndex(n_bits=10, n_tables=8, seed=4)
+    db.attach_index("lsh", lsh)
+    for i in range(300):
+        base = [random.gauss(0, 1) for _ in range(16)]
+        db.add_vector(f"v{i}", base)
+        if i % 10 == 0:
+            db.add_vector(f"d{i}", [x + random.gauss(0, 0.02) for x in base])
+    db.add_vector("zero", [0.0] * 16)
+    db.delete_vector("v10")
+
+    search = VectorSearch(db)
+    exact = search.find_duplicates(threshold=0.98)
+    assert len(exact) == 29, "Fixture should contain 29 duplicate pairs"
+
+    # Test 1: Verified LSH pairs are a subset of the exact ones with high recall
+    approx = search.find_duplicates(threshold=0.98, index="lsh")
+    exact_pairs = {(a, b) for a, b, _ in exact}
+    approx_pairs = {(a, b) for a, b, _ in approx}
+    assert approx_pairs <= exact_pairs, "LSH should only report verified pairs"
+    assert len(approx_pairs) >= 0.9 * len(exact_pairs), "LSH should find most duplicates"
+
+    # Test 2: Far fewer candidates than all pairs, each reported once
+    candidates = list(lsh.candidate_pairs())
+    assert len(candidates) == len(set(candidates)), "Candidate pairs should be unique"
+    assert len(candidates) < len(db) * (len(db) - 1) / 20, "Buckets should be selective"
+
+    # Test 3: Insert-time check finds the original of a new near-duplicate
+    original = db.get_vector_data("v42")
+    hits = lsh.query_similar([x + 0.01 for x in original], threshold=0.98)
+    assert hits and hits[0][0] == "v42", "Should flag the near-duplicate"
+
+    # Test 4: Deletes leave the buckets; other index types are rejected
+    db.delete_vector("v42")
+    assert "v42" not in lsh.candidates(original), "Deleted vector should leave its buckets"
+    db.attach_index("hnsw", HNSWIndex(seed=1))
+    try:
+        search.find_duplicates(threshold=0.98, index="hnsw")
+        assert False, "Should raise ValueError for an index without duplicate support"
+    except ValueError:
+        pass
+
+    print("  ✓ All LSH index tests passed")
+
+
+def test_query_cache():
+    """Test the query result cache and its invalidation."""
+    print("Testing query cache...")
+
+    import time
+
+    db = VectorDB(dimension=3, name="cache_test")
+    db.add_vector("a", [1.0, 0.0, 0.0], {"kind": "x"})
+    db.add_vector("b", [0.9, 0.1, 0.0], {"kind": "y"})
+    db.add_vector("c", [0.0, 1.0, 0.0], {"kind": "x"})
+    search = VectorSearch(db, cache_size=2)
+    query = [1.0, 0.0, 0.0]
+
+    # Test 1: A repeated query is a hit with the same results
+    first = search.search(query, top_k=2)
+    assert search.search(query, top_k=2) == first, "Cached results should match"
+    assert search.cache_stats()["hits"] == 1 and search.cache_stats()["misses"] == 1
+
+    # Test 2: top_k and filter specs are part of the key; callables bypass the cache
+    assert len(search.search(query, top_k=1)) == 1
+    assert [r[0] for r in search.search(query, top_k=2, filter_fn={"kind": "x"})] == ["a", "c"]
+    search.search(query, top_k=2, filter_fn=lambda m: True)
+    stats = search.cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 3, 2), f"Unexpected stats {stats}"
+
+    # Test 3: Every mutation invalidates cached results
+    search.search(query, top_k=2)
+    db.add_vector("d", [1.0, 0.01, 0.0])
+    assert search.search(query, top_k=2)[1][0] == "d", "Add should invalidate the cache"
+    db.update_vector("d", metadata={"kind": "z"})
+    assert search.search(query, top_k=2)[1][2] == {"kind": "z"}, "Update should invalidate the cache"
+    db.delete_vector("d")
+    assert search.search(query, top_k=2) == first, "Delete should invalidate the cache"
+
+    # Test 4: Entries expire after the TTL
+    search = VectorSearch(db, cache_ttl=0.05)
+    search.search(query)
+    time.sleep(0.1)
+    search.search(query)
+    assert search.cache_stats()["hits"] == 0, "Expired entry should miss"
+    assert VectorSearch(db, cache_size=0).cache_stats() == {}, "cache_size=0 should disable the cache"
+
+    print("  ✓ All query cache tests passed")
+
+
+def test_range_search():
+    """Test range search and the streaming result iterator."""
+    print("Testing range search and iter_search...")
+
+    import itertools
+    import random
+    random.seed(21)
+
+    db = VectorDB(dimension=6, name="range_test")
+    for i in range(300):
+        # Few distinct directions, so ties are common
+        db.add_vector(f"v{i}", [float(random.randint(-1, 1)) for _ in range(6)], {"group": i % 4})
+    db.add_vector("zero", [0.0] * 6, {"group": 0})
+    db.delete_vector("v5")
+    query = [1.0, 0.5, 0.0, -1.0, 0.0, 0.5]
+
+    backends = ["python", "numpy"] if HAS_NUMPY else ["python"]
+    for backend in backends:
+        search = VectorSearch(db, backend=backend, cache_size=0)
+        for filter_fn in (None, {"group": 2}):
+            everything = search.search(query, top_k=len(db), filter_fn=filter_fn)
+
+            # Test 1: Range search returns exactly the results above the threshold
+            in_range = search.search_range(query, 0.5, filter_fn=filter_fn)
+            assert in_range == [r for r in everything if r[1] >= 0.5], f"{backend} range search differs"
+            assert in_range and all(score >= 0.5 for _, score, _ in in_range)
+
+            # Test 2: Every prefix of iter_search is the top-n of search()
+            for n in (1, 7, 8, 40):
+                prefix = list(itertools.islice(search.iter_search(query, batch_size=8, filter_fn=filter_fn), n))
+                assert prefix == everything[:n], f"{backend} iter_search prefix of {n} differs"
+            assert list(search.iter_search(query, batch_size=8, filter_fn=filter_fn)) == everything, \
+                f"{backend} iter_search should yield every candidate"
+
+    # Test 3: With an index, batches widen until every hit has been yielded once
+    db.attach_index("hnsw", HNSWIndex(seed=2))
+    search = VectorSearch(db)
+    ids = [vid for vid, _, _ in search.iter_search(query, batch_size=16, index="hnsw", ef_search=400)]
+    assert len(ids) == len(set(ids)) and len(ids) >= 0.9 * (len(db) - 1), "Index iteration should widen"
+
+    # Test 4: Invalid batch sizes are rejected
+    try:
+        next(search.iter_search(query, batch_size=0))
+        assert False, "Should raise ValueError for batch_size=0"
+    except ValueError:
+        pass
+
+    print("  ✓ All range search tests passed")
+
+
+def test_query_planner():
+    """Test pre-filter vs post-filter planning of filtered index searches."""
+    print("Testing query planner...")
+
+    import random
+    random.seed(22)
+
+    db = VectorDB(dimension=8, name="planner_test")
+    for i in range(1000):
+        db.add_vector(f"v{i}", [random.gauss(0, 1) for _ in range(8)], {"rid": i % 100, "kind": i % 2})
+    db.create_metadata_index("rid")
+    db.create_metadata_index("kind")
+    db.attach_index("hnsw", HNSWIndex(seed=3))
+    search = VectorSearch(db, cache_size=0)
+    query = [random.gauss(0, 1) for _ in range(8)]
+
+    def exact(filter_fn, top_k=10):
+        return [vid for vid, _, _ in search.search(query, top_k=top_k, filter_fn=filter_fn)]
+
+    # Test 1: Strategies follow the estimated selectivity
+    assert search.plan()["strategy"] == "scan"
+    assert search.plan({"rid": 7})["strategy"] == "subset_scan"
+    assert search.plan(index="hnsw")["strategy"] == "index"
+    assert search.plan({"rid": 7}, "hnsw") == {"strategy": "subset_scan", "estimated_matches": 10, "total": 1000}
+    assert search.plan({"kind": 1}, "hnsw")["strategy"] == "index_post_filter"
+    assert search.plan(lambda m: True, "hnsw")["strategy"] == "index_post_filter"
+
+    # Test 2: Selective filters are answered exactly over their subset
+    results = search.search(query, top_k=10, filter_fn={"rid": 7}, index="hnsw")
+    assert [vid for vid, _, _ in results] == exact({"rid": 7}), "Selective filter should be exact"
+
+    # Test 3: Broad filters post-filter the index and still fill top_k
+    results = search.search(query, top_k=10, filter_fn={"kind": 1}, index="hnsw")
+    assert len(results) == 10 and all(meta["kind"] == 1 for _, _, meta in results)
+    assert len({vid for vid, _, _ in results} & set(exact({"kind": 1}))) >= 9, "Post-filtered recall too low"
+
+    # Test 4: A selective callable widens until complete
+    results = search.search(query, top_k=10, filter_fn=lambda m: m["rid"] == 3, index="hnsw")
+    assert sorted(vid for vid, _, _ in results) == sorted(exact({"rid": 3})), "Widening should find every match"
+
+    print("  ✓ All query planner tests passed")
+
+
+def test_hybrid_search():
+    """Test the BM25 lexical index and reciprocal rank fusion with vector search."""
+    print("Testing hybrid search...")
+
+    db = VectorDB(dimension=3, name="hybrid_test")
+    db.add_vector("i1", [0.0, 0.0, 1.0], {"name": "Nasi Goreng", "store": "Warung A"})
+    db.add_vector("i2", [1.0, 0.0, 0.0], {"name": "Mie Goreng", "store": "Warung B"})
+    db.add_vector("i3", [0.9, 0.1, 0.0], {"name": "Es Teh", "store": "Warung A"})
+    db.add_vector("i4", [0.0, 1.0, 0.0], {"name": "Nasi Putih Nasi", "store": "Warung B"})
+    db.add_vector("bare", [0.5, 0.5, 0.0], {"price": 3})
+    lexical = LexicalIndex(["name", "store"])
+    db.attach_index("bm25", lexical)
+
+    # Test 1: BM25 ranks exact word matches; rarer terms weigh more
+    hits = lexical.search_text("nasi goreng", top_k=5)
+    assert [vid for vid, _ in hits][:1] == ["i1"], "Document with both terms should rank first"
+    assert {vid for vid, _ in hits} == {"i1", "i2", "i4"}, "Only documents sharing a term should match"
+    assert lexical.search_text("NASI", top_k=5, allowed={"i1"})[0][0] == "i1", "Matching is case-insensitive"
+    assert lexical.search_text("rendang", top_k=5) == [] and len(lexical) == 5
+
+    # Test 2: The index follows updates and deletes
+    db.update_vector("i3", metadata={"name": "Nasi Goreng Spesial", "store": "Warung A"})
+    assert "i3" in {vid for vid, _ in lexical.search_text("spesial", top_k=5)}
+    assert lexical.search_text("teh", top_k=5) == [], "Old text should be dropped on update"
+    db.delete_vector("i2")
+    assert "i2" not in {vid for vid, _ in lexical.search_text("goreng", top_k=5)}
+
+    # Test 3: RRF puts documents ranked well by both retrievers first
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert fused[0][0] == "b" and abs(fused[0][1] - (1 / 62 + 1 / 61)) < 1e-12
+    assert [vid for vid, _ in fused] == ["b", "a", "d", "c"]
+
+    # Test 4: Hybrid search surfaces the lexical match the vector misses
+    hybrid = HybridSearch(VectorSearch(db))
+    query = [1.0, 0.0, 0.0]
+    vector_only = [vid for vid, _, _ in VectorSearch(db).search(query, top_k=2)]
+    assert "i1" not in vector_only, "Vector search alone should miss the exact name"
+    results = hybrid.search("nasi goreng", query, top_k=2)
+    assert [vid for vid, _, _ in results] == ["i3", "i1"], f"Unexpected hybrid ranking {results}"
+    assert results[1][2]["name"] == "Nasi Goreng", "Lexical-only hits should carry metadata"
+
+    # Test 5: Filters apply to both retrievers; weights can turn one off
+    results = hybrid.search("nasi", query, top_k=5, filter_fn={"store": "Warung B"})
+    assert [vid for vid, _, _ in results][:1] == ["i4"] and all(meta.get("store") == "Warung B"
+                                                                for _, _, meta in results)
+    lexical_only = hybrid.search("nasi goreng", query, top_k=2, weights=(0.0, 1.0))
+    assert [vid for vid, _, _ in lexical_only] == [vid for vid, _ in lexical.search_text("nasi goreng", 2)]
+
+    # Test 6: A lexical index is not a vector index, and must be attached
+    try:
+        VectorSearch(db).search(query, top_k=1, index="bm25")
+        assert False, "Should raise ValueError for a vector search of a lexical index"
+    except ValueError:
+        pass
+    try:
+        HybridSearch(VectorSearch(db), lexical="missing").search("nasi", query)
+        assert False, "Should raise ValueError for a missing lexical index"
+    except ValueError:
+        pass
+
+    print("  ✓ All hybrid search tests passed")
+
+
+def test_mmr_search():
+    """Test maximal marginal relevance re-ranking of search results."""
+    print("Testing MMR re-ranking...")
+
+    import random
+    random.seed(25)
+
+    db = VectorDB(dimension=4, name="mmr_test")
+    # Three tight clusters: near-duplicates of one receipt each
+    centers = {"a": [1.0, 0.2, 0.0, 0.0], "b": [0.6, 1.0, 0.0, 0.0], "c": [0.5, 0.0, 1.0, 0.0]}
+    for name, center in centers.items():
+        for i in range(6):
+            db.add_vector(f"{name}{i}", [x + random.gauss(0, 0.01) for x in center], {"cluster": name})
+    db.add_vector("zero", [0.0] * 4, {"cluster": "none"})
+    query = [1.0, 0.3, 0.1, 0.0]
+
+    def reference(candidates, top_k, mmr_lambda):
+        """Naive MMR over the candidate list."""
+        vectors = {vid: db.get_vector_data(vid) for vid, _, _ in candidates}
+        picks, remaining = [], list(candidates)
+        while remaining and len(picks) < top_k:
+            def gain(hit):
+                penalty = max((cosine_similarity(vectors[hit[0]], vectors[p[0]]) for p in picks), default=0.0)
+                return mmr_lambda * hit[1] - (1 - mmr_lambda) * penalty
+            best = max(remaining, key=gain)
+            picks.append(best)
+            remaining.remove(best)
+        return [vid for vid, _, _ in picks]
+
+    backends = ["python", "numpy"] if HAS_NUMPY else ["python"]
+    for backend in backends:
+        search = VectorSearch(db, backend=backend)
+        plain = search.search(query, top_k=3)
+
+        # Test 1: Plain search fills every slot from the best cluster; MMR spreads them
+        assert {meta["cluster"] for _, _, meta in plain} == {"a"}
+        diverse = search.search(query, top_k=3, mmr_lambda=0.5)
+        assert {meta["cluster"] for _, _, meta in diverse} == {"a", "b", "c"}, f"{backend} MMR should diversify"
+        assert diverse[0] == plain[0], "The most relevant result is always picked first"
+        assert all(hit in search.search(query, top_k=len(db)) for hit in diverse), "Scores stay similarities"
+
+        # Test 2: lambda = 1 is plain top-k; other values match a naive MMR loop
+        assert search.search(query, top_k=5, mmr_lambda=1.0) == search.search(query, top_k=5)
+        candidates = search.search(query, top_k=10)
+        for mmr_lambda in (0.0, 0.3, 0.7):
+            ids = [vid for vid, _, _ in search.search(query, top_k=4, mmr_lambda=mmr_lambda, fetch_k=10)]
+            assert ids == reference(candidates, 4, mmr_lambda), f"{backend} MMR differs at lambda={mmr_lambda}"
+
+        # Test 3: Filters and fetch_k limit the candidates
+        filtered = search.search(query, top_k=3, filter_fn={"cluster": "b"}, mmr_lambda=0.5)
+        assert len(filtered) == 3 and all(meta["cluster"] == "b" for _, _, meta in filtered)
+        assert len(search.search(query, top_k=3, mmr_lambda=0.5, fetch_k=3)) == 3
+
+    # Test 4: Unnormalized and normalized DBs rank the same way
+    unit_db = VectorDB(dimension=4, name="mmr_unit", normalize=True)
+    for vid in db.get_all_ids():
+        unit_db.add_vector(vid, db.get_vector_data(vid), db.get_vector(vid)["metadata"])
+    unit_ids = [vid for vid, _, _ in VectorSearch(unit_db).search(query, top_k=4, mmr_lambda=0.4)]
+    assert unit_ids == [vid for vid, _, _ in VectorSearch(db).search(query, top_k=4, mmr_lambda=0.4)]
+
+    # Test 5: Invalid parameters are rejected
+    for kwargs in ({"mmr_lambda": 1.5}, {"mmr_lambda": -0.1}, {"mmr_lambda": 0.5, "fetch_k": 2}):
+        try:
+            VectorSearch(db).search(query, top_k=3, **kwargs)
+            assert False, f"Should raise ValueError for {kwargs}"
+        except ValueError:
+            pass
+
+    print("  ✓ All MMR tests passed")
+
+
+def test_vector_collections():
+    """Test named collections: isolation, fan-out search and persistence."""
+    print("Testing vector collections...")
+
+    import random
+    import shutil
+    random.seed(23)
+
+    directory = "test_collections"
+    db = VectorCollections(dimension=4, name="shop")
+    receipts = db.create_collection("receipts")
+    items = db.create_collection("items", normalize=True)
+    for i in range(30):
+        receipts.add_vector(f"r{i}", [random.gauss(0, 1) for _ in range(4)], {"kind": "receipt"})
+        items.add_vector(f"i{i}", [random.gauss(0, 1) for _ in range(4)], {"kind": "item", "odd": i % 2})
+    items.add_vector("r0", [1.0, 0.0, 0.0, 0.0], {"kind": "item", "odd": 0})
+    query = [0.5, -1.0, 0.2, 0.8]
+
+    try:
+        # Test 1: Collections are separate blocks; the same ID may live in both
+        assert db.list_collections() == ["receipts", "items"] and len(db) == 61
+        assert len(receipts.store) == 30 and len(items.store) == 31
+        only_items = db.searcher("items").search(query, top_k=5)
+        assert all(meta["kind"] == "item" for _, _, meta in only_items), "Search should stay in its collection"
+        assert db.get_vector("r0", "items")["metadata"]["kind"] == "item"
+        assert db.get_vector("i3")["collection"] == "items"
+
+        # Test 2: Fan-out merges per-collection results by score
+        merged = db.search(query, top_k=8)
+        per_collection = [(name,) + hit for name in ("receipts", "items")
+                          for hit in db.searcher(name).search(query, top_k=8)]
+        expected = sorted(per_collection, key=lambda hit: -hit[2])[:8]
+        assert merged == expected, "Fan-out should merge by score"
+        assert [h[0] for h in db.search(query, top_k=3, collections=["items"])] == ["items"] * 3
+        filtered = db.search(query, top_k=40, filter_fn={"odd": 1})
+        assert len(filtered) == 15 and all(c == "items" for c, _, _, _ in filtered), "Filter applies everywhere"
+
+        # Test 3: Each collection has its own indexes
+        items.attach_index("hnsw", HNSWIndex(seed=5))
+        approx = db.search(query, top_k=5, indexes={"items": "hnsw"}, ef_search=50)
+        assert [h[1] for h in approx] == [h[1] for h in merged[:5]], "Per-collection index should be used"
+
+        # Test 4: Invalid names and unknown collections are rejected
+        for bad in ("items", "../x", ""):
+            try:
+                db.create_collection(bad)
+                assert False, f"Should raise ValueError for {bad!r}"
+            except ValueError:
+                pass
+        try:
+            db.search(query, collections=["missing"])
+            assert False, "Should raise ValueError for an unknown collection"
+        except ValueError:
+            pass
+
+        # Test 5: One directory persists every collection; reloads rebuild indexes
+        for binary in (True, False):
+            assert db.save(directory, binary=binary)
+            loaded = VectorCollections(dimension=1)
+            assert loaded.load(directory)
+            assert loaded.list_collections() == ["receipts", "items"] and loaded["items"].normalize
+            assert loaded.search(query, top_k=8) == merged, "Reloaded collections should search the same"
+            shutil.rmtree(directory)
+        db.save(directory)
+        items.add_vector("late", [0.0, 0.0, 0.0, 1.0])
+        assert db.load(directory) and "late" not in db["items"] and len(db["items"].indexes["hnsw"]) == 31
+
+        # Test 6: Per-collection WALs, including collections created afterwards
+        assert db.enable_wal(directory, checkpoint_bytes=None) == 0
+        db["receipts"].add_vector("r99", [0.1, 0.2, 0.3, 0.4])
+        db.create_collection("notes").add_vector("n1", [1.0, 1.0, 0.0, 0.0])
+        db.flush()
+        for collection in db.collections.values():
+            collection.wal.close()
+        replayed = VectorCollections(dimension=4)
+        assert replayed.load(directory) and replayed.enable_wal(directory) == 2
+        assert "r99" in replayed["receipts"] and "n1" in replayed["notes"]
+        assert replayed.drop_collection("notes") and not os.path.exists(os.path.join(directory, "notes.vdb.wal"))
+        for collection in replayed.collections.values():
+            collection.wal.close()
+        shutil.rmtree(directory)
+
+        # Test 7: Reloading over existing collections replaces stale searchers
+        saved = VectorCollections(dimension=3)
+        saved.create_collection("r").add_vector("a", [1.0, 0.0, 0.0])
+        assert saved.save(directory)
+        current = VectorCollections(dimension=2)
+        current.create_collection("r").add_vector("b", [0.0, 1.0])
+        current.create_collection("gone")
+        kept = current.searcher("r")
+        assert current.load(directory) and current.list_collections() == ["r"]
+        assert current.searcher("r").db is current["r"] and current.searcher("r") is not kept
+        assert [vid for vid, _, _ in current.searcher("r").search([1.0, 0.0, 0.0], top_k=1)] == ["a"]
+        same = current.searcher("r")
+        assert current.load(directory) and current.searcher("r") is same, "Same VectorDB keeps its searcher"
+        try:
+            current.searcher("gone")
+            assert False, "Collections missing from the manifest should be dropped"
+        except ValueError:
+            pass
+    finally:
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+
+    print("  ✓ All vector collection tests passed")
+
+
 def test_edge_cases():
     """Test edge cases and error handling."""
     print("Testing edge cases...")
@@ -354,10 +1943,35 @@ def run_all_tests():
         ]),
         ("Vector Database", [
             test_vector_db_crud,
-            test_vector_db_persistence
+            test_vector_db_compaction,
+            test_vector_db_normalize,
+            test_vector_db_persistence,
+            test_vector_db_binary_persistence,
+            test_vector_db_wal,
+            test_vector_db_dtype,
+            test_vector_db_out_of_core,
+            test_concurrent_access,
+            test_metadata_filters,
+            test_vector_collections
         ]),
         ("Vector Search", [
             test_vector_search,
+            test_search_backends,
+            test_top_k_selection,
+            test_batch_search,
+            test_sharded_search,
+            test_hnsw_index,
+            test_ivf_index,
+            test_scalar_quantization,
+            test_product_quantization,
+            test_binary_quantization,
+            test_similarity_join,
+            test_lsh_index,
+            test_query_cache,
+            test_range_search,
+            test_query_planner,
+            test_hybrid_search,
+            test_mmr_search,
             test_edge_cases
         ])
     ]
@@ -29,7 +29,7 @@ def initialize_components():
     ocr = OCRExtractor()
     storage = StorageIntegration(
         db_path="./data/receipts.db",
-        vector_db_path="./data/vector_db.json"
+        vector_db_path="./data/vector_db.vdb"
     )
     return ocr, storage
 
@@ -202,6 +202,10 @@ with tabs[0]:
 
                                 st.info(f"Stored {result['item_count']} items in database")
 
+                                if result.get('possible_duplicates'):
+                                    duplicate_ids = ", ".join(str(d['receipt_id']) for d in result['possible_duplicates'])
+                                    st.warning(f"This receipt looks like a duplicate of receipt ID(s): {duplicate_ids}")
+
                                 # Clean up session state
                                 del st.session_state.extracted_data
                                 del st.session_state.current_file
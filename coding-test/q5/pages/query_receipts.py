@@ -23,7 +23,7 @@ def initialize_query_components():
 
     storage = StorageIntegration(
         db_path="./data/receipts.db",
-        vector_db_path="./data/vector_db.json"
+        vector_db_path="./data/vector_db.vdb"
     )
     db = DatabaseManager(db_path="./data/receipts.db")
     agent = ReceiptQueryAgent(db=db, storage=storage)
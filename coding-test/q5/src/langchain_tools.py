@@ -186,10 +186,11 @@ class VectorSearchInput(BaseModel):
 class VectorSearchTool(BaseTool):
     name: str = "vector_search"
     description: str = """
-    Semantic search across all receipts and items using natural language.
-    Use this when the query is complex or when exact keyword matching might miss relevant results.
-    Input should be a natural language query describing what to search for.
-    Returns semantically similar receipts and items ranked by relevance.
+    Hybrid keyword + semantic search across all receipts and items.
+    Matches exact item or store names (e.g. "nasi goreng") by keyword and vague descriptions by meaning, in one call.
+    Use this when the query is complex, ambiguous, or when exact keyword matching alone might miss relevant results.
+    Input should be item names or a natural language query describing what to search for.
+    Returns matching receipts and items ranked by relevance.
     """
     args_schema: Type[BaseModel] = VectorSearchInput
     storage: Optional[StorageIntegration] = None
@@ -200,15 +201,13 @@ class VectorSearchTool(BaseTool):
 
     def _run(self, query: str, top_k: int = 5) -> str:
         try:
-            year_filter = None
+            filters = None
             year_match = re.search(r'\b(19\d{2}|20\d{2})\b', query)
             if year_match:
-                year_filter = year_match.group(1)
+                year = year_match.group(1)
+                filters = {"date": {"gte": f"{year}-01-01", "lte": f"{year}-12-31"}}
 
-            results = self.storage.search_receipts_semantic(query, top_k * 3)
-
-            if year_filter:
-                results = [r for r in results if r['upload_date'].startswith(year_filter)]
+            results = self.storage.search_receipts_hybrid(query, top_k, filters=filters)
 
             if results:
                 avg_similarity = sum(r.get('similarity_score', 0) for r in results) / len(results)
@@ -1,13 +1,33 @@
 from typing import Dict, Any, Optional
+import heapq
 import os
+import threading
 from datetime import datetime
 
 from src.database import DatabaseManager
 from src.embeddings import EmbeddingGenerator
+from src.vector_db.cosine_similarity import cosine_similarity
 from src.vector_db.vector_db import VectorDB
-from src.vector_db.vector_search import VectorSearch
+from src.vector_db.vector_collections import MANIFEST, VectorCollections
+from src.vector_db.hnsw_index import HNSWIndex
+from src.vector_db.hybrid_search import HybridSearch
+from src.vector_db.lexical_index import LexicalIndex
+from src.vector_db.lsh_index import LSHIndex
 from src.ocr_extractor import ReceiptData
 
+# Receipt embeddings at least this similar are flagged as likely duplicates
+DUPLICATE_THRESHOLD = 0.98
+
+# Below this many vectors an exact brute-force scan takes a few milliseconds
+# and building an HNSW graph (~25 s for 3k x 384) is not worth it
+HNSW_MIN_VECTORS = 20000
+
+# Vector collections: one vector per receipt, one per line item
+COLLECTIONS = ("receipts", "items")
+
+# Metadata text each collection's BM25 index covers (hybrid search)
+LEXICAL_FIELDS = {"receipts": ["store_name"], "items": ["item_name", "store_name"]}
+
 
 class StorageIntegration:
     """
@@ -17,14 +37,18 @@ class StorageIntegration:
     def __init__(
         self,
         db_path: str = "./data/receipts.db",
-        vector_db_path: str = "./data/vector_db.json"
+        vector_db_path: str = "./data/vector_db.vdb"
     ):
         """
         Initialize storage integration
 
         Args:
             db_path: Path to SQLite database
-            vector_db_path: Path to Vector database file
+            vector_db_path: Vector database location; the collections are
+                kept in the directory of the same name without extension
+                (./data/vector_db.vdb -> ./data/vector_db/). A single-file
+                DB at this path (or a .json with the same stem) is migrated
+                into the collections on first start.
         """
         # Initialize SQLite database
         self.db = DatabaseManager(db_path=db_path)
@@ -37,19 +61,108 @@ class StorageIntegration:
         sample_embedding = self.embedding_gen.generate_query_embedding("test")
         embedding_dimension = len(sample_embedding)
 
-        # Initialize Vector database
+        # Initialize Vector database: receipt-level and item-level vectors
+        # live in separate collections, so each search and index only
+        # covers the kind of vector it needs
         self.vector_db_path = vector_db_path
-        self.vector_db = VectorDB(dimension=embedding_dimension, name="receipts_vector_db")
+        self.vector_db_dir = os.path.splitext(vector_db_path)[0]
+        self.vector_db = VectorCollections(dimension=embedding_dimension, name="receipts_vector_db",
+                                           normalize=True)
 
-        # Load existing vector database if it exists
-        if os.path.exists(vector_db_path):
-            self.vector_db.load(vector_db_path)
-            print(f"✓ Vector database loaded: {vector_db_path}")
+        if os.path.exists(os.path.join(self.vector_db_dir, MANIFEST)):
+            self.vector_db.load(self.vector_db_dir)
+            print(f"✓ Vector database loaded: {self.vector_db_dir}")
         else:
-            print(f"✓ Vector database initialized: {vector_db_path}")
+            for name in COLLECTIONS:
+                self.vector_db.create_collection(name)
+            migrated = self._migrate_single_file(vector_db_path, embedding_dimension)
+            if migrated:
+                print(f"✓ Migrated {migrated} vectors from {vector_db_path} into collections")
+            print(f"✓ Vector database initialized: {self.vector_db_dir}")
+
+        for name in COLLECTIONS:
+            if name not in self.vector_db:
+                self.vector_db.create_collection(name)
+
+        # Persist mutations through write-ahead logs (one per collection)
+        # instead of rewriting the files per receipt; checkpoints fold them
+        # into the snapshots
+        replayed = self.vector_db.enable_wal(self.vector_db_dir)
+        if replayed:
+            print(f"✓ Replayed {replayed} vector DB log records")
+
+        # Index the metadata fields receipt queries filter on, so filtered
+        # searches resolve their candidates without scanning every vector
+        for name in COLLECTIONS:
+            self.vector_db[name].create_metadata_index("receipt_id")
+            self.vector_db[name].create_metadata_index("date", kind="range")
+
+        # LSH buckets let store_receipt flag likely duplicate receipts without a full scan
+        self.vector_db["receipts"].attach_index("lsh", LSHIndex())
+
+        # BM25 over item and store names, so exact names are matched by
+        # their words in hybrid search
+        for name in COLLECTIONS:
+            self.vector_db[name].attach_index("bm25", LexicalIndex(LEXICAL_FIELDS[name]))
+
+        # Semantic search scans every vector of a collection until it is
+        # large enough for an HNSW index, which is then built in the background
+        self._hnsw_threads = {}
+        self._maybe_build_hnsw()
+
+    def _migrate_single_file(self, vector_db_path: str, dimension: int) -> int:
+        """
+        Split a single-file vector DB (and its log) into the receipt and item collections.
 
-        # Initialize vector search engine
-        self.vector_search = VectorSearch(self.vector_db)
+        The legacy file (binary, or JSON with the same stem) is left in place.
+
+        Returns:
+            int: Number of vectors migrated
+        """
+        legacy_path = vector_db_path
+        if not os.path.isfile(legacy_path):
+            legacy_path = os.path.splitext(vector_db_path)[0] + ".json"
+            if not os.path.isfile(legacy_path):
+                return 0
+
+        legacy = VectorDB(dimension=dimension, name="receipts_vector_db", normalize=True)
+        legacy.load(legacy_path)
+        if os.path.exists(legacy_path + ".wal"):
+            # Replay mutations logged after the last checkpoint
+            legacy.enable_wal(legacy_path, checkpoint_bytes=None)
+            legacy.wal.close()
+
+        for vector_id in legacy.get_all_ids():
+            entry = legacy.get_vector(vector_id)
+            name = "items" if entry['metadata'].get('type') == 'item' else "receipts"
+            self.vector_db[name].add_vector(vector_id, entry['vector'], entry['metadata'])
+
+        self.vector_db.save(self.vector_db_dir)
+        return len(legacy)
+
+    def _maybe_build_hnsw(self):
+        """
+        Start building an HNSW index for each collection, in a background
+        thread, once the collection holds HNSW_MIN_VECTORS vectors.
+
+        The graph is not persisted, so it is rebuilt after every start.
+        VectorDB.build_index() builds it while store_receipt and deletes
+        carry on and only makes them wait for the short catch-up that
+        attaches it; searches keep using the exact scan until then.
+        """
+        for name in COLLECTIONS:
+            collection = self.vector_db[name]
+            if name in self._hnsw_threads or len(collection) < HNSW_MIN_VECTORS:
+                continue
+
+            self._hnsw_threads[name] = threading.Thread(
+                target=collection.build_index,
+                args=("hnsw", HNSWIndex()),
+                name=f"hnsw-build-{name}",
+                daemon=True
+            )
+            self._hnsw_threads[name].start()
+            print(f"✓ Building HNSW index over {len(collection)} {name} vectors in the background")
 
     def store_receipt(
         self,
@@ -88,19 +201,37 @@ class StorageIntegration:
 
             receipt_embedding = self.embedding_gen.generate_receipt_embedding(receipt_dict)
 
+            # Flag receipts that look like one already stored (e.g. the same
+            # receipt uploaded twice)
+            possible_duplicates = []
+            receipts = self.vector_db["receipts"]
+            with receipts.lock.read():
+                for vector_id, similarity in receipts.indexes["lsh"].query_similar(
+                        receipt_embedding.tolist(), DUPLICATE_THRESHOLD):
+                    entry = receipts.get_vector(vector_id)
+                    if entry is not None:
+                        possible_duplicates.append({
+                            'receipt_id': entry['metadata'].get('receipt_id'),
+                            'similarity': similarity
+                        })
+
+            if possible_duplicates:
+                print(f"  ⚠ Possible duplicate of receipt(s): "
+                      f"{[d['receipt_id'] for d in possible_duplicates]}")
+
             # Store receipt embedding in Vector DB
             receipt_metadata = {
                 'type': 'receipt',
                 'receipt_id': receipt_id,
                 'store_name': receipt_data.store_name,
-                'date': receipt_data.date,
+                'date': upload_date,
                 'total_amount': receipt_data.total_amount
             }
 
             # Generate unique vector ID
             receipt_vector_id = f"receipt_{receipt_id}"
 
-            self.vector_db.add_vector(
+            receipts.add_vector(
                 vector_id=receipt_vector_id,
                 vector=receipt_embedding.tolist(),
                 metadata=receipt_metadata
@@ -133,13 +264,13 @@ class StorageIntegration:
                     'receipt_id': receipt_id,
                     'item_name': item.item_name,
                     'store_name': receipt_data.store_name,
-                    'date': receipt_data.date
+                    'date': upload_date
                 }
 
                 # Generate unique vector ID for item
                 item_vector_id = f"item_{item_id}"
 
-                self.vector_db.add_vector(
+                self.vector_db["items"].add_vector(
                     vector_id=item_vector_id,
                     vector=item_embedding.tolist(),
                     metadata=item_metadata
@@ -152,15 +283,17 @@ class StorageIntegration:
 
             print(f"  ✓ {len(receipt_data.items)} items stored in both databases")
 
-            # Save vector database to disk
-            self.vector_db.save(self.vector_db_path)
+            # Make the logged vector writes durable
+            self.vector_db.flush()
+            self._maybe_build_hnsw()
 
             return {
                 'success': True,
                 'receipt_id': receipt_id,
                 'receipt_vector_id': receipt_vector_id,
                 'item_count': len(receipt_data.items),
-                'item_vector_ids': item_vector_ids
+                'item_vector_ids': item_vector_ids,
+                'possible_duplicates': possible_duplicates
             }
 
         except Exception as e:
@@ -188,24 +321,38 @@ class StorageIntegration:
 
         # Get receipt vector from Vector DB if available
         if receipt.get('vector_id'):
-            receipt_vector = self.vector_db.get_vector(receipt['vector_id'])
+            receipt_vector = self.vector_db.get_vector(receipt['vector_id'], "receipts")
             receipt['vector_data'] = receipt_vector
 
         # Get item vectors
         for item in receipt['items']:
             if item.get('vector_id'):
-                item_vector = self.vector_db.get_vector(item['vector_id'])
+                item_vector = self.vector_db.get_vector(item['vector_id'], "items")
                 item['vector_data'] = item_vector
 
         return receipt
 
-    def search_receipts_semantic(self, query: str, top_k: int = 5) -> list:
+    def search_receipts_semantic(self, query: str, top_k: int = 5,
+                                 filters: Optional[Dict[str, Any]] = None,
+                                 min_similarity: Optional[float] = None,
+                                 mmr_lambda: Optional[float] = None) -> list:
         """
         Semantic search for receipts using Vector DB
 
+        Vector hits are consumed lazily, most similar first, until `top_k`
+        distinct receipts have been found (receipt and item vectors of the
+        same receipt count once).
+
         Args:
             query: Natural language query
             top_k: Number of results to return
+            filters: Optional metadata filter spec, e.g.
+                {"receipt_id": 7} or {"date": {"gte": "2024-01-01"}}
+            min_similarity: Only return receipts matching at least this
+                similarity (range search)
+            mmr_lambda: Re-rank each collection's hits by maximal marginal
+                relevance (e.g. 0.5), so near-identical items of one receipt
+                don't take several of the `top_k` slots
 
         Returns:
             List of receipts matching the query
@@ -213,36 +360,105 @@ class StorageIntegration:
         # Generate query embedding
         query_embedding = self.embedding_gen.generate_query_embedding(query)
 
-        # Search in Vector DB using VectorSearch
-        # Returns list of (vector_id, similarity_score, metadata) tuples
-        results = self.vector_search.search(
-            query_vector=query_embedding.tolist(),
-            top_k=top_k * 2  # Get more results to account for duplicates
-        )
+        # Search both collections and merge their hits, best first. Each
+        # collection yields (vector_id, similarity_score, metadata) tuples;
+        # VectorSearch plans filtered queries: selective filters (a receipt,
+        # a short date range) are scored exactly over their subset, broad
+        # ones go through HNSW and are post-filtered with widening.
+        streams = []
+        for name in COLLECTIONS:
+            searcher = self.vector_db.searcher(name)
+            index = "hnsw" if "hnsw" in self.vector_db[name].indexes else None
+            if min_similarity is not None:
+                streams.append(searcher.search_range(
+                    query_embedding.tolist(), min_similarity, filter_fn=filters))
+            elif mmr_lambda is not None:
+                hits = searcher.search(query_embedding.tolist(), top_k, filters, index, mmr_lambda=mmr_lambda)
+                streams.append(sorted(hits, key=lambda hit: -hit[1]))
+            else:
+                streams.append(searcher.iter_search(
+                    query_embedding.tolist(),
+                    batch_size=top_k,
+                    filter_fn=filters,
+                    index=index
+                ))
+        results = heapq.merge(*streams, key=lambda hit: -hit[1])
+
+        return self._enrich_results(results, top_k)
+
+    def search_receipts_hybrid(self, query: str, top_k: int = 5,
+                               filters: Optional[Dict[str, Any]] = None) -> list:
+        """
+        Hybrid keyword + semantic search for receipts using Vector DB
+
+        Each collection is searched in one call by its BM25 index (exact
+        item and store names such as "nasi goreng") and by embedding
+        (vague descriptions); the two rankings are fused with reciprocal
+        rank fusion, so no separate SQL keyword search is needed.
 
-        # Enrich results with SQLite data
+        Args:
+            query: Item/store names or a natural language query
+            top_k: Number of results to return
+            filters: Optional metadata filter spec (see search_receipts_semantic)
+
+        Returns:
+            List of receipts matching the query; 'hybrid_score' is the fused
+            rank score and 'similarity_score' the embedding similarity of
+            the matched receipt or item
+        """
+        query_embedding = self.embedding_gen.generate_query_embedding(query).tolist()
+
+        # Several items of one receipt may match: fetch more hits than receipts
+        streams = []
+        for name in COLLECTIONS:
+            hybrid = HybridSearch(self.vector_db.searcher(name), lexical="bm25")
+            streams.append(hybrid.search(
+                query,
+                query_embedding,
+                top_k=top_k * 4,
+                filter_fn=filters,
+                index="hnsw" if "hnsw" in self.vector_db[name].indexes else None
+            ))
+        results = heapq.merge(*streams, key=lambda hit: -hit[1])
+
+        return self._enrich_results(results, top_k, query_embedding)
+
+    def _enrich_results(self, results, top_k: int, query_embedding: Optional[list] = None) -> list:
+        """
+        Turn vector hits, best first, into the first `top_k` distinct receipts from SQLite
+
+        Args:
+            results: (vector_id, score, metadata) hits
+            top_k: Number of receipts to return
+            query_embedding: Set for hybrid hits, whose score is a fused rank
+                score: the embedding similarity is then computed per receipt
+
+        Returns:
+            List of receipts with their items
+        """
         enriched_results = []
         seen_receipt_ids = set()
 
         for vector_id, similarity_score, metadata in results:
-            if metadata.get('type') == 'receipt':
-                receipt_id = metadata.get('receipt_id')
-                if receipt_id and receipt_id not in seen_receipt_ids:
-                    receipt = self.db.get_receipt_with_items(receipt_id)
-                    if receipt:
-                        receipt['similarity_score'] = similarity_score
-                        enriched_results.append(receipt)
-                        seen_receipt_ids.add(receipt_id)
-
-            elif metadata.get('type') == 'item':
-                receipt_id = metadata.get('receipt_id')
-                if receipt_id and receipt_id not in seen_receipt_ids:
-                    receipt = self.db.get_receipt_with_items(receipt_id)
-                    if receipt:
-                        receipt['similarity_score'] = similarity_score
-                        receipt['matched_item'] = metadata.get('item_name')
-                        enriched_results.append(receipt)
-                        seen_receipt_ids.add(receipt_id)
+            receipt_id = metadata.get('receipt_id')
+            if metadata.get('type') not in ('receipt', 'item') or not receipt_id or receipt_id in seen_receipt_ids:
+                continue
+
+            receipt = self.db.get_receipt_with_items(receipt_id)
+            if not receipt:
+                continue
+
+            if query_embedding is not None:
+                receipt['hybrid_score'] = similarity_score
+                collection = "items" if metadata.get('type') == 'item' else "receipts"
+                vector = self.vector_db[collection].get_vector_data(vector_id)
+                similarity_score = cosine_similarity(query_embedding, vector) if vector else 0.0
+
+            receipt['similarity_score'] = similarity_score
+            if metadata.get('type') == 'item':
+                receipt['matched_item'] = metadata.get('item_name')
+            enriched_results.append(receipt)
+            seen_receipt_ids.add(receipt_id)
 
             # Stop if we have enough unique receipts
             if len(enriched_results) >= top_k:
@@ -269,12 +485,12 @@ class StorageIntegration:
                 }
 
             if receipt.get('vector_id'):
-                self.vector_db.delete_vector(receipt['vector_id'])
+                self.vector_db["receipts"].delete_vector(receipt['vector_id'])
                 print(f"  ✓ Deleted receipt vector: {receipt['vector_id']}")
 
             for item in receipt.get('items', []):
                 if item.get('vector_id'):
-                    self.vector_db.delete_vector(item['vector_id'])
+                    self.vector_db["items"].delete_vector(item['vector_id'])
 
             item_count = len(receipt.get('items', []))
             if item_count > 0:
@@ -283,7 +499,7 @@ class StorageIntegration:
             success = self.db.delete_receipt(receipt_id)
 
             if success:
-                self.vector_db.save(self.vector_db_path)
+                self.vector_db.flush()
                 print(f"  ✓ Receipt {receipt_id} deleted from both databases")
                 return {
                     'success': True,
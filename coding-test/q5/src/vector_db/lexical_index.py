@@ -0,0 +1,172 @@
+"""
+Lexical Index
+BM25 inverted index over text fields of vector metadata.
+
+Exact names ("nasi goreng", a store name) are often matched better by
+their words than by an embedding. A LexicalIndex is attached to a
+VectorDB like any other index, so it follows adds, updates and deletes,
+but it is searched by text with `search_text()` instead of by vector.
+See hybrid_search.py to combine it with vector search.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .vector_index import VectorIndex
+
+# Words: runs of letters and digits (Unicode-aware), compared lowercase
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase word tokens.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        list: Tokens in order of appearance
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class LexicalIndex(VectorIndex):
+    """
+    BM25 index over the words of one or more metadata fields.
+
+    Each vector is a document made of the given metadata fields (missing
+    and non-string values are skipped). The index keeps a posting list per
+    term (vector ID -> term frequency), so a query only touches the
+    documents containing one of its terms. Documents are scored with Okapi
+    BM25:
+
+        score = sum over query terms of idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_len))
+
+    with idf = ln(1 + (N - df + 0.5) / (df + 0.5)).
+    """
+
+    def __init__(self, fields: Sequence[str], k1: float = 1.2, b: float = 0.75):
+        """
+        Initialize an empty lexical index.
+
+        Args:
+            fields: Metadata fields whose text is indexed, e.g. ("item_name", "store_name")
+            k1: Term frequency saturation (0 = presence only)
+            b: Document length normalization (0 = none, 1 = full)
+
+        Raises:
+            ValueError: If no field is given or k1/b are out of range
+        """
+        super().__init__()
+        if isinstance(fields, str):
+            fields = [fields]
+        if not fields:
+            raise ValueError("At least one metadata field is required")
+        if k1 < 0 or not 0 <= b <= 1:
+            raise ValueError("k1 must be non-negative and b in [0, 1]")
+
+        self.fields = list(fields)
+        self.k1 = k1
+        self.b = b
+        self.reset()
+
+    def reset(self):
+        """Drop all postings."""
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._terms: Dict[str, Counter] = {}
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    def _document(self, vector_id: str) -> List[str]:
+        """Tokens of the indexed fields of a vector's metadata."""
+        store = self.db.store
+        metadata = store.get_metadata(store.row_of(vector_id))
+        tokens = []
+        for field in self.fields:
+            value = metadata.get(field)
+            if isinstance(value, str):
+                tokens.extend(tokenize(value))
+        return tokens
+
+    def on_add(self, vector_id: str):
+        """Add the vector's text to the posting lists."""
+        tokens = self._document(vector_id)
+        terms = Counter(tokens)
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[vector_id] = count
+        self._terms[vector_id] = terms
+        self._lengths[vector_id] = len(tokens)
+        self._total_length += len(tokens)
+
+    def on_delete(self, vector_id: str):
+        """Remove the vector from the posting lists."""
+        # Uses the terms recorded at add time: on update the metadata has
+        # already been replaced
+        terms = self._terms.pop(vector_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[vector_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(vector_id)
+
+    def on_metadata_update(self, vector_id: str):
+        """Re-index the vector's text."""
+        self.on_update(vector_id)
+
+    def search(self, query_vector: List[float], top_k: int,
+               allowed: Optional[Set[str]] = None, **params) -> List[Tuple[str, float]]:
+        """
+        Not supported: a lexical index is searched by text.
+
+        Raises:
+            ValueError: Always; use search_text() or HybridSearch
+        """
+        raise ValueError("LexicalIndex is searched by text: use search_text() or HybridSearch")
+
+    def search_text(self, query: str, top_k: int,
+                    allowed: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Find the documents that best match a text query under BM25.
+
+        Args:
+            query: Text query
+            top_k: Number of results to return
+            allowed: Optional set of IDs results are restricted to
+
+        Returns:
+            list: (vector_id, bm25_score) pairs, highest score first (ties
+                  by ID); documents sharing no term with the query are not
+                  returned
+        """
+        n_docs = len(self._lengths)
+        if top_k <= 0 or n_docs == 0:
+            return []
+        avg_length = self._total_length / n_docs or 1.0
+
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for vector_id, tf in postings.items():
+                if allowed is not None and vector_id not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[vector_id] / avg_length)
+                scores[vector_id] = scores.get(vector_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nsmallest(top_k, scores.items(), key=lambda hit: (-hit[1], hit[0]))
+
+    def __len__(self):
+        """Return number of indexed documents."""
+        return len(self._lengths)
+
+    def __repr__(self):
+        return f"LexicalIndex(fields={self.fields}, documents={len(self)}, terms={len(self._postings)})"
@@ -0,0 +1,294 @@
+"""
+Metadata Index
+Declarative metadata filters backed by inverted and sorted indexes.
+
+A filter spec maps field names to conditions; all conditions must hold:
+
+    {"type": "item"}                                   equality
+    {"receipt_id": {"in": [1, 2, 3]}}                  membership
+    {"date": {"gte": "2023-01-01", "lt": "2024-01-01"}} range
+    {"store_name": {"ne": "Indomaret"}}                 inequality
+
+Supported operators: eq, ne, in, gt, gte, lt, lte. Fields with an
+"equality" index resolve eq/in through an inverted index (value -> IDs);
+fields with a "range" index resolve eq/in/gt/gte/lt/lte by binary search
+over a sorted (value, ID) list. Any other condition is checked against the
+metadata of the remaining candidates.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+OPERATORS = ("eq", "ne", "in", "gt", "gte", "lt", "lte")
+INDEX_KINDS = ("equality", "range")
+
+
+def _conditions(condition: Any) -> Dict[str, Any]:
+    """Normalize a field condition to an {operator: operand} dict."""
+    if isinstance(condition, dict):
+        unknown = set(condition) - set(OPERATORS)
+        if unknown:
+            raise ValueError(f"Unknown filter operators {sorted(unknown)}. Expected {OPERATORS}")
+        return condition
+    return {"eq": condition}
+
+
+def validate_spec(spec: Dict[str, Any]):
+    """
+    Check that a filter spec only uses known operators.
+
+    Raises:
+        ValueError: If the spec is not a dict or uses unknown operators
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"Filter spec must be a dict, got {type(spec).__name__}")
+    for condition in spec.values():
+        _conditions(condition)
+
+
+def _compare(op: str, value: Any, operand: Any) -> bool:
+    if op == "eq":
+        return value == operand
+    if op == "ne":
+        return value != operand
+    if op == "in":
+        return value in operand
+    if value is None:
+        return False
+    try:
+        if op == "gt":
+            return value > operand
+        if op == "gte":
+            return value >= operand
+        if op == "lt":
+            return value < operand
+        return value <= operand
+    except TypeError:
+        # Values of incomparable types never satisfy a range condition
+        return False
+
+
+def matches(spec: Dict[str, Any], metadata: Dict[str, Any]) -> bool:
+    """
+    Evaluate a filter spec against one metadata dict.
+
+    Args:
+        spec: Filter spec
+        metadata: Metadata of a vector
+
+    Returns:
+        bool: True if every condition holds
+    """
+    for field, condition in spec.items():
+        value = metadata.get(field)
+        for op, operand in _conditions(condition).items():
+            if not _compare(op, value, operand):
+                return False
+    return True
+
+
+def _sort_key(value: Any) -> Optional[Tuple[int, Any]]:
+    """Orderable key for range indexes; numbers sort before strings, others are not indexed."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value)
+    if isinstance(value, str):
+        return (1, value)
+    return None
+
+
+def _hashable(value: Any) -> bool:
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+
+class SortedFieldIndex:
+    """Sorted (value, ID) list for one field, searched with bisect."""
+
+    def __init__(self):
+        self._keys: List[Tuple[int, Any]] = []
+        self._ids: List[str] = []
+
+    def add(self, vector_id: str, value: Any):
+        key = _sort_key(value)
+        if key is None:
+            return
+        pos = bisect_right(self._keys, key)
+        self._keys.insert(pos, key)
+        self._ids.insert(pos, vector_id)
+
+    def remove(self, vector_id: str, value: Any):
+        key = _sort_key(value)
+        if key is None:
+            return
+        lo, hi = bisect_left(self._keys, key), bisect_right(self._keys, key)
+        for pos in range(lo, hi):
+            if self._ids[pos] == vector_id:
+                del self._keys[pos]
+                del self._ids[pos]
+                return
+
+    def range(self, lower: Any = None, lower_inclusive: bool = True,
+              upper: Any = None, upper_inclusive: bool = True) -> Optional[Set[str]]:
+        """
+        IDs whose value lies within the bounds (None = unbounded).
+
+        Returns:
+            set: Matching IDs, or None if a bound cannot be indexed
+        """
+        lo, hi = 0, len(self._keys)
+        if lower is not None:
+            key = _sort_key(lower)
+            if key is None:
+                return None
+            lo = bisect_left(self._keys, key) if lower_inclusive else bisect_right(self._keys, key)
+            # Stay within values of the same type as the bound
+            hi = bisect_left(self._keys, (key[0] + 1,))
+        if upper is not None:
+            key = _sort_key(upper)
+            if key is None:
+                return None
+            hi = min(hi, bisect_right(self._keys, key) if upper_inclusive else bisect_left(self._keys, key))
+            if lower is None:
+                lo = bisect_left(self._keys, (key[0],))
+        return set(self._ids[lo:hi])
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class MetadataIndex:
+    """
+    Secondary indexes over metadata fields of a VectorDB.
+
+    Maintained by VectorDB on every insert, metadata update and delete.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, str] = {}
+        self._equality: Dict[str, Dict[Any, Set[str]]] = {}
+        self._range: Dict[str, SortedFieldIndex] = {}
+
+    def add_field(self, field: str, kind: str = "equality"):
+        """
+        Declare an indexed field (call `add` for existing records afterwards).
+
+        Args:
+            field: Metadata field name
+            kind: "equality" (inverted index) or "range" (sorted index)
+
+        Raises:
+            ValueError: If the kind is unknown
+        """
+        if kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind '{kind}'. Expected one of {INDEX_KINDS}")
+
+        self.drop_field(field)
+        self.fields[field] = kind
+        if kind == "equality":
+            self._equality[field] = {}
+        else:
+            self._range[field] = SortedFieldIndex()
+
+    def drop_field(self, field: str) -> bool:
+        """Stop indexing a field. Returns False if it was not indexed."""
+        self._equality.pop(field, None)
+        self._range.pop(field, None)
+        return self.fields.pop(field, None) is not None
+
+    def clear(self):
+        """Drop indexed data but keep the field declarations."""
+        for field, kind in list(self.fields.items()):
+            self.add_field(field, kind)
+
+    def add(self, vector_id: str, metadata: Dict[str, Any]):
+        """Index the metadata of a vector (a missing field is indexed as None, as `matches` reads it)."""
+        for field, postings in self._equality.items():
+            value = metadata.get(field)
+            if _hashable(value):
+                postings.setdefault(value, set()).add(vector_id)
+        for field, index in self._range.items():
+            if field in metadata:
+                index.add(vector_id, metadata[field])
+
+    def remove(self, vector_id: str, metadata: Dict[str, Any]):
+        """Remove the metadata of a vector from the indexes."""
+        for field, postings in self._equality.items():
+            value = metadata.get(field)
+            if _hashable(value):
+                ids = postings.get(value)
+                if ids is not None:
+                    ids.discard(vector_id)
+                    if not ids:
+                        del postings[value]
+        for field, index in self._range.items():
+            if field in metadata:
+                index.remove(vector_id, metadata[field])
+
+    def _lookup(self, field: str, op: str, operand: Any) -> Optional[Set[str]]:
+        """IDs satisfying one condition through an index, or None if it can't be indexed."""
+        if field in self._equality:
+            postings = self._equality[field]
+            if op == "eq" and _hashable(operand):
+                return set(postings.get(operand, ()))
+            if op == "in" and all(_hashable(v) for v in operand):
+                return set().union(*(postings.get(v, ()) for v in operand))
+            return None
+
+        if field in self._range:
+            index = self._range[field]
+            # None is not kept in sorted indexes and would read as an open bound
+            if (op == "eq" and operand is None) or (op == "in" and None in operand):
+                return None
+            if op == "eq":
+                return index.range(operand, True, operand, True)
+            if op == "in":
+                ids = set()
+                for value in operand:
+                    found = index.range(value, True, value, True)
+                    if found is None:
+                        return None
+                    ids |= found
+                return ids
+            if op in ("gt", "gte"):
+                return index.range(lower=operand, lower_inclusive=(op == "gte"))
+            if op in ("lt", "lte"):
+                return index.range(upper=operand, upper_inclusive=(op == "lte"))
+
+        return None
+
+    def resolve(self, spec: Dict[str, Any]) -> Tuple[Optional[Set[str]], Dict[str, Any]]:
+        """
+        Resolve the indexable part of a filter spec.
+
+        Args:
+            spec: Filter spec
+
+        Returns:
+            tuple: (candidate IDs, or None if no condition was indexable;
+                    residual spec that still has to be checked per record)
+        """
+        validate_spec(spec)
+        candidates: Optional[Set[str]] = None
+        residual: Dict[str, Dict[str, Any]] = {}
+
+        for field, condition in spec.items():
+            for op, operand in _conditions(condition).items():
+                ids = self._lookup(field, op, operand)
+                if ids is None:
+                    residual.setdefault(field, {})[op] = operand
+                    continue
+                candidates = ids if candidates is None else candidates & ids
+
+        return candidates, residual
+
+    def estimate(self, spec: Dict[str, Any]) -> Optional[int]:
+        """Upper bound on the number of matches from indexes alone (None if unknown)."""
+        candidates, _ = self.resolve(spec)
+        return None if candidates is None else len(candidates)
+
+    def __repr__(self):
+        return f"MetadataIndex(fields={self.fields})"
+
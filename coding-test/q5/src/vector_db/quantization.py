@@ -0,0 +1,536 @@
+"""
+Vector Quantization
+Compressed codes for a coarse first scoring pass, rescored exactly.
+
+A quantized index keeps one fixed-size code per vector in a contiguous
+buffer. A search scores every (allowed) code approximately, keeps the best
+`rescore` candidates and rescores those exactly against the float vectors
+in the store. With a memory-mapped binary snapshot the float vectors stay
+in the page cache and only the candidates' pages are touched.
+
+Available quantizers:
+- ScalarQuantizer: int8 per dimension with per-dimension scale/offset (4x smaller than float32)
+- ProductQuantizer: 1 byte per subspace of a k-means codebook (e.g. 384 dims
+  in 48 bytes, 32x smaller), scored with asymmetric distance tables
+- BinaryQuantizer: 1 bit per dimension (sign), packed into 64-bit words and
+  scored by Hamming distance (32x smaller than float32)
+"""
+
+import copy
+import heapq
+import math
+import random
+from array import array
+from operator import itemgetter
+from typing import Dict, List, Optional, Set, Tuple
+
+from .clustering import assign_python, kmeans
+from .cosine_similarity import dot_product, magnitude
+from .kernels import np, resolve_backend, select_top_k, top_k_rows
+from .vector_index import VectorIndex
+
+# Codes scored per NumPy block (distance table sums, int8 upcasts)
+ADC_CHUNK = 65536
+
+# Set bits per byte value, for NumPy versions without bitwise_count
+_POPCOUNT_TABLE = None if np is None else np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Number of set bits of a non-negative int (int.bit_count needs Python >= 3.10)
+_popcount = int.bit_count if hasattr(int, "bit_count") else (lambda x: bin(x).count("1"))
+
+
+class QuantizedIndex(VectorIndex):
+    """
+    Base class for quantized indexes: code storage, training and rescoring.
+
+    Codes live in slots of one bytearray (`code_size` bytes each). Slots of
+    deleted vectors are reused by later adds, so the buffer never needs
+    compaction. Vectors added before the quantizer is trained (fewer than
+    `train_size` vectors so far) are kept aside and always scored exactly.
+
+    Subclasses implement `_fit()`, `_encode()` and `_coarse_scores()`.
+    """
+
+    code_size = 0
+
+    def __init__(self, rescore: int = 100, train_size: int = 1024,
+                 max_train_samples: int = 20000, seed: Optional[int] = None,
+                 backend: str = "auto"):
+        """
+        Initialize an empty quantized index.
+
+        Args:
+            rescore: Default number of coarse candidates rescored exactly
+                (at least top_k); the recall/latency knob. 0 returns the
+                approximate scores without reading float vectors
+            train_size: Train automatically once this many vectors exist
+            max_train_samples: Maximum number of vectors sampled for training
+            seed: Seed for training samples
+            backend: Similarity backend - "auto", "python" or "numpy"
+
+        Raises:
+            ValueError: If parameters are out of range
+        """
+        super().__init__()
+        if rescore < 0 or train_size < 1:
+            raise ValueError("rescore must be >= 0 and train_size positive")
+
+        self.rescore = rescore
+        self.train_size = train_size
+        self.max_train_samples = max_train_samples
+        self.backend = resolve_backend(backend)
+        self._rng = random.Random(seed)
+        self.trained = False
+        self._trained_dimension = None
+        self.reset()
+
+    def reset(self):
+        """Drop all codes (the trained quantizer is kept)."""
+        self._codes = bytearray()
+        self._norms = array("d")
+        self._slot_ids: List[Optional[str]] = []
+        self._live = bytearray()
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._pending: Dict[str, None] = {}
+
+    def build(self, db):
+        """Encode every vector of a database, training first if needed."""
+        self.db = db
+        self.reset()
+        store = db.store
+        for row, vector_id in store.iter_rows():
+            if store.norm(row) > 0:
+                self._pending[vector_id] = None
+
+        if self._trained_dimension != db.dimension:
+            self.trained = False
+        if self._pending and (self.trained or len(self._pending) >= self.train_size):
+            self.train()
+
+    def train(self):
+        """
+        (Re)train the quantizer on a sample of the collection and re-encode every vector.
+
+        Raises:
+            ValueError: If the index holds no vectors
+        """
+        store = self.db.store
+        ids = list(self._slots) + list(self._pending)
+        if not ids:
+            raise ValueError("Cannot train a quantizer without vectors")
+
+        if len(ids) > self.max_train_samples:
+            sample = self._rng.sample(ids, self.max_train_samples)
+        else:
+            sample = ids
+
+        # Train a copy; searches use the current codes until it is published
+        trained = copy.copy(self)
+        trained._fit([store.read(store.row_of(vid)) for vid in sample])
+        trained.trained = True
+        trained._trained_dimension = self.db.dimension
+
+        trained.reset()
+        for vector_id in ids:
+            trained._store_code(vector_id)
+        self._publish(trained)
+
+    def _store_code(self, vector_id: str):
+        store = self.db.store
+        row = store.row_of(vector_id)
+        code = self._encode(store.read(row))
+
+        if self._free:
+            slot = self._free.pop()
+            self._codes[slot * self.code_size:(slot + 1) * self.code_size] = code
+            self._norms[slot] = store.norm(row)
+            self._slot_ids[slot] = vector_id
+            self._live[slot] = 1
+        else:
+            slot = len(self._slot_ids)
+            self._codes.extend(code)
+            self._norms.append(store.norm(row))
+            self._slot_ids.append(vector_id)
+            self._live.append(1)
+        self._slots[vector_id] = slot
+
+    def on_add(self, vector_id: str):
+        """Encode a new vector (or keep it aside until the quantizer is trained)."""
+        store = self.db.store
+        row = store.row_of(vector_id)
+        if row is None or store.norm(row) == 0:
+            # Zero vectors can never be returned by a cosine search
+            return
+
+        if self.trained:
+            self._store_code(vector_id)
+            return
+
+        self._pending[vector_id] = None
+
+    def maintain(self):
+        """Train once `train_size` vectors are waiting for the quantizer."""
+        if not self.trained and len(self._pending) >= self.train_size:
+            self.train()
+
+    def on_delete(self, vector_id: str):
+        """Free the slot of a vector."""
+        if vector_id in self._pending:
+            del self._pending[vector_id]
+            return
+
+        slot = self._slots.pop(vector_id, None)
+        if slot is not None:
+            self._slot_ids[slot] = None
+            self._live[slot] = 0
+            self._free.append(slot)
+
+    def _fit(self, vectors: List[List[float]]):
+        raise NotImplementedError
+
+    def _encode(self, vector: List[float]) -> bytes:
+        raise NotImplementedError
+
+    def _coarse_scores(self, query_vector: List[float], slots):
+        """
+        Approximate scores of the query against code slots.
+
+        Args:
+            query_vector: Query vector
+            slots: Slots to score (NumPy intp array or list, by backend)
+
+        Returns:
+            Scores in the order of `slots`; only their ranking matters
+        """
+        raise NotImplementedError
+
+    def _similarity(self, score: float, query_norm: float) -> float:
+        """Convert a coarse score to an approximate cosine similarity."""
+        return score / query_norm
+
+    def _coarse_top(self, query_vector: List[float], count: int,
+                    allowed: Optional[Set[str]]) -> List[Tuple[int, float]]:
+        """(slot, approximate score) of the `count` best approximate scores."""
+        if self.backend == "numpy":
+            if allowed is None:
+                slots = np.flatnonzero(np.frombuffer(self._live, dtype=np.uint8))
+            else:
+                slots = np.sort(np.fromiter((self._slots[vid] for vid in allowed if vid in self._slots),
+                                            dtype=np.intp))
+            if len(slots) == 0:
+                return []
+            scores = np.asarray(self._coarse_scores(query_vector, slots), dtype=np.float64)
+            best = select_top_k(scores, count, "numpy")
+            return list(zip(slots[best].tolist(), scores[best].tolist()))
+
+        if allowed is None:
+            slots = [slot for slot, live in enumerate(self._live) if live]
+        else:
+            slots = sorted(self._slots[vid] for vid in allowed if vid in self._slots)
+        if not slots:
+            return []
+
+        scores = self._coarse_scores(query_vector, slots)
+        best = heapq.nlargest(count, range(len(slots)), key=scores.__getitem__)
+        return [(slots[i], scores[i]) for i in best]
+
+    def search(self, query_vector: List[float], top_k: int,
+               allowed: Optional[Set[str]] = None,
+               rescore: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Coarse search over the codes, then exact rescoring of the best candidates.
+
+        Args:
+            query_vector: Query vector
+            top_k: Number of results to return
+            allowed: Optional set of IDs results are restricted to
+            rescore: Number of coarse candidates rescored exactly (defaults
+                to self.rescore); raise it for higher recall, 0 to skip
+                rescoring
+
+        Returns:
+            list: (vector_id, similarity) pairs, highest first; similarities
+                  are exact unless rescore is 0
+        """
+        if top_k <= 0:
+            return []
+
+        store = self.db.store
+        pending = [store.row_of(vid) for vid in self._pending if allowed is None or vid in allowed]
+        count = self.rescore if rescore is None else rescore
+
+        if count == 0:
+            query_norm = magnitude(query_vector)
+            if query_norm == 0:
+                return []
+            hits = [(self._slot_ids[slot], self._similarity(score, query_norm))
+                    for slot, score in self._coarse_top(query_vector, top_k, allowed)]
+            # Vectors not encoded yet are scored exactly
+            hits.extend((store.row_id(row), score)
+                        for row, score in top_k_rows(store, query_vector, sorted(pending), top_k, self.backend))
+            return sorted(hits, key=itemgetter(1), reverse=True)[:top_k]
+
+        candidates = self._coarse_top(query_vector, max(top_k, count), allowed)
+        rows = sorted([store.row_of(self._slot_ids[slot]) for slot, _ in candidates] + pending)
+        hits = top_k_rows(store, query_vector, rows, top_k, self.backend)
+        return [(store.row_id(row), score) for row, score in hits]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the codes."""
+        return len(self._codes)
+
+    def __len__(self):
+        """Return number of indexed vectors."""
+        return len(self._slots) + len(self._pending)
+
+
+class ScalarQuantizer(QuantizedIndex):
+    """
+    int8 scalar quantization: each dimension is mapped linearly from its
+    trained [min, max] range onto 256 levels (values outside are clipped).
+
+    x_d ~ offset_d + scale_d * (code_d + 128), so q.x is approximated by
+    q.offset + 128 * sum(q * scale) + (q * scale).code - one small integer
+    dot product per vector, divided by the vector's exact cached norm.
+    """
+
+    def _fit(self, vectors: List[List[float]]):
+        dim = len(vectors[0])
+        lows = [min(v[d] for v in vectors) for d in range(dim)]
+        highs = [max(v[d] for v in vectors) for d in range(dim)]
+        self._offset = lows
+        self._scale = [(hi - lo) / 255 if hi > lo else 1.0 for lo, hi in zip(lows, highs)]
+        self.code_size = dim
+        if self.backend == "numpy":
+            self._offset_array = np.asarray(self._offset, dtype=np.float64)
+            self._scale_array = np.asarray(self._scale, dtype=np.float64)
+
+    def _encode(self, vector: List[float]) -> bytes:
+        if self.backend == "numpy":
+            levels = np.rint((np.asarray(vector, dtype=np.float64) - self._offset_array) / self._scale_array)
+            return (np.clip(levels, 0, 255) - 128).astype(np.int8).tobytes()
+
+        code = array("b")
+        for x, lo, scale in zip(vector, self._offset, self._scale):
+            code.append(min(max(round((x - lo) / scale), 0), 255) - 128)
+        return code.tobytes()
+
+    def _coarse_scores(self, query_vector: List[float], slots):
+        if self.backend == "numpy":
+            query = np.asarray(query_vector, dtype=np.float64)
+            weights = query * self._scale_array
+            base = query @ self._offset_array + 128 * weights.sum()
+            codes = np.frombuffer(self._codes, dtype=np.int8).reshape(-1, self.code_size)
+            norms = np.frombuffer(self._norms, dtype=np.float64)
+            weights = weights.astype(np.float32)
+            # Upcast one block of codes at a time: a float copy of every
+            # candidate would be 4x the int8 codes
+            scores = np.empty(len(slots), dtype=np.float64)
+            for start in range(0, len(slots), ADC_CHUNK):
+                chunk = slots[start:start + ADC_CHUNK]
+                scores[start:start + len(chunk)] = codes[chunk].astype(np.float32) @ weights
+            return (base + scores) / norms[slots]
+
+        weights = [q * s for q, s in zip(query_vector, self._scale)]
+        base = dot_product(query_vector, self._offset) + 128 * sum(weights)
+        codes = memoryview(self._codes).cast("b")
+        size = self.code_size
+        return [(base + dot_product(weights, codes[slot * size:(slot + 1) * size])) / self._norms[slot]
+                for slot in slots]
+
+    def __repr__(self):
+        return f"ScalarQuantizer(trained={self.trained}, vectors={len(self)}, rescore={self.rescore})"
+
+
+class ProductQuantizer(QuantizedIndex):
+    """
+    Product quantization: the vector is split into `m` subspaces and each
+    sub-vector is replaced by the index of its closest centroid in a
+    per-subspace k-means codebook of up to 256 centroids - 1 byte per
+    subspace.
+
+    Queries use asymmetric distance computation (ADC): the query is not
+    quantized; a table of query . centroid is computed once per subspace and
+    a code's score is the sum of m table lookups.
+    """
+
+    def __init__(self, m: int = 8, n_centroids: int = 256, iterations: int = 20,
+                 rescore: int = 100, train_size: int = 4096,
+                 max_train_samples: int = 10000, seed: Optional[int] = None,
+                 backend: str = "auto"):
+        """
+        Initialize an empty product quantizer.
+
+        Args:
+            m: Number of subspaces (must divide the dimension); bytes per code
+            n_centroids: Centroids per subspace codebook (at most 256)
+            iterations: Maximum k-means iterations per codebook
+            rescore: Default number of coarse candidates rescored exactly
+                (0 = return ADC scores only)
+            train_size: Train automatically once this many vectors exist
+            max_train_samples: Maximum number of vectors sampled for training
+            seed: Seed for training samples and k-means initialisation
+            backend: Similarity backend - "auto", "python" or "numpy"
+
+        Raises:
+            ValueError: If parameters are out of range
+        """
+        if m < 1 or not 1 <= n_centroids <= 256:
+            raise ValueError("m must be positive and n_centroids within 1..256")
+
+        self.m = m
+        self.n_centroids = n_centroids
+        self.iterations = iterations
+        super().__init__(rescore, train_size, max_train_samples, seed, backend)
+
+    def build(self, db):
+        """Encode every vector of a database, training first if needed."""
+        if db.dimension % self.m:
+            raise ValueError(f"Dimension {db.dimension} is not divisible by m={self.m}")
+        super().build(db)
+
+    def _fit(self, vectors: List[List[float]]):
+        self.code_size = self.m
+        self._sub_dim = len(vectors[0]) // self.m
+        self._codebooks = []
+        for j in range(self.m):
+            lo, hi = j * self._sub_dim, (j + 1) * self._sub_dim
+            self._codebooks.append(kmeans([v[lo:hi] for v in vectors], self.n_centroids, self.iterations,
+                                          seed=self._rng.random(), backend=self.backend))
+        if self.backend == "numpy":
+            # Every codebook has min(n_centroids, len(vectors)) centroids
+            self._codebook_array = np.asarray(self._codebooks, dtype=np.float64)
+            self._centroid_norms = np.einsum("jkd,jkd->jk", self._codebook_array, self._codebook_array)
+
+    def _encode(self, vector: List[float]) -> bytes:
+        if self.backend == "numpy":
+            sub = np.asarray(vector, dtype=np.float64).reshape(self.m, self._sub_dim)
+            # Closest centroid maximizes 2 x.c - ||c||^2
+            scores = 2 * np.einsum("jd,jkd->jk", sub, self._codebook_array) - self._centroid_norms
+            return scores.argmax(axis=1).astype(np.uint8).tobytes()
+
+        code = bytearray()
+        for j, codebook in enumerate(self._codebooks):
+            lo = j * self._sub_dim
+            code.append(assign_python([vector[lo:lo + self._sub_dim]], codebook)[0])
+        return bytes(code)
+
+    def _distance_table(self, query_vector: List[float]):
+        """query . centroid for every subspace and centroid (m x n_centroids)."""
+        if self.backend == "numpy":
+            sub = np.asarray(query_vector, dtype=np.float64).reshape(self.m, self._sub_dim)
+            return np.einsum("jd,jkd->jk", sub, self._codebook_array)
+
+        table = []
+        for j, codebook in enumerate(self._codebooks):
+            lo = j * self._sub_dim
+            sub = query_vector[lo:lo + self._sub_dim]
+            table.append([dot_product(sub, c) for c in codebook])
+        return table
+
+    def _coarse_scores(self, query_vector: List[float], slots):
+        table = self._distance_table(query_vector)
+
+        if self.backend == "numpy":
+            codes = np.frombuffer(self._codes, dtype=np.uint8).reshape(-1, self.m)
+            norms = np.frombuffer(self._norms, dtype=np.float64)
+            subspaces = np.arange(self.m)
+            scores = np.empty(len(slots), dtype=np.float64)
+            for start in range(0, len(slots), ADC_CHUNK):
+                chunk = slots[start:start + ADC_CHUNK]
+                scores[start:start + len(chunk)] = table[subspaces, codes[chunk]].sum(axis=1)
+            return scores / norms[slots]
+
+        m = self.m
+        codes = self._codes
+        return [sum(row[c] for row, c in zip(table, codes[slot * m:(slot + 1) * m])) / self._norms[slot]
+                for slot in slots]
+
+    def __repr__(self):
+        return (f"ProductQuantizer(m={self.m}, n_centroids={self.n_centroids}, "
+                f"trained={self.trained}, vectors={len(self)}, rescore={self.rescore})")
+
+
+class BinaryQuantizer(QuantizedIndex):
+    """
+    Binary (sign) quantization: one bit per dimension, set when the value is
+    above the trained per-dimension mean (or above 0 with center=False).
+
+    Bits are packed into little-endian 64-bit words; the coarse score is
+    minus the Hamming distance to the query's bits (XOR + popcount), which
+    tracks the angle between the vectors. Cheap enough to scan everything,
+    but coarse - keep `rescore` at a few hundred.
+    """
+
+    def __init__(self, center: bool = True, rescore: int = 200, train_size: int = 1024,
+                 max_train_samples: int = 20000, seed: Optional[int] = None,
+                 backend: str = "auto"):
+        """
+        Initialize an empty binary quantizer.
+
+        Args:
+            center: Threshold each dimension at its trained mean instead of
+                0 (better bit balance for embeddings that are not centered)
+            rescore: Default number of Hamming candidates rescored exactly
+            train_size: Train the means once this many vectors exist
+                (ignored with center=False, which needs no training)
+            max_train_samples: Maximum number of vectors sampled for training
+            seed: Seed for training samples
+            backend: Similarity backend - "auto", "python" or "numpy"
+        """
+        self.center = center
+        super().__init__(rescore, train_size if center else 1, max_train_samples, seed, backend)
+
+    def _fit(self, vectors: List[List[float]]):
+        dim = len(vectors[0])
+        self._words = (dim + 63) // 64
+        self.code_size = self._words * 8
+        if self.center:
+            self._mean = [sum(v[d] for v in vectors) / len(vectors) for d in range(dim)]
+        else:
+            self._mean = [0.0] * dim
+        if self.backend == "numpy":
+            self._mean_array = np.asarray(self._mean, dtype=np.float64)
+
+    def _encode(self, vector: List[float]) -> bytes:
+        if self.backend == "numpy":
+            bits = np.asarray(vector, dtype=np.float64) > self._mean_array
+            return np.packbits(bits, bitorder="little").tobytes().ljust(self.code_size, b"\0")
+
+        value = 0
+        for d, (x, mean) in enumerate(zip(vector, self._mean)):
+            if x > mean:
+                value |= 1 << d
+        return value.to_bytes(self.code_size, "little")
+
+    def _coarse_scores(self, query_vector: List[float], slots):
+        query_code = self._encode(query_vector)
+
+        if self.backend == "numpy":
+            words = np.frombuffer(self._codes, dtype="<u8").reshape(-1, self._words)
+            query_words = np.frombuffer(query_code, dtype="<u8")
+            scores = np.empty(len(slots), dtype=np.int64)
+            for start in range(0, len(slots), ADC_CHUNK):
+                chunk = slots[start:start + ADC_CHUNK]
+                diff = words[chunk] ^ query_words
+                if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+                    distances = np.bitwise_count(diff).sum(axis=1, dtype=np.int64)
+                else:
+                    distances = _POPCOUNT_TABLE[diff.view(np.uint8)].sum(axis=1, dtype=np.int64)
+                scores[start:start + len(chunk)] = -distances
+            return scores
+
+        query = int.from_bytes(query_code, "little")
+        size = self.code_size
+        codes = self._codes
+        return [-_popcount(query ^ int.from_bytes(codes[slot * size:(slot + 1) * size], "little"))
+                for slot in slots]
+
+    def _similarity(self, score: float, query_norm: float) -> float:
+        # Random-hyperplane estimate: angle ~ pi * hamming / dimension
+        return math.cos(math.pi * -score / self.db.dimension)
+
+    def __repr__(self):
+        return f"BinaryQuantizer(trained={self.trained}, vectors={len(self)}, rescore={self.rescore})"
@@ -3,31 +3,116 @@ Vector Database Implementation
 In-memory vector storage with CRUD operations and JSON persistence.
 """
 
+import functools
 import json
+import math
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Sequence, Tuple
+
+from .binary_format import BINARY_EXTENSIONS, is_binary_file, read_binary, write_binary
+from .metadata_index import MetadataIndex, matches
+from .rwlock import ReadWriteLock, reads, writes
+from .vector_store import DTYPES, FLOAT16_MAX, StoreSnapshot, VectorStore
+from .wal import WriteAheadLog, decode_vector, encode_vector
+
+# dtype name of each vector typecode, for files that only record the typecode
+_DTYPE_NAMES = {typecode: dtype for dtype, typecode in DTYPES.items()}
+
+
+def mutates(method):
+    """Run a mutation: `lock` held shared, and one mutation at a time."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.read(), self._writer_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class VectorDB:
     """
     Simple in-memory vector database.
 
-    Stores vectors with metadata and supports CRUD operations.
+    Stores vectors with metadata and supports CRUD operations. Vectors are
+    kept in a contiguous VectorStore (float32 unless another dtype is
+    chosen); deleted rows are tombstoned until `compact()` is called. Each
+    vector's norm is computed once, when it is added or updated.
+
+    A VectorDB can be shared between threads. Searches score a snapshot of
+    the store (see `snapshot()`), so they never wait for add/update/delete:
+    mutations run one at a time, publish their change in a short critical
+    section, and run index hooks, the WAL and checkpoints outside it.
+    `lock` is held shared by reads and mutations and exclusively only by
+    structural changes (compact, load, enable_wal, metadata index changes),
+    which wait for in-flight searches.
     """
 
-    def __init__(self, dimension: int, name: str = "vector_db"):
+    def __init__(self, dimension: int, name: str = "vector_db", normalize: bool = False,
+                 dtype: str = "float32", vector_file: Optional[str] = None):
         """
         Initialize vector database.
 
         Args:
             dimension: Dimension of vectors to store
             name: Name of the database
+            normalize: If True, store unit-length vectors so cosine
+                similarity reduces to a dot product
+            dtype: Storage precision - "float64", "float32" or "float16".
+                float16 halves memory against float32; kernels upcast to
+                float64, so only the stored values are rounded.
+            vector_file: Keep the vector block in this memory-mapped file
+                instead of the heap (out-of-core mode). The file grows in
+                segments and may exceed physical memory; it is working
+                storage, so persist with save() as usual.
+
+        Raises:
+            ValueError: If the dtype is not supported
         """
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}'. Expected one of {tuple(DTYPES)}")
+
         self.dimension = dimension
         self.name = name
-        self.vectors = {}
+        self.normalize = normalize
+        self.dtype = dtype
+        self.vector_file = vector_file
+        self.store = VectorStore(dimension, DTYPES[dtype], normalize=normalize, vector_file=vector_file)
+        self.indexes = {}
+        self.metadata_index = MetadataIndex()
+        self.lock = ReadWriteLock()
+        # Serializes mutations (and checkpoints) without blocking readers
+        self._writer_lock = threading.RLock()
+        # Held exclusively while a mutation publishes its change; snapshots
+        # are taken under it shared
+        self._commit_lock = ReadWriteLock()
+        # Bumped by every change that can alter search results; query caches
+        # compare it to tell whether a cached result is still current
+        self.version = 0
         self.created_at = datetime.now().isoformat()
+        self.wal = None
+        self._snapshot_path = None
+        self._checkpoint_bytes = None
+        self._checkpoint_interval = None
+        self._last_checkpoint = time.monotonic()
+
+    def _check_vector(self, vector: List[float]):
+        """
+        Check that a vector fits the DB dimension and dtype.
 
+        Raises:
+            ValueError: If the dimension doesn't match or a finite value
+                exceeds the float16 range
+        """
+        if len(vector) != self.dimension:
+            raise ValueError(f"Vector dimension {len(vector)} doesn't match DB dimension {self.dimension}")
+
+        if self.dtype == "float16":
+            for value in vector:
+                if abs(value) > FLOAT16_MAX and not math.isinf(value):
+                    raise ValueError(f"Value {value} is out of range for float16 (max {FLOAT16_MAX})")
+
+    @mutates
     def add_vector(self, vector_id: str, vector: List[float], metadata: Optional[Dict] = None) -> bool:
         """
         Add a single vector to the database.
@@ -41,22 +126,34 @@ class VectorDB:
             bool: True if added successfully
 
         Raises:
-            ValueError: If vector dimension doesn't match or ID already exists
+            ValueError: If vector dimension doesn't match, a value is out of
+                range for the dtype, or ID already exists
         """
-        if vector_id in self.vectors:
+        if vector_id in self.store:
             raise ValueError(f"Vector ID '{vector_id}' already exists")
 
-        if len(vector) != self.dimension:
-            raise ValueError(f"Vector dimension {len(vector)} doesn't match DB dimension {self.dimension}")
+        self._check_vector(vector)
 
-        self.vectors[vector_id] = {
-            "vector": list(vector),
-            "metadata": metadata or {},
-            "timestamp": datetime.now().isoformat()
-        }
+        with self._commit_lock.write():
+            row = self.store.append(vector_id, vector, metadata or {}, datetime.now().isoformat())
+            self.metadata_index.add(vector_id, self.store.get_metadata(row))
+            self.version += 1
+
+        self._notify("on_add", vector_id)
+
+        if self.wal is not None:
+            self._log({
+                "op": "add",
+                "id": vector_id,
+                "vector": encode_vector(self.store.read(row), self.store.typecode),
+                "dtype": self.store.typecode,
+                "metadata": self.store.get_metadata(row),
+                "timestamp": self.store.get_timestamp(row)
+            })
 
         return True
 
+    @mutates
     def add_vectors(self, vectors_dict: Dict[str, tuple]) -> int:
         """
         Batch add multiple vectors.
@@ -77,6 +174,7 @@ class VectorDB:
 
         return count
 
+    @reads
     def get_vector(self, vector_id: str) -> Optional[Dict]:
         """
         Retrieve a vector by ID.
@@ -87,8 +185,17 @@ class VectorDB:
         Returns:
             dict: Vector data with metadata, or None if not found
         """
-        return self.vectors.get(vector_id)
+        row = self.store.row_of(vector_id)
+        if row is None:
+            return None
+
+        return {
+            "vector": self.store.read(row),
+            "metadata": self.store.get_metadata(row),
+            "timestamp": self.store.get_timestamp(row)
+        }
 
+    @reads
     def get_vector_data(self, vector_id: str) -> Optional[List[float]]:
         """
         Get just the vector data (without metadata).
@@ -99,14 +206,32 @@ class VectorDB:
         Returns:
             list: Vector data, or None if not found
         """
-        entry = self.vectors.get(vector_id)
-        return entry["vector"] if entry else None
+        row = self.store.row_of(vector_id)
+        return self.store.read(row) if row is not None else None
+
+    @reads
+    def get_norm(self, vector_id: str) -> Optional[float]:
+        """
+        Get the cached L2 norm of a stored vector.
+
+        Args:
+            vector_id: Vector identifier
+
+        Returns:
+            float: Norm of the stored vector, or None if not found
+        """
+        row = self.store.row_of(vector_id)
+        return self.store.norm(row) if row is not None else None
 
+    @mutates
     def update_vector(self, vector_id: str, vector: Optional[List[float]] = None,
                      metadata: Optional[Dict] = None) -> bool:
         """
         Update an existing vector and/or its metadata.
 
+        A new vector is written to a new row (the old one is tombstoned
+        until `compact()`), so it moves to the end of the storage order.
+
         Args:
             vector_id: Vector identifier
             vector: New vector data (optional)
@@ -116,63 +241,431 @@ class VectorDB:
             bool: True if updated successfully
 
         Raises:
-            ValueError: If vector ID doesn't exist or dimension mismatch
+            ValueError: If vector ID doesn't exist, dimension mismatch or a
+                value is out of range for the dtype
         """
-        if vector_id not in self.vectors:
+        row = self.store.row_of(vector_id)
+        if row is None:
             raise ValueError(f"Vector ID '{vector_id}' not found")
 
         if vector is not None:
-            if len(vector) != self.dimension:
-                raise ValueError(f"Vector dimension {len(vector)} doesn't match DB dimension {self.dimension}")
-            self.vectors[vector_id]["vector"] = list(vector)
+            self._check_vector(vector)
+
+        with self._commit_lock.write():
+            timestamp = datetime.now().isoformat()
+            if metadata is not None:
+                self.metadata_index.remove(vector_id, self.store.get_metadata(row))
+                self.metadata_index.add(vector_id, metadata)
+            if vector is not None:
+                # A new vector goes to a new row, so snapshots keep reading the old one
+                row = self.store.replace(vector_id, vector, metadata, timestamp)
+            else:
+                if metadata is not None:
+                    self.store.set_metadata(row, metadata)
+                self.store.set_timestamp(row, timestamp)
+            self.version += 1
 
-        if metadata is not None:
-            self.vectors[vector_id]["metadata"] = metadata
-
-        self.vectors[vector_id]["timestamp"] = datetime.now().isoformat()
+        if vector is not None:
+            self._notify("on_update", vector_id)
+        elif metadata is not None:
+            self._notify("on_metadata_update", vector_id)
+
+        if self.wal is not None:
+            self._log({
+                "op": "update",
+                "id": vector_id,
+                "vector": encode_vector(self.store.read(row), self.store.typecode) if vector is not None else None,
+                "dtype": self.store.typecode,
+                "metadata": metadata,
+                "timestamp": self.store.get_timestamp(row)
+            })
 
         return True
 
+    @mutates
     def delete_vector(self, vector_id: str) -> bool:
         """
         Delete a vector from the database.
 
+        The row is tombstoned; call `compact()` to reclaim its space.
+
         Args:
             vector_id: Vector identifier
 
         Returns:
             bool: True if deleted, False if not found
         """
-        if vector_id in self.vectors:
-            del self.vectors[vector_id]
+        if vector_id not in self.store:
+            return False
+
+        # Indexes are notified while the vector is still readable
+        self._notify("on_delete", vector_id)
+
+        with self._commit_lock.write():
+            self.metadata_index.remove(vector_id, self.store.get_metadata(self.store.row_of(vector_id)))
+            self.store.delete(vector_id)
+            self.version += 1
+
+        if self.wal is not None:
+            self._log({"op": "delete", "id": vector_id})
+
+        return True
+
+    def _notify(self, hook: str, vector_id: str):
+        """Run an index hook on every attached index, then its deferred work (e.g. retraining)."""
+        for index in self.indexes.values():
+            # Searches of that index wait for the hook, not for maintain()
+            with index.lock.write():
+                getattr(index, hook)(vector_id)
+            index.maintain()
+        if self.indexes:
+            # Index searches cached while the hooks ran may predate them
+            self.version += 1
+
+    @writes
+    def compact(self) -> int:
+        """
+        Reclaim space held by deleted and replaced vectors.
+
+        Returns:
+            int: Number of rows reclaimed
+        """
+        return self.store.compact()
+
+    @writes
+    def enable_wal(self, snapshot_path: str, wal_path: Optional[str] = None,
+                   checkpoint_bytes: Optional[int] = 64 * 1024 * 1024,
+                   checkpoint_interval: Optional[float] = None,
+                   sync_every_record: bool = False) -> int:
+        """
+        Log every add/update/delete to an append-only write-ahead log.
+
+        Mutations then cost O(record) instead of a full `save()`. The log is
+        folded into the snapshot by `checkpoint()`, which runs automatically
+        once the log grows past `checkpoint_bytes` or `checkpoint_interval`
+        seconds have passed since the last checkpoint. Records already in
+        the log (e.g. after a crash) are replayed first, so call this right
+        after `load(snapshot_path)`.
+
+        Args:
+            snapshot_path: Snapshot file the log is folded into (JSON or binary)
+            wal_path: Log file path (defaults to snapshot_path + ".wal")
+            checkpoint_bytes: Checkpoint when the log reaches this size (None = never)
+            checkpoint_interval: Checkpoint when this many seconds have passed
+                since the last checkpoint (None = never)
+            sync_every_record: fsync after every record instead of on `flush()`
+
+        Returns:
+            int: Number of log records replayed
+        """
+        if self.wal is not None:
+            self.wal.close()
+            self.wal = None
+
+        wal_path = wal_path or snapshot_path + ".wal"
+        replayed = 0
+        for record in WriteAheadLog.read(wal_path):
+            self._apply_record(record)
+            replayed += 1
+
+        self.wal = WriteAheadLog(wal_path, sync_every_record)
+        self._snapshot_path = snapshot_path
+        self._checkpoint_bytes = checkpoint_bytes
+        self._checkpoint_interval = checkpoint_interval
+        self._last_checkpoint = time.monotonic()
+        return replayed
+
+    def _apply_record(self, record: Dict[str, Any]):
+        """Apply one log record. Idempotent, so a log overlapping its snapshot replays safely."""
+        vector_id = record["id"]
+        op = record["op"]
+
+        if op == "delete":
+            self.delete_vector(vector_id)
+            return
+
+        vector = decode_vector(record["vector"], record["dtype"]) if record.get("vector") else None
+        if op == "add" and vector_id not in self.store:
+            self.add_vector(vector_id, vector, record["metadata"])
+        elif vector_id in self.store:
+            self.update_vector(vector_id, vector, record.get("metadata"))
+        else:
+            return
+
+        self.store.set_timestamp(self.store.row_of(vector_id), record["timestamp"])
+
+    def _log(self, record: Dict[str, Any]):
+        """
+        Append a record to the WAL and checkpoint if a threshold was reached.
+
+        Runs after the mutation is published, so a checkpoint only holds up
+        other writers, never searches.
+        """
+        self.wal.append(record)
+
+        if self._checkpoint_bytes is not None and self.wal.size >= self._checkpoint_bytes:
+            self.checkpoint()
+        elif (self._checkpoint_interval is not None
+              and time.monotonic() - self._last_checkpoint >= self._checkpoint_interval):
+            self.checkpoint()
+
+    @reads
+    def flush(self):
+        """Make every logged mutation durable (fsync the WAL). No-op without a WAL."""
+        if self.wal is not None:
+            self.wal.sync()
+
+    @reads
+    def checkpoint(self) -> bool:
+        """
+        Fold the WAL into the snapshot: save the snapshot, then truncate the log.
+
+        Returns:
+            bool: True if the checkpoint succeeded
+
+        Raises:
+            ValueError: If the WAL is not enabled
+        """
+        if self.wal is None:
+            raise ValueError("WAL is not enabled")
+
+        # Mutations wait, or they could log records the snapshot misses;
+        # searches keep running
+        with self._writer_lock:
+            if not self.save(self._snapshot_path):
+                return False
+
+            self.wal.truncate()
+            self._last_checkpoint = time.monotonic()
             return True
-        return False
 
+    @mutates
+    def attach_index(self, name: str, index) -> bool:
+        """
+        Attach a secondary index and build it over the current vectors.
+
+        The index is then kept in sync on every add, update and delete.
+        Mutations wait while it is built; searches don't.
+
+        Args:
+            name: Name used to select the index at search time
+            index: VectorIndex instance (e.g. HNSWIndex)
+
+        Returns:
+            bool: True if attached successfully
+
+        Raises:
+            ValueError: If an index with this name is already attached
+        """
+        if name in self.indexes:
+            raise ValueError(f"Index '{name}' already attached")
+
+        index.build(self)
+        self.indexes[name] = index
+        self.version += 1
+        return True
+
+    @reads
+    def build_index(self, name: str, index) -> bool:
+        """
+        Build a secondary index while mutations carry on, then attach it.
+
+        Unlike attach_index(), which makes mutations wait for the whole
+        build (minutes for a large HNSW graph), the index is built over the
+        vectors present when the build starts while adds, updates and
+        deletes continue. Changes made meanwhile are then replayed through
+        the index hooks in a short section during which mutations wait, and
+        the index is attached. compact() and load() wait for the build.
+
+        Args:
+            name: Name used to select the index at search time
+            index: VectorIndex instance (e.g. HNSWIndex)
+
+        Returns:
+            bool: True if attached successfully
+
+        Raises:
+            ValueError: If an index with this name is already attached
+        """
+        if name in self.indexes:
+            raise ValueError(f"Index '{name}' already attached")
+
+        with self._commit_lock.read():
+            snapshot = self.store.snapshot()
+        built = {vid: (row, snapshot.get_metadata(row)) for row, vid in snapshot.iter_rows()}
+        # Reads the live store: a vector changed after the snapshot may be
+        # indexed in its new state here and is re-indexed below
+        index.build(self)
+
+        with self._writer_lock:
+            if name in self.indexes:
+                raise ValueError(f"Index '{name}' already attached")
+            with index.lock.write():
+                for vector_id in [vid for vid in built if self.store.row_of(vid) is None]:
+                    index.on_delete(vector_id)
+                for row, vector_id in self.store.iter_rows():
+                    # Hooks tolerate IDs they don't hold, so on_update also covers adds
+                    if built.get(vector_id) != (row, self.store.get_metadata(row)):
+                        index.on_update(vector_id)
+            index.maintain()
+            self.indexes[name] = index
+            self.version += 1
+        return True
+
+    @mutates
+    def detach_index(self, name: str) -> bool:
+        """
+        Detach a secondary index.
+
+        Args:
+            name: Index name
+
+        Returns:
+            bool: True if detached, False if not found
+        """
+        if self.indexes.pop(name, None) is None:
+            return False
+        self.version += 1
+        return True
+
+    @writes
+    def create_metadata_index(self, field: str, kind: str = "equality") -> bool:
+        """
+        Index a metadata field so declarative filters on it skip the full scan.
+
+        Args:
+            field: Metadata field name
+            kind: "equality" (eq/in lookups through an inverted index) or
+                "range" (eq/in/gt/gte/lt/lte through a sorted index)
+
+        Returns:
+            bool: True if created successfully
+
+        Raises:
+            ValueError: If the kind is unknown
+        """
+        self.metadata_index.add_field(field, kind)
+        self._rebuild_metadata_index()
+        return True
+
+    @writes
+    def drop_metadata_index(self, field: str) -> bool:
+        """
+        Drop a metadata field index.
+
+        Args:
+            field: Metadata field name
+
+        Returns:
+            bool: True if dropped, False if not found
+        """
+        return self.metadata_index.drop_field(field)
+
+    def _rebuild_metadata_index(self):
+        self.metadata_index.clear()
+        for row, vid in self.store.iter_rows():
+            self.metadata_index.add(vid, self.store.get_metadata(row))
+
+    @reads
     def get_all_ids(self) -> List[str]:
         """Get list of all vector IDs."""
-        return list(self.vectors.keys())
+        snapshot, _ = self.snapshot()
+        return snapshot.ids()
 
+    @reads
     def get_all_vectors(self) -> Dict[str, List[float]]:
         """Get all vectors without metadata."""
-        return {vid: v["vector"] for vid, v in self.vectors.items()}
+        snapshot, _ = self.snapshot()
+        return {vid: snapshot.read(row) for row, vid in snapshot.iter_rows()}
 
+    @reads
     def filter_by_metadata(self, filter_fn) -> List[str]:
         """
         Filter vectors by metadata.
 
         Args:
-            filter_fn: Function that takes metadata dict and returns bool
+            filter_fn: Function that takes metadata dict and returns bool, or
+                a declarative filter spec such as
+                {"type": "item", "date": {"gte": "2023-01-01"}}
+                (see metadata_index.py). Conditions on indexed fields are
+                resolved through the metadata index instead of a full scan.
 
         Returns:
-            list: Vector IDs matching the filter
+            list: Vector IDs matching the filter, in storage order
+
+        Raises:
+            ValueError: If a filter spec is malformed
+        """
+        snapshot, (rows,) = self.snapshot([filter_fn])
+        if rows is None:
+            return snapshot.ids()
+        return [snapshot.row_id(row) for row in rows]
+
+    @reads
+    def snapshot(self, filters: Sequence = ()) -> Tuple[StoreSnapshot, List[Optional[List[int]]]]:
         """
-        matching_ids = []
-        for vid, data in self.vectors.items():
-            if filter_fn(data["metadata"]):
-                matching_ids.append(vid)
+        Take a consistent read-only view of the store and resolve filters against it.
 
-        return matching_ids
+        Only the view and the metadata index lookups are taken in the
+        critical section mutations publish under; callable filters,
+        residual conditions and scoring then run against the view without
+        holding anything up.
+
+        Args:
+            filters: Metadata filters (callables or specs, see
+                filter_by_metadata()); None or empty entries select every row
 
+        Returns:
+            tuple: (StoreSnapshot, rows), where rows[i] lists the matching
+                   rows of filters[i] in storage order, or is None for a
+                   filter that selects every row
+
+        Raises:
+            ValueError: If a filter spec is malformed
+        """
+        resolved = []
+        with self._commit_lock.read():
+            snapshot = self.store.snapshot()
+            for condition in filters:
+                candidates = None
+                if isinstance(condition, dict) and condition:
+                    candidates, residual = self.metadata_index.resolve(condition)
+                if candidates is None:
+                    resolved.append((None, condition or None))
+                else:
+                    resolved.append((sorted(self.store.row_of(vid) for vid in candidates), residual))
+
+        return snapshot, [self._match_rows(snapshot, rows, condition) for rows, condition in resolved]
+
+    @reads
+    def estimate_matches(self, spec: Dict[str, Any]) -> Optional[int]:
+        """
+        Upper bound on the vectors matching a filter spec, from the metadata indexes alone.
+
+        Args:
+            spec: Filter spec (see filter_by_metadata())
+
+        Returns:
+            int: Upper bound, or None if no condition of the spec is indexed
+
+        Raises:
+            ValueError: If the spec is malformed
+        """
+        with self._commit_lock.read():
+            return self.metadata_index.estimate(spec)
+
+    @staticmethod
+    def _match_rows(snapshot: StoreSnapshot, rows: Optional[List[int]], condition) -> Optional[List[int]]:
+        """Rows (all live rows if None) whose metadata satisfies a callable or spec."""
+        if not condition:
+            return rows
+        if rows is None:
+            rows = (row for row, _ in snapshot.iter_rows())
+        if isinstance(condition, dict):
+            return [row for row in rows if matches(condition, snapshot.get_metadata(row))]
+        return [row for row in rows if condition(snapshot.get_metadata(row))]
+
+    @reads
     def get_stats(self) -> Dict[str, Any]:
         """
         Get database statistics.
@@ -180,35 +673,64 @@ class VectorDB:
         Returns:
             dict: Statistics including count, dimension, memory usage estimate
         """
-        total_vectors = len(self.vectors)
-        memory_estimate_mb = (total_vectors * self.dimension * 8) / (1024 * 1024)  # 8 bytes per float
+        total_vectors = len(self.store)
+        # Row buffers held in memory (not a vector file), tombstones included until compact()
+        memory_estimate_mb = self.store.footprint / (1024 * 1024)
 
         return {
             "name": self.name,
             "dimension": self.dimension,
+            "dtype": self.dtype,
+            "normalize": self.normalize,
             "total_vectors": total_vectors,
+            "tombstones": self.store.tombstones,
+            "indexes": list(self.indexes),
+            "metadata_indexes": dict(self.metadata_index.fields),
+            "wal_bytes": self.wal.size if self.wal is not None else 0,
+            "vector_file": self.vector_file,
             "created_at": self.created_at,
             "memory_estimate_mb": round(memory_estimate_mb, 2)
         }
 
-    def save(self, filepath: str) -> bool:
+    @reads
+    def save(self, filepath: str, binary: Optional[bool] = None) -> bool:
         """
-        Save database to JSON file.
+        Save database to a JSON or binary file.
 
         Args:
             filepath: Path to save file
+            binary: Write the binary format (see binary_format.py). Defaults
+                to True for .vdb/.bin paths and False (JSON) otherwise.
 
         Returns:
             bool: True if saved successfully
         """
-        data = {
-            "name": self.name,
-            "dimension": self.dimension,
-            "created_at": self.created_at,
-            "vectors": self.vectors
-        }
+        if binary is None:
+            binary = filepath.lower().endswith(BINARY_EXTENSIONS)
 
+        # Written from a snapshot, so writers are not held up meanwhile
+        snapshot, _ = self.snapshot()
         try:
+            if binary:
+                write_binary(self, filepath, snapshot)
+                return True
+
+            data = {
+                "name": self.name,
+                "dimension": self.dimension,
+                "normalize": self.normalize,
+                "dtype": self.dtype,
+                "created_at": self.created_at,
+                "vectors": {
+                    vid: {
+                        "vector": snapshot.read(row),
+                        "metadata": snapshot.get_metadata(row),
+                        "timestamp": snapshot.get_timestamp(row)
+                    }
+                    for row, vid in snapshot.iter_rows()
+                }
+            }
+
             with open(filepath, 'w') as f:
                 json.dump(data, f, indent=2)
             return True
@@ -216,40 +738,68 @@ class VectorDB:
             print(f"Error saving database: {e}")
             return False
 
-    def load(self, filepath: str) -> bool:
+    @writes
+    def load(self, filepath: str, mmap_vectors: bool = True) -> bool:
         """
-        Load database from JSON file.
+        Load database from a JSON or binary file (detected from the file header).
 
         Args:
             filepath: Path to load file
+            mmap_vectors: For binary files, memory-map the vector block instead
+                of reading it; it is copied on the first write
 
         Returns:
             bool: True if loaded successfully
         """
         try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-
-            self.name = data["name"]
-            self.dimension = data["dimension"]
-            self.created_at = data["created_at"]
-            self.vectors = data["vectors"]
-
+            if is_binary_file(filepath):
+                data = read_binary(filepath, mmap_vectors=mmap_vectors)
+                self.name = data["name"]
+                self.dimension = data["dimension"]
+                self.created_at = data["created_at"]
+                self.normalize = data["normalize"]
+                self.dtype = _DTYPE_NAMES[data["typecode"]]
+                self.store = self._new_store(data["typecode"])
+                self.store.load_buffers(data["vectors"], data["norms"], data["ids"],
+                                        data["metadata"], data["timestamps"])
+            else:
+                with open(filepath, 'r') as f:
+                    data = json.load(f)
+
+                self.name = data["name"]
+                self.dimension = data["dimension"]
+                self.created_at = data["created_at"]
+                self.normalize = data.get("normalize", self.normalize)
+                self.dtype = data.get("dtype", self.dtype)
+                self.store = self._new_store(DTYPES[self.dtype])
+                for vid, entry in data["vectors"].items():
+                    self.store.append(vid, entry["vector"], entry["metadata"], entry["timestamp"])
+
+            self._rebuild_metadata_index()
+            for index in self.indexes.values():
+                index.build(self)
+
+            self.version += 1
             return True
         except Exception as e:
             print(f"Error loading database: {e}")
             return False
 
+    def _new_store(self, typecode: str) -> VectorStore:
+        """Empty store for a load, reusing the vector file of the current one."""
+        self.store.close()
+        return VectorStore(self.dimension, typecode, normalize=self.normalize, vector_file=self.vector_file)
+
     def __len__(self):
         """Return number of vectors in database."""
-        return len(self.vectors)
+        return len(self.store)
 
     def __contains__(self, vector_id):
         """Check if vector ID exists in database."""
-        return vector_id in self.vectors
+        return vector_id in self.store
 
     def __repr__(self):
-        return f"VectorDB(name='{self.name}', dimension={self.dimension}, vectors={len(self.vectors)})"
+        return f"VectorDB(name='{self.name}', dimension={self.dimension}, vectors={len(self.store)})"
 
 
 if __name__ == "__main__":
@@ -279,6 +829,10 @@ if __name__ == "__main__":
     category_a = db.filter_by_metadata(lambda m: m.get("category") == "A")
     print(f"\nVectors in category A: {category_a}")
 
+    db.create_metadata_index("category")
+    category_a = db.filter_by_metadata({"category": "A", "type": {"ne": "updated"}})
+    print(f"Indexed filter (category A, not updated): {category_a}")
+
     # Stats
     stats = db.get_stats()
     print(f"\nDatabase stats: {stats}")
@@ -0,0 +1,606 @@
+"""
+Vector Storage Engine
+Contiguous row storage for vectors with an id -> row index and tombstone deletes.
+
+Rows are append-only: a vector update writes a new row and tombstones the
+old one, and a full buffer is replaced by a larger copy instead of being
+resized. A row's data therefore never changes once written, which is what
+lets searches run against a `StoreSnapshot` while writers keep appending.
+"""
+
+import struct
+from array import array
+from typing import Dict, List, Optional, Iterator, Tuple
+
+from .cosine_similarity import magnitude
+from .mapped_buffer import SEGMENT_BYTES, MappedBuffer
+
+# Supported vector dtypes and their struct/NumPy typecodes
+DTYPES = {"float64": "d", "float32": "f", "float16": "e"}
+
+# The array module has no half-precision type, so float16 vectors are kept
+# as their raw 16-bit patterns in an array('H') and converted with struct
+_STORAGE_TYPECODES = {"e": "H"}
+
+# Largest finite float16 value; struct refuses to pack anything beyond it
+FLOAT16_MAX = 65504.0
+
+
+def storage_typecode(typecode: str) -> str:
+    """array module typecode of the buffer that holds vectors of a typecode."""
+    return _STORAGE_TYPECODES.get(typecode, typecode)
+
+
+def pack_values(values: List[float], typecode: str) -> array:
+    """Convert floats to an array buffer of the storage type for a typecode."""
+    storage = storage_typecode(typecode)
+    if storage == typecode:
+        return array(typecode, values)
+    packed = array(storage)
+    packed.frombytes(struct.pack(f"={len(values)}{typecode}", *values))
+    return packed
+
+
+def unpack_values(buffer, typecode: str) -> List[float]:
+    """Read a slice of a storage buffer back as a list of floats."""
+    if storage_typecode(typecode) == typecode:
+        return buffer.tolist()
+    return list(struct.unpack(f"={len(buffer)}{typecode}", buffer.tobytes()))
+
+
+class GrowableArray:
+    """
+    Heap counterpart of MappedBuffer: an array with spare capacity.
+
+    Appends fill the spare capacity in place. When it runs out the values
+    are copied into an array twice the size, and the old array is left to
+    any view that still refers to it, so views handed out earlier never
+    see a resize (which `array` refuses while a buffer is exported anyway).
+    """
+
+    def __init__(self, typecode: str, values=None):
+        """
+        Create an empty array, optionally filled with initial values.
+
+        Args:
+            typecode: array module typecode of the stored values
+            values: Optional initial values (array or memoryview of this typecode)
+        """
+        self.typecode = typecode
+        self.itemsize = array(typecode).itemsize
+        self._array = array(typecode)
+        self._length = 0
+        if values is not None:
+            self.extend(values)
+
+    @property
+    def capacity(self) -> int:
+        """Number of values the array can hold without growing."""
+        return len(self._array)
+
+    @property
+    def buffer(self) -> memoryview:
+        """View of the used values."""
+        return memoryview(self._array)[:self._length]
+
+    def _reserve(self, items: int):
+        """Make room for at least `items` values by moving to a larger array."""
+        if items <= len(self._array):
+            return
+        grown = array(self.typecode)
+        grown.frombytes(self.buffer.cast("B"))
+        grown.frombytes(bytes((max(items, 2 * len(self._array), 64) - self._length) * self.itemsize))
+        self._array = grown
+
+    def extend(self, values):
+        """Append values (an array or memoryview of this typecode)."""
+        count = len(values)
+        self._reserve(self._length + count)
+        memoryview(self._array)[self._length:self._length + count] = values
+        self._length += count
+
+    def append(self, value):
+        """Append one value."""
+        self._reserve(self._length + 1)
+        self._array[self._length] = value
+        self._length += 1
+
+    def truncate(self, length: int):
+        """Forget values past `length`; the capacity is kept."""
+        self._length = min(length, self._length)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.buffer[key]
+        if not -self._length <= key < self._length:
+            raise IndexError("GrowableArray index out of range")
+        return self._array[key % self._length]
+
+    def __setitem__(self, key, values):
+        self.buffer[key] = values
+
+    def __len__(self):
+        """Return number of used values."""
+        return self._length
+
+    def __repr__(self):
+        return f"GrowableArray(typecode='{self.typecode}', length={self._length}, capacity={self.capacity})"
+
+
+class VectorStore:
+    """
+    Row-oriented storage for fixed-dimension vectors.
+
+    All vectors live in a single contiguous buffer (row-major, float32 by
+    default, optionally float64 or float16), so a row is just a slice of
+    `dimension` values. Each row also carries its ID, metadata, timestamp,
+    L2 norm and a live flag. Deletes only tombstone the row and vector
+    updates append a replacement row (so the vector moves to the end of
+    the storage order); the space is reclaimed by an explicit `compact()`.
+
+    Norms are computed once per write. With normalize=True vectors are
+    scaled to unit length before being stored, so cosine similarity against
+    them is a plain dot product.
+
+    The vector and norm buffers may also be read-only memoryviews over a
+    memory-mapped file (see `load_buffers`); they are copied into private
+    arrays on the first write.
+
+    With a `vector_file` the vector buffer is a MappedBuffer instead: it
+    lives in a memory-mapped file that grows in segments and may exceed
+    physical memory. Only IDs, norms, live flags and metadata stay on the
+    Python heap.
+
+    `snapshot()` returns a consistent read-only view that later appends,
+    updates and deletes don't affect. Only `compact()`, `clear()` and
+    `load_buffers()` may move rows under a snapshot; callers keep those
+    apart from readers (VectorDB runs them under its exclusive lock). Each
+    of them bumps `generation`, so a snapshot kept across lock releases
+    can tell it has gone stale.
+    """
+
+    def __init__(self, dimension: int, typecode: str = "f", normalize: bool = False,
+                 vector_file: Optional[str] = None, segment_bytes: int = SEGMENT_BYTES):
+        """
+        Initialize an empty store.
+
+        Args:
+            dimension: Dimension of stored vectors
+            typecode: Vector typecode - 'd' (float64), 'f' (float32) or
+                'e' (float16, stored as raw 16-bit patterns)
+            normalize: If True, store vectors scaled to unit length
+            vector_file: Optional path of a file to keep the vectors in
+                (out-of-core mode); its previous contents are overwritten
+            segment_bytes: Growth step of the vector file
+
+        Raises:
+            ValueError: If the typecode is not supported
+        """
+        if typecode not in DTYPES.values():
+            raise ValueError(f"Unsupported typecode '{typecode}'. Expected one of {tuple(DTYPES.values())}")
+
+        self.dimension = dimension
+        self.typecode = typecode
+        self.normalize = normalize
+        self._backing = (MappedBuffer(vector_file, storage_typecode(typecode), segment_bytes)
+                         if vector_file else None)
+        self._data = self._backing if self._backing is not None else GrowableArray(storage_typecode(typecode))
+        self._norms = GrowableArray("d")
+        self._alive = GrowableArray("B")
+        self._row_ids: List[Optional[str]] = []
+        self._metadata: List[Optional[Dict]] = []
+        self._timestamps: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._tombstones = 0
+        # Bumped whenever row numbers change (compact, clear, load_buffers)
+        self.generation = 0
+
+    def load_buffers(self, vectors, norms, ids: List[str], metadata: List[Dict],
+                     timestamps: List[str]):
+        """
+        Replace the store's contents with prebuilt buffers.
+
+        With a vector file, vectors given as an array are copied into it;
+        a read-only memoryview is adopted and copied on the first write.
+
+        Args:
+            vectors: Row-major vector buffer (array or memoryview of the
+                storage typecode)
+            norms: Buffer of float64 norms, one per row
+            ids: Vector ID of each row
+            metadata: Metadata of each row
+            timestamps: Timestamp of each row
+        """
+        if not isinstance(vectors, memoryview):
+            if self._backing is not None:
+                self._backing.truncate(0)
+                self._backing.extend(vectors)
+                vectors = self._backing
+            else:
+                vectors = GrowableArray(storage_typecode(self.typecode), vectors)
+        if not isinstance(norms, memoryview):
+            norms = GrowableArray("d", norms)
+        self._data = vectors
+        self._norms = norms
+        self._alive = GrowableArray("B", b"\x01" * len(ids))
+        self._row_ids = list(ids)
+        self._metadata = list(metadata)
+        self._timestamps = list(timestamps)
+        self._rows = {vector_id: row for row, vector_id in enumerate(ids)}
+        self._tombstones = 0
+        self.generation += 1
+
+    @property
+    def is_mapped(self) -> bool:
+        """True while the vector buffer is a read-only view (e.g. of an mmap)."""
+        return isinstance(self._data, memoryview)
+
+    @property
+    def is_file_backed(self) -> bool:
+        """True if vectors are written to a growable vector file (out-of-core mode)."""
+        return self._backing is not None
+
+    @property
+    def buffer(self):
+        """Buffer of all stored values (including tombstoned rows), for NumPy and file writers."""
+        if isinstance(self._data, memoryview):
+            return self._data
+        return self._data.buffer
+
+    @property
+    def norms(self):
+        """Buffer of the float64 norm of every row."""
+        if isinstance(self._norms, memoryview):
+            return self._norms
+        return self._norms.buffer
+
+    @property
+    def alive(self) -> memoryview:
+        """Buffer of the live flag (1 or 0) of every row."""
+        return self._alive.buffer
+
+    def _ensure_writable(self):
+        """Copy mapped buffers into growable arrays (or the vector file) before the first write."""
+        if isinstance(self._data, memoryview):
+            if self._backing is not None:
+                self._backing.truncate(0)
+                self._backing.extend(self._data)
+                self._data = self._backing
+            else:
+                self._data = GrowableArray(storage_typecode(self.typecode), self._data)
+        if isinstance(self._norms, memoryview):
+            self._norms = GrowableArray("d", self._norms)
+
+    def append(self, vector_id: str, vector: List[float], metadata: Dict, timestamp: str) -> int:
+        """
+        Append a new row.
+
+        Args:
+            vector_id: Unique identifier for the vector
+            vector: Vector data (list of floats)
+            metadata: Metadata dictionary
+            timestamp: ISO timestamp of the write
+
+        Returns:
+            int: Row number of the new vector
+        """
+        return self._append_row(vector_id, pack_values(self._prepare(vector), self.typecode),
+                                metadata, timestamp)
+
+    def _append_row(self, vector_id: str, values, metadata: Dict, timestamp: str) -> int:
+        """Append a row of already packed values; the ID becomes visible last."""
+        self._ensure_writable()
+        row = len(self._row_ids)
+        self._data.extend(values)
+        self._norms.append(magnitude(self.read(row)))
+        self._alive.append(1)
+        self._metadata.append(metadata)
+        self._timestamps.append(timestamp)
+        self._row_ids.append(vector_id)
+        self._rows[vector_id] = row
+        return row
+
+    def replace(self, vector_id: str, vector: Optional[List[float]], metadata: Optional[Dict],
+                timestamp: str) -> int:
+        """
+        Write a new version of a live vector as a new row and tombstone the old one.
+
+        Args:
+            vector_id: Vector identifier
+            vector: New vector data, or None to keep the current vector
+            metadata: New metadata, or None to keep the current metadata
+            timestamp: ISO timestamp of the write
+
+        Returns:
+            int: Row number of the new version
+        """
+        old = self._rows[vector_id]
+        if vector is None:
+            start = old * self.dimension
+            values = array(storage_typecode(self.typecode), self._data[start:start + self.dimension])
+        else:
+            values = pack_values(self._prepare(vector), self.typecode)
+        if metadata is None:
+            metadata = self._metadata[old]
+
+        self._alive[old] = 0
+        self._tombstones += 1
+        return self._append_row(vector_id, values, metadata, timestamp)
+
+    def _prepare(self, vector: List[float]) -> List[float]:
+        """Apply the store's normalization to an incoming vector."""
+        if not self.normalize:
+            return vector
+        norm = magnitude(vector)
+        if norm == 0:
+            return vector
+        return [x / norm for x in vector]
+
+    def read(self, row: int) -> List[float]:
+        """Read the vector stored in a row as a list of floats."""
+        start = row * self.dimension
+        return unpack_values(self._data[start:start + self.dimension], self.typecode)
+
+    def norm(self, row: int) -> float:
+        """Get the cached L2 norm of the vector stored in a row."""
+        return self._norms[row]
+
+    def row_of(self, vector_id: str) -> Optional[int]:
+        """Get the row number of a live vector, or None if not present."""
+        return self._rows.get(vector_id)
+
+    def row_id(self, row: int) -> Optional[str]:
+        """Get the vector ID stored in a row (None for tombstoned rows)."""
+        return self._row_ids[row] if self._alive[row] else None
+
+    def get_metadata(self, row: int) -> Dict:
+        """Get the metadata stored in a row."""
+        return self._metadata[row]
+
+    def set_metadata(self, row: int, metadata: Dict):
+        """Replace the metadata stored in a row (in place; the vector is unchanged)."""
+        self._metadata[row] = metadata
+
+    def get_timestamp(self, row: int) -> str:
+        """Get the timestamp stored in a row."""
+        return self._timestamps[row]
+
+    def set_timestamp(self, row: int, timestamp: str):
+        """Replace the timestamp stored in a row."""
+        self._timestamps[row] = timestamp
+
+    def delete(self, vector_id: str) -> bool:
+        """
+        Tombstone the row holding a vector.
+
+        The row keeps its data until `compact()`, so snapshots taken
+        before the delete still read it.
+
+        Args:
+            vector_id: Vector identifier
+
+        Returns:
+            bool: True if deleted, False if not found
+        """
+        row = self._rows.pop(vector_id, None)
+        if row is None:
+            return False
+
+        self._alive[row] = 0
+        self._tombstones += 1
+        return True
+
+    def compact(self) -> int:
+        """
+        Rewrite the buffer without tombstoned rows.
+
+        Row numbers of live vectors change; IDs do not. A vector file is
+        compacted in place (live rows move down; the file keeps its size),
+        heap buffers are rebuilt.
+
+        Returns:
+            int: Number of rows reclaimed
+        """
+        if self._tombstones == 0:
+            return 0
+
+        self._ensure_writable()
+        dim = self.dimension
+        in_place = self._data is self._backing
+        data = self._data if in_place else GrowableArray(storage_typecode(self.typecode))
+        norms = GrowableArray("d")
+        row_ids, metadata, timestamps = [], [], []
+        rows = {}
+
+        for row, vector_id in self.iter_rows():
+            start = row * dim
+            if not in_place:
+                data.extend(self._data[start:start + dim])
+            elif len(row_ids) != row:
+                # Rows only move down, so source and destination never overlap
+                data[len(row_ids) * dim:(len(row_ids) + 1) * dim] = data[start:start + dim]
+            norms.append(self._norms[row])
+            rows[vector_id] = len(row_ids)
+            row_ids.append(vector_id)
+            metadata.append(self._metadata[row])
+            timestamps.append(self._timestamps[row])
+
+        if in_place:
+            data.truncate(len(row_ids) * dim)
+        reclaimed = self._tombstones
+        self._data = data
+        self._norms = norms
+        self._alive = GrowableArray("B", b"\x01" * len(row_ids))
+        self._row_ids = row_ids
+        self._metadata = metadata
+        self._timestamps = timestamps
+        self._rows = rows
+        self._tombstones = 0
+        self.generation += 1
+        return reclaimed
+
+    def clear(self):
+        """Remove all rows."""
+        if self._backing is not None:
+            self._backing.truncate(0)
+            self._data = self._backing
+        else:
+            self._data = GrowableArray(storage_typecode(self.typecode))
+        self._norms = GrowableArray("d")
+        self._alive = GrowableArray("B")
+        self._row_ids = []
+        self._metadata = []
+        self._timestamps = []
+        self._rows = {}
+        self._tombstones = 0
+        self.generation += 1
+
+    def snapshot(self) -> "StoreSnapshot":
+        """
+        Take a consistent read-only view of the current rows.
+
+        Costs one byte per row (a copy of the live flags). The caller must
+        keep writers out while it is taken; afterwards it is unaffected by
+        appends, updates and deletes.
+
+        Returns:
+            StoreSnapshot: View of the rows as they are now
+        """
+        return StoreSnapshot(self)
+
+    def ids(self) -> List[str]:
+        """Get live vector IDs in row order."""
+        return [vid for _, vid in self.iter_rows()]
+
+    def iter_rows(self) -> Iterator[Tuple[int, str]]:
+        """Iterate over (row, vector_id) pairs of live rows."""
+        alive = self._alive
+        for row, vector_id in enumerate(self._row_ids):
+            if alive[row]:
+                yield row, vector_id
+
+    @property
+    def num_rows(self) -> int:
+        """Number of allocated rows, including tombstones."""
+        return len(self._row_ids)
+
+    @property
+    def tombstones(self) -> int:
+        """Number of tombstoned rows waiting for compaction."""
+        return self._tombstones
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the stored vectors in bytes."""
+        return len(self._data) * self._data.itemsize
+
+    @property
+    def footprint(self) -> int:
+        """Bytes of the row buffers held in memory (vectors in a vector file not included)."""
+        vectors = 0 if self._data is self._backing else self.nbytes
+        return vectors + len(self._norms) * self._norms.itemsize + len(self._alive)
+
+    def flush(self):
+        """Write dirty pages of the vector file back to disk."""
+        if self._backing is not None:
+            self._backing.flush()
+
+    def close(self):
+        """Release the vector file handle (out-of-core mode only)."""
+        if self._backing is not None:
+            self._backing.close()
+
+    def __len__(self):
+        """Return number of live vectors."""
+        return len(self._rows)
+
+    def __contains__(self, vector_id):
+        """Check if a vector ID is live in the store."""
+        return vector_id in self._rows
+
+    def __repr__(self):
+        return (f"VectorStore(dimension={self.dimension}, rows={self.num_rows}, "
+                f"live={len(self)}, tombstones={self._tombstones})")
+
+
+class StoreSnapshot:
+    """
+    Point-in-time, read-only view of a VectorStore.
+
+    Holds the row count, views of the vector and norm buffers as they were,
+    a copy of the live flags and the row lists (which are only appended to).
+    It offers the store's read interface, so kernels and indexes accept it
+    in place of the store.
+    """
+
+    def __init__(self, store: VectorStore):
+        """
+        Capture the current rows of a store.
+
+        Args:
+            store: Store to view; writers must be kept out meanwhile
+        """
+        count = store.num_rows
+        self.dimension = store.dimension
+        self.typecode = store.typecode
+        self.normalize = store.normalize
+        self.num_rows = count
+        self.buffer = store.buffer[:count * store.dimension]
+        self.norms = store.norms[:count]
+        self.alive = bytes(store.alive[:count])
+        self._row_ids = store._row_ids
+        self._metadata = store._metadata
+        self._timestamps = store._timestamps
+        self._live = len(store)
+        self._rows = None
+        self.generation = store.generation
+
+    def read(self, row: int) -> List[float]:
+        """Read the vector stored in a row as a list of floats."""
+        start = row * self.dimension
+        return unpack_values(self.buffer[start:start + self.dimension], self.typecode)
+
+    def norm(self, row: int) -> float:
+        """Get the norm of the vector stored in a row."""
+        return self.norms[row]
+
+    def row_id(self, row: int) -> Optional[str]:
+        """Get the vector ID stored in a row (None for rows not live in the snapshot)."""
+        return self._row_ids[row] if self.alive[row] else None
+
+    def row_of(self, vector_id: str) -> Optional[int]:
+        """Get the row of a vector live in the snapshot (the ID map is built on first use)."""
+        if self._rows is None:
+            self._rows = {vid: row for row, vid in self.iter_rows()}
+        return self._rows.get(vector_id)
+
+    def get_metadata(self, row: int) -> Dict:
+        """Get the metadata stored in a row."""
+        return self._metadata[row]
+
+    def get_timestamp(self, row: int) -> str:
+        """Get the timestamp stored in a row."""
+        return self._timestamps[row]
+
+    def ids(self) -> List[str]:
+        """Get live vector IDs in row order."""
+        return [vid for _, vid in self.iter_rows()]
+
+    def iter_rows(self) -> Iterator[Tuple[int, str]]:
+        """Iterate over (row, vector_id) pairs of live rows."""
+        alive = self.alive
+        for row in range(self.num_rows):
+            if alive[row]:
+                yield row, self._row_ids[row]
+
+    @property
+    def tombstones(self) -> int:
+        """Number of rows that are not live in the snapshot."""
+        return self.num_rows - self._live
+
+    def __len__(self):
+        """Return number of live vectors."""
+        return self._live
+
+    def __repr__(self):
+        return f"StoreSnapshot(dimension={self.dimension}, rows={self.num_rows}, live={self._live})"
@@ -113,7 +113,7 @@ def test_vector_search_tool():
 
     storage = StorageIntegration(
         db_path="./data/receipts.db",
-        vector_db_path="./data/vector_db.json"
+        vector_db_path="./data/vector_db.vdb"
     )
     tool = VectorSearchTool(storage=storage)
 
@@ -141,7 +141,7 @@ def test_create_tools():
     db = DatabaseManager(db_path="./data/receipts.db")
     storage = StorageIntegration(
         db_path="./data/receipts.db",
-        vector_db_path="./data/vector_db.json"
+        vector_db_path="./data/vector_db.vdb"
     )
 
     tools = create_tools(db, storage)
@@ -17,7 +17,7 @@ def test_agent_workflow():
     db = DatabaseManager(db_path="./data/receipts.db")
     storage = StorageIntegration(
         db_path="./data/receipts.db",
-        vector_db_path="./data/vector_db.json"
+        vector_db_path="./data/vector_db.vdb"
     )
 
     print("\nInitializing ReceiptQueryAgent...")
@@ -66,7 +66,7 @@ def test_router_classification():
     db = DatabaseManager(db_path="./data/receipts.db")
     storage = StorageIntegration(
         db_path="./data/receipts.db",
-        vector_db_path="./data/vector_db.json"
+        vector_db_path="./data/vector_db.vdb"
     )
 
     agent = ReceiptQueryAgent(db=db, storage=storage)
@@ -30,7 +30,7 @@ def test_storage_integration():
         print("Initializing Storage Integration...")
         storage = StorageIntegration(
             db_path="./data/test_receipts.db",
-            vector_db_path="./data/test_vector_db.json"
+            vector_db_path="./data/test_vector_db.vdb"
         )
         print()
 